@@ -0,0 +1,179 @@
+"""Performance profile for the Ansible control node
+
+Writes an ansible.cfg with a JSON fact cache, forks sized to the CPU count,
+SSH pipelining with ControlPersist and the profile_tasks/timer callbacks,
+and benchmarks it against Ansible's defaults with a bundled localhost
+playbook:
+
+    python ansible/ansible_profile.py --write                  # ~/.ansible.cfg
+    python ansible/ansible_profile.py --write --path ./ansible.cfg --forks 40
+    python ansible/ansible_profile.py --benchmark --hosts 50
+    python ansible/install_ansible_ce.py --performance-profile --benchmark-profile
+
+The benchmark runs the playbook once with the defaults, then twice with the
+profile: a cold run that fills the fact cache and a warm run that reuses it.
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, NamedTuple, Optional
+
+import command_runner
+
+PROFILE_FILE = os.path.join(os.path.expanduser("~"), ".ansible.cfg")
+FACT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ansible", "facts")
+FACT_CACHE_TIMEOUT_SECONDS = 24 * 3600
+BENCHMARK_PLAYBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "profile-playbook.yml")
+BENCHMARK_HOSTS = 20
+# Ansible's own default, and the floor for small machines
+DEFAULT_FORKS = 5
+# Forks spend most of their time waiting on the network, so several per CPU keep it busy
+FORKS_PER_CPU = 4
+MAX_FORKS = 64
+CONTROL_PERSIST_SECONDS = 60
+# The callbacks live in the ansible.posix collection
+PROFILE_COLLECTIONS = ["ansible.posix"]
+PROFILE_MARKER = "# Written by ansible_profile.py"
+RECAP_PATTERN = re.compile(r"^(\S+)\s+:\s+ok=(\d+)\s+changed=(\d+)\s+unreachable=(\d+)\s+failed=(\d+)"
+                           r"(?:\s+skipped=(\d+))?", re.MULTILINE)
+
+class BenchmarkRun(NamedTuple):
+    label: str
+    seconds: float
+    tasks: int
+    returncode: int
+
+    @property
+    def tasks_per_second(self) -> float:
+        return self.tasks / self.seconds if self.seconds else 0.0
+
+def tuned_forks(cpu_count: Optional[int] = None) -> int:
+    """Forks for this control node: FORKS_PER_CPU per CPU, within [DEFAULT_FORKS, MAX_FORKS]"""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return max(DEFAULT_FORKS, min(cpu_count * FORKS_PER_CPU, MAX_FORKS))
+
+def render_profile(forks: int, fact_cache_dir: str = FACT_CACHE_DIR) -> str:
+    """Return the ansible.cfg text of the performance profile"""
+    return f"""{PROFILE_MARKER}; re-run it to regenerate
+[defaults]
+forks = {forks}
+# Gather facts only for hosts missing from the cache
+gathering = smart
+fact_caching = jsonfile
+fact_caching_connection = {fact_cache_dir}
+fact_caching_timeout = {FACT_CACHE_TIMEOUT_SECONDS}
+interpreter_python = auto_silent
+callbacks_enabled = ansible.posix.profile_tasks, ansible.posix.timer
+
+[callback_profile_tasks]
+task_output_limit = 20
+sort_order = descending
+
+[ssh_connection]
+# Pipelining needs requiretty to be off in sudoers on the managed hosts when using become
+pipelining = True
+ssh_args = -o ControlMaster=auto -o ControlPersist={CONTROL_PERSIST_SECONDS}s
+control_path_dir = ~/.ansible/cp
+"""
+
+def write_profile(path: str = PROFILE_FILE, forks: Optional[int] = None) -> str:
+    """Write the profile to path, keeping a .bak of a config we did not write; returns the path"""
+    forks = forks or tuned_forks()
+    if os.path.exists(path):
+        with open(path) as f:
+            if not f.read().startswith(PROFILE_MARKER):
+                shutil.copy2(path, path + ".bak")
+                print(f"Saved the existing {path} as {path}.bak")
+    os.makedirs(FACT_CACHE_DIR, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(render_profile(forks))
+    print(f"Wrote the Ansible performance profile to {path} (forks = {forks}, JSON fact cache in {FACT_CACHE_DIR})")
+    return path
+
+def write_inventory(path: str, hosts: int, connection: str):
+    """An inventory of aliases for this machine, so forks have hosts to run in parallel"""
+    with open(path, "w") as f:
+        f.write("[benchmark]\n")
+        for index in range(1, hosts + 1):
+            f.write(f"bench{index:03d} ansible_host=127.0.0.1 ansible_connection={connection}\n")
+
+def count_tasks(output: str) -> int:
+    """Task results across all hosts, from the PLAY RECAP"""
+    return sum(int(ok) + int(changed) + int(failed) + int(skipped or 0)
+               for _, ok, changed, _, failed, skipped in RECAP_PATTERN.findall(output))
+
+def run_benchmark_playbook(label: str, config: str, inventory: str, playbook: str = BENCHMARK_PLAYBOOK) -> BenchmarkRun:
+    env = dict(os.environ, ANSIBLE_CONFIG=config, ANSIBLE_PYTHON_INTERPRETER=sys.executable)
+    started = time.monotonic()
+    result = command_runner.run_command(f"ansible-playbook -i {inventory} {playbook}", tail_lines=None, env=env)
+    run = BenchmarkRun(label, time.monotonic() - started, count_tasks(result.stdout), result.returncode)
+    print(f"{label}: {run.tasks} tasks in {run.seconds:.1f}s ({run.tasks_per_second:.1f} tasks/s)")
+    if result.returncode != 0:
+        print((result.stderr or result.stdout).strip()[-2000:])
+    return run
+
+def benchmark_profile(hosts: int = BENCHMARK_HOSTS, forks: Optional[int] = None,
+                      connection: str = "local") -> List[BenchmarkRun]:
+    """Run the bundled playbook with Ansible's defaults and with the profile, and compare task throughput
+
+    The profile's fact cache lives in a throwaway directory, so the cold run
+    always gathers facts. With the default local connection the comparison
+    covers forks and fact caching; pipelining and ControlPersist only pay off
+    with --connection ssh, which needs sshd and key-based login to localhost.
+    """
+    if not shutil.which("ansible-playbook"):
+        raise RuntimeError("ansible-playbook is not installed; run install_ansible_ce.py first")
+    with tempfile.TemporaryDirectory() as workdir:
+        inventory = os.path.join(workdir, "hosts.ini")
+        write_inventory(inventory, hosts, connection)
+        defaults = os.path.join(workdir, "defaults.cfg")
+        with open(defaults, "w") as f:
+            f.write("[defaults]\n")
+        profile = os.path.join(workdir, "profile.cfg")
+        with open(profile, "w") as f:
+            f.write(render_profile(forks or tuned_forks(), os.path.join(workdir, "facts")))
+
+        print(f"Benchmarking {os.path.basename(BENCHMARK_PLAYBOOK)} on {hosts} {connection} hosts...")
+        runs = [run_benchmark_playbook("defaults", defaults, inventory),
+                run_benchmark_playbook("profile, cold fact cache", profile, inventory),
+                run_benchmark_playbook("profile, warm fact cache", profile, inventory)]
+
+    print("\n=== Ansible Profile Benchmark ===")
+    print(f"{'Configuration':<26} {'Tasks':>6} {'Seconds':>8} {'Tasks/s':>8} {'Speedup':>8}")
+    for run in runs:
+        speedup = runs[0].seconds / run.seconds if run.seconds else 0.0
+        status = "" if run.returncode == 0 else f"  (exit {run.returncode})"
+        print(f"{run.label:<26} {run.tasks:>6} {run.seconds:>8.1f} {run.tasks_per_second:>8.1f} {speedup:>7.1f}x{status}")
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Write and benchmark an Ansible performance profile")
+    parser.add_argument("--write", action="store_true", help="Write the profile as an ansible.cfg")
+    parser.add_argument("--path", default=PROFILE_FILE, help="Where to write the profile")
+    parser.add_argument("--forks", type=int, help=f"Forks to use instead of {FORKS_PER_CPU} per CPU")
+    parser.add_argument("--benchmark", action="store_true", help="Compare the profile with Ansible's defaults")
+    parser.add_argument("--hosts", type=int, default=BENCHMARK_HOSTS, help="Localhost aliases in the benchmark")
+    parser.add_argument("--connection", choices=["local", "ssh"], default="local",
+                        help="Connection the benchmark uses to reach localhost")
+    parser.add_argument("--show", action="store_true", help="Print the profile without writing it")
+    args = parser.parse_args()
+
+    if args.show or not (args.write or args.benchmark):
+        print(render_profile(args.forks or tuned_forks()), end="")
+    if args.write:
+        write_profile(args.path, args.forks)
+    if args.benchmark:
+        try:
+            runs = benchmark_profile(args.hosts, args.forks, args.connection)
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if any(run.returncode != 0 for run in runs):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
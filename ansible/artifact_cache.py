@@ -0,0 +1,190 @@
+"""Content-addressed download cache for installer artifacts
+
+Artifacts are listed in artifacts.json with their URL and pinned SHA-256.
+Downloads are stored under their SHA-256 and verified every time they are
+served, so repeated installs and air-gapped hosts never go back to the
+network. An artifact without a pinned checksum is refused rather than
+trusted on first download, unless its manifest entry sets
+"trust_on_first_use" (for installers served from a moving URL); the first
+download's checksum is then printed and reused from the cache from then on.
+--pin records checksums from a download you trust:
+
+    python ansible/artifact_cache.py --prefetch        # fill the cache
+    python ansible/artifact_cache.py --pin             # record checksums in the manifest
+    DEVOPS_OFFLINE=1 python ansible/setup_awx_tower.py # install from the cache only
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "artifacts.json")
+CACHE_DIR = os.environ.get("DEVOPS_ARTIFACT_CACHE",
+                           os.path.join(os.path.expanduser("~"), ".cache", "devops-public", "artifacts"))
+# Serve artifacts only from the cache, never from the network
+OFFLINE = os.environ.get("DEVOPS_OFFLINE") == "1"
+DOWNLOAD_TIMEOUT_SECONDS = 60
+PREFETCH_JOBS = 4
+CHUNK_SIZE = 1024 * 1024
+
+class ArtifactError(Exception):
+    """Raised when an artifact cannot be served from the cache or verified"""
+
+_index_lock = threading.Lock()
+
+def load_manifest(path: str = MANIFEST_FILE) -> Dict[str, dict]:
+    """Return the pinned artifacts by name"""
+    with open(path) as f:
+        return json.load(f)["artifacts"]
+
+def _index_path() -> str:
+    return os.path.join(CACHE_DIR, "index.json")
+
+def _load_index() -> Dict[str, str]:
+    """Map artifact URLs to the SHA-256 of the content cached for them"""
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _record(url: str, sha256: str):
+    with _index_lock:
+        index = _load_index()
+        index[url] = sha256
+        fd, path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(path, _index_path())
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(CACHE_DIR, "sha256", sha256)
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cached(url: str, expected: Optional[str]) -> Optional[str]:
+    """Return the verified cached blob for a URL, or None if there is no usable copy"""
+    sha256 = expected or _load_index().get(url)
+    if not sha256 or not os.path.exists(blob_path(sha256)):
+        return None
+    if file_sha256(blob_path(sha256)) != sha256:
+        # Corrupted on disk: drop it so it is downloaded again
+        os.remove(blob_path(sha256))
+        return None
+    return blob_path(sha256)
+
+def _download(name: str, url: str, expected: Optional[str]) -> str:
+    """Download into the cache, verifying the pinned checksum if there is one"""
+    os.makedirs(os.path.join(CACHE_DIR, "sha256"), exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f, urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT_SECONDS) as response:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                f.write(chunk)
+        sha256 = digest.hexdigest()
+        if expected and sha256 != expected:
+            raise ArtifactError(f"{name}: checksum mismatch for {url} (expected {expected}, got {sha256})")
+        os.replace(temp_path, blob_path(sha256))
+    except OSError as e:
+        raise ArtifactError(f"{name}: download of {url} failed: {e}") from e
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    _record(url, sha256)
+    return blob_path(sha256)
+
+def fetch(name: str, offline: Optional[bool] = None, manifest: Optional[Dict[str, dict]] = None,
+          allow_unpinned: bool = False) -> str:
+    """Return the path of a verified cached copy of an artifact, downloading it if allowed"""
+    manifest = manifest or load_manifest()
+    if name not in manifest:
+        raise ArtifactError(f"{name}: not listed in {MANIFEST_FILE}")
+    url, expected = manifest[name]["url"], manifest[name].get("sha256")
+    trust_on_first_use = not expected and manifest[name].get("trust_on_first_use", False)
+    if not expected and not (allow_unpinned or trust_on_first_use):
+        raise ArtifactError(f"{name}: no sha256 pinned in {MANIFEST_FILE}; pin one from a download you trust")
+    path = _cached(url, expected)
+    if path:
+        return path
+    if OFFLINE if offline is None else offline:
+        raise ArtifactError(f"{name}: not in the cache and offline mode is enabled")
+    path = _download(name, url, expected)
+    if trust_on_first_use:
+        print(f"Warning: {name} has no pinned sha256; trusting this first download of {url} "
+              f"(sha256 {os.path.basename(path)}). Run artifact_cache.py --pin to pin it.")
+    return path
+
+def install(name: str, destination: str, mode: Optional[int] = None, offline: Optional[bool] = None) -> str:
+    """Copy a verified cached artifact to a destination path"""
+    shutil.copyfile(fetch(name, offline=offline), destination)
+    if mode is not None:
+        os.chmod(destination, mode)
+    return destination
+
+def prefetch(names: Optional[List[str]] = None, jobs: int = PREFETCH_JOBS) -> Dict[str, str]:
+    """Download artifacts in parallel; returns each name's path or error message"""
+    manifest = load_manifest()
+    names = names or list(manifest)
+
+    def _fetch(name):
+        try:
+            return fetch(name, offline=False, manifest=manifest)
+        except ArtifactError as e:
+            return f"error: {e}"
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(zip(names, executor.map(_fetch, names)))
+
+def pin(path: str = MANIFEST_FILE):
+    """Record the checksum of every cached artifact that is not pinned yet"""
+    with open(path) as f:
+        document = json.load(f)
+    for name, artifact in document["artifacts"].items():
+        if not artifact.get("sha256"):
+            artifact["sha256"] = os.path.basename(fetch(name, offline=False, manifest=document["artifacts"],
+                                                        allow_unpinned=True))
+            print(f"Pinned {name}: {artifact['sha256']}")
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the installer artifact cache")
+    parser.add_argument("--prefetch", action="store_true", help="Download every artifact in the manifest")
+    parser.add_argument("--pin", action="store_true", help="Record checksums for unpinned artifacts")
+    parser.add_argument("--jobs", type=int, default=PREFETCH_JOBS, help="Parallel downloads")
+    args = parser.parse_args()
+
+    if args.prefetch:
+        failed = False
+        for name, result in prefetch(jobs=args.jobs).items():
+            print(f"{name}: {result}")
+            failed = failed or result.startswith("error:")
+        if failed:
+            sys.exit(1)
+    if args.pin:
+        pin()
+    if not (args.prefetch or args.pin):
+        manifest = load_manifest()
+        for name, artifact in manifest.items():
+            state = "cached" if _cached(artifact["url"], artifact.get("sha256")) else "missing"
+            pinned = "pinned" if artifact.get("sha256") else \
+                "trusted on first use" if artifact.get("trust_on_first_use") else "unpinned"
+            print(f"{name}: {state}, {pinned} ({artifact['url']})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Size an AWX deployment to the host it runs on
+
+Turns measured cores, memory and free disk into AWX custom resource fields:
+web and task replicas, container requests and limits, the task capacity AWX
+advertises, and Postgres settings and storage. A slice of the host is kept
+back for the OS and the Kind control plane, and the rest is split between
+the clusters on the host:
+
+    python ansible/awx_sizing.py                               # size for this host
+    python ansible/awx_sizing.py --cores 64 --memory-gb 256 --disk-gb 1000
+    python ansible/setup_awx_tower.py --size-preview           # what --auto-size would deploy
+    python ansible/setup_awx_tower.py --auto-size
+"""
+import argparse
+import json
+import math
+import os
+from typing import Dict, List, NamedTuple
+
+import resource_sampler
+
+# Kept back for the OS, Docker and the Kind control plane
+RESERVED_CPU_FRACTION = 0.1
+RESERVED_MIN_CORES = 1.0
+RESERVED_MEMORY_FRACTION = 0.1
+RESERVED_MIN_MEMORY_GB = 2.0
+# Share of a cluster's budget per component, summed over its replicas; job pods get the rest
+SHARES = {"web": 0.15, "task": 0.15, "ee": 0.05, "redis": 0.03, "postgres": 0.2}
+# Smallest useful size per replica: (cores, MiB)
+FLOORS = {"web": (0.1, 512), "task": (0.1, 512), "ee": (0.1, 256), "redis": (0.05, 64), "postgres": (0.1, 256)}
+# Limits allow bursts above the request: CPU is throttled, memory is not, so keep it tighter
+CPU_LIMIT_FACTOR = 2.0
+MEMORY_LIMIT_FACTOR = 1.5
+CORES_PER_WEB_REPLICA = 16
+CORES_PER_TASK_REPLICA = 12
+MAX_WEB_REPLICAS = 3
+MAX_TASK_REPLICAS = 4
+# What one automation job pod needs: (cores, MiB)
+JOB_POD = (0.5, 512)
+# AWX gives each job this many forks per core and needs this much memory per fork (MiB)
+SYSTEM_TASK_FORKS_CPU = 4
+SYSTEM_TASK_FORKS_MEM = 100
+# Memory AWX subtracts before counting forks (MiB)
+AWX_BASE_MEMORY_MB = 2048
+POSTGRES_MIN_CONNECTIONS = 200
+POSTGRES_MAX_CONNECTIONS = 1000
+POSTGRES_CONNECTIONS_PER_REPLICA = 200
+POSTGRES_STORAGE_FRACTION = 0.25
+POSTGRES_MIN_STORAGE_GB = 8
+POSTGRES_MAX_STORAGE_GB = 100
+
+class HostResources(NamedTuple):
+    cpu_cores: float
+    memory_gb: float
+    disk_free_gb: float
+
+class ContainerSize(NamedTuple):
+    cores: float
+    memory_mb: int
+
+    def requirements(self) -> dict:
+        """Kubernetes resource requirements with burst room in the limits"""
+        return {"requests": {"cpu": cpu_quantity(self.cores), "memory": memory_quantity(self.memory_mb)},
+                "limits": {"cpu": cpu_quantity(self.cores * CPU_LIMIT_FACTOR),
+                           "memory": memory_quantity(int(self.memory_mb * MEMORY_LIMIT_FACTOR))}}
+
+class AwxSizing(NamedTuple):
+    host: HostResources
+    budget: HostResources
+    clusters: int
+    web_replicas: int
+    task_replicas: int
+    containers: Dict[str, ContainerSize]
+    job_slots: int
+    postgres_settings: Dict[str, str]
+    postgres_storage_gb: int
+
+    def task_capacity(self) -> Dict[str, str]:
+        """Detected CPU and memory overrides, so each task pod's capacity matches its share of the job slots"""
+        jobs_per_replica = math.ceil(self.job_slots / self.task_replicas)
+        cores = max(1, math.ceil(jobs_per_replica / SYSTEM_TASK_FORKS_CPU))
+        memory_mb = AWX_BASE_MEMORY_MB + jobs_per_replica * SYSTEM_TASK_FORKS_MEM
+        return {"SYSTEM_TASK_ABS_CPU": str(cores), "SYSTEM_TASK_ABS_MEM": memory_quantity(memory_mb)}
+
+    def spec(self) -> Dict[str, object]:
+        """AWX custom resource spec fields"""
+        return {
+            "web_replicas": self.web_replicas,
+            "task_replicas": self.task_replicas,
+            "web_resource_requirements": self.containers["web"].requirements(),
+            "task_resource_requirements": self.containers["task"].requirements(),
+            "ee_resource_requirements": self.containers["ee"].requirements(),
+            "redis_resource_requirements": self.containers["redis"].requirements(),
+            "postgres_resource_requirements": self.containers["postgres"].requirements(),
+            "postgres_storage_requirements": {"requests": {"storage": f"{self.postgres_storage_gb}Gi"}},
+            "postgres_extra_args": [arg for name, value in self.postgres_settings.items()
+                                    for arg in ("-c", f"{name}={value}")],
+            "extra_settings": [{"setting": name, "value": json.dumps(value)}
+                               for name, value in self.task_capacity().items()]
+        }
+
+    def describe(self) -> str:
+        """A preview table of the sizing"""
+        lines = [f"Host: {self.host.cpu_cores:g} cores, {self.host.memory_gb:.1f}GB memory, "
+                 f"{self.host.disk_free_gb:.0f}GB free disk",
+                 f"Budget per cluster ({self.clusters} on this host): {self.budget.cpu_cores:.1f} cores, "
+                 f"{self.budget.memory_gb:.1f}GB memory",
+                 "",
+                 f"{'Container':<10}{'Replicas':>9}{'CPU request':>13}{'CPU limit':>11}{'Mem request':>13}{'Mem limit':>11}"]
+        replicas = container_replicas(self.web_replicas, self.task_replicas)
+        for name, size in self.containers.items():
+            requirements = size.requirements()
+            lines.append(f"{name:<10}{replicas[name]:>9}{requirements['requests']['cpu']:>13}"
+                         f"{requirements['limits']['cpu']:>11}{requirements['requests']['memory']:>13}"
+                         f"{requirements['limits']['memory']:>11}")
+        capacity = self.task_capacity()
+        lines += ["",
+                  f"Concurrent job pods: {self.job_slots} ({cpu_quantity(JOB_POD[0])} CPU, "
+                  f"{memory_quantity(JOB_POD[1])} each)",
+                  f"Task capacity per task pod: SYSTEM_TASK_ABS_CPU={capacity['SYSTEM_TASK_ABS_CPU']}, "
+                  f"SYSTEM_TASK_ABS_MEM={capacity['SYSTEM_TASK_ABS_MEM']}",
+                  f"Postgres: {', '.join(f'{k}={v}' for k, v in self.postgres_settings.items())}",
+                  f"Postgres storage: {self.postgres_storage_gb}Gi"]
+        return "\n".join(lines)
+
+def cpu_quantity(cores: float) -> str:
+    return f"{round(cores * 1000)}m" if cores < 10 else str(round(cores))
+
+def memory_quantity(megabytes: int) -> str:
+    return f"{megabytes // 1024}Gi" if megabytes >= 8192 else f"{megabytes}Mi"
+
+def measure_host() -> HostResources:
+    """Cores, memory and free disk of this host, read the same way as check_system_resources()"""
+    return HostResources(float(os.cpu_count() or 1),
+                         resource_sampler.read_meminfo()["MemTotal"] / (1024 * 1024),
+                         resource_sampler.disk_usage_gb("/")["free"])
+
+def _clamp(value: float, low: float, high: float) -> float:
+    return max(low, min(value, high))
+
+def container_replicas(web_replicas: int, task_replicas: int) -> Dict[str, int]:
+    """How many copies of each container run; redis is a sidecar of both the web and task pods"""
+    return {"web": web_replicas, "task": task_replicas, "ee": task_replicas,
+            "redis": web_replicas + task_replicas, "postgres": 1}
+
+def postgres_settings(size: ContainerSize, connections: int) -> Dict[str, str]:
+    """Memory and parallelism settings for a Postgres container of the given size"""
+    memory = size.memory_mb
+    workers = max(2, math.ceil(size.cores))
+    return {
+        "max_connections": str(connections),
+        "shared_buffers": f"{memory // 4}MB",
+        "effective_cache_size": f"{memory * 3 // 4}MB",
+        "maintenance_work_mem": f"{min(memory // 16, 2048)}MB",
+        "work_mem": f"{max(4, memory // 4 // connections)}MB",
+        "max_worker_processes": str(max(8, workers)),
+        "max_parallel_workers": str(workers),
+        "max_parallel_workers_per_gather": str(max(1, workers // 2)),
+        # Kind volumes sit on the host's local disk
+        "random_page_cost": "1.1"
+    }
+
+def size_awx(host: HostResources, clusters: int = 1) -> AwxSizing:
+    """Size AWX for one of `clusters` clusters sharing the host"""
+    if clusters < 1:
+        raise ValueError(f"cannot size AWX for {clusters} clusters")
+    reserved_cores = max(RESERVED_MIN_CORES, host.cpu_cores * RESERVED_CPU_FRACTION)
+    reserved_memory = max(RESERVED_MIN_MEMORY_GB, host.memory_gb * RESERVED_MEMORY_FRACTION)
+    budget = HostResources(max(host.cpu_cores - reserved_cores, 1.0) / clusters,
+                           max(host.memory_gb - reserved_memory, 1.0) / clusters,
+                           host.disk_free_gb / clusters)
+    web_replicas = int(_clamp(budget.cpu_cores // CORES_PER_WEB_REPLICA, 1, MAX_WEB_REPLICAS))
+    task_replicas = int(_clamp(budget.cpu_cores // CORES_PER_TASK_REPLICA, 1, MAX_TASK_REPLICAS))
+    replicas = container_replicas(web_replicas, task_replicas)
+
+    containers = {}
+    for name, share in SHARES.items():
+        floor_cores, floor_memory = FLOORS[name]
+        containers[name] = ContainerSize(
+            round(max(budget.cpu_cores * share / replicas[name], floor_cores), 2),
+            int(max(budget.memory_gb * 1024 * share / replicas[name], floor_memory)))
+
+    job_cores = budget.cpu_cores * (1 - sum(SHARES.values()))
+    job_memory = budget.memory_gb * 1024 * (1 - sum(SHARES.values()))
+    job_slots = max(1, int(min(job_cores / JOB_POD[0], job_memory / JOB_POD[1])))
+    connections = int(_clamp(POSTGRES_CONNECTIONS_PER_REPLICA * (web_replicas + task_replicas),
+                             POSTGRES_MIN_CONNECTIONS, POSTGRES_MAX_CONNECTIONS))
+    storage = int(_clamp(budget.disk_free_gb * POSTGRES_STORAGE_FRACTION, POSTGRES_MIN_STORAGE_GB,
+                         POSTGRES_MAX_STORAGE_GB))
+    return AwxSizing(host, budget, clusters, web_replicas, task_replicas, containers, job_slots,
+                     postgres_settings(containers["postgres"], connections), storage)
+
+def to_yaml(value, indent: int = 0) -> List[str]:
+    """Render nested dicts, lists and scalars as block YAML lines; strings are quoted JSON-style"""
+    pad = " " * indent
+    lines = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if isinstance(item, (dict, list)) and item:
+                lines.append(f"{pad}{key}:")
+                lines.extend(to_yaml(item, indent + 2))
+            else:
+                lines.append(f"{pad}{key}: {json.dumps(item)}")
+    else:
+        for item in value:
+            if isinstance(item, (dict, list)) and item:
+                nested = to_yaml(item, indent + 2)
+                lines.append(f"{pad}- {nested[0].lstrip()}")
+                lines.extend(nested[1:])
+            else:
+                lines.append(f"{pad}- {json.dumps(item)}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Preview AWX sizing for this or another host")
+    parser.add_argument("--cores", type=float, help="CPU cores instead of the measured count")
+    parser.add_argument("--memory-gb", type=float, help="Memory instead of the measured total")
+    parser.add_argument("--disk-gb", type=float, help="Free disk instead of the measured space")
+    parser.add_argument("--clusters", type=int, default=1, help="AWX clusters sharing the host")
+    parser.add_argument("--json", action="store_true", help="Print the spec fields as JSON")
+    args = parser.parse_args()
+    if args.clusters < 1:
+        parser.error("--clusters must be at least 1")
+    if any(value is not None and value < 0 for value in (args.cores, args.memory_gb, args.disk_gb)):
+        parser.error("--cores, --memory-gb and --disk-gb cannot be negative")
+
+    measured = measure_host()
+    # An explicit 0 is a host to size for, not a request to measure this one
+    host = HostResources(measured.cpu_cores if args.cores is None else args.cores,
+                         measured.memory_gb if args.memory_gb is None else args.memory_gb,
+                         measured.disk_free_gb if args.disk_gb is None else args.disk_gb)
+    sizing = size_awx(host, args.clusters)
+    if args.json:
+        print(json.dumps(sizing.spec(), indent=2))
+        return
+    print(sizing.describe())
+    print("\nAWX spec fields:")
+    print("\n".join(to_yaml(sizing.spec(), 2)))
+
+if __name__ == "__main__":
+    main()
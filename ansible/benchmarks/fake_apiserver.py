@@ -0,0 +1,195 @@
+"""Stand-in Kubernetes API server for exercising kube_client offline
+
+Serves the small part of the API the AWX scripts use: discovery, get and
+list with equality label selectors, watch, the deployment scale subresource,
+server-side apply, /version and /readyz. Objects live in memory and start out
+as a fully ready AWX deployment. Connections are kept alive, like a real API
+server's.
+
+    python ansible/benchmarks/fake_apiserver.py --port 8001 --kubeconfig /tmp/fake-kubeconfig
+    KUBECONFIG=/tmp/fake-kubeconfig python ansible/setup_awx_tower.py --start
+"""
+import argparse
+import base64
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+KUBE_SYSTEM_UID = "6f1c2a0e-0000-4000-8000-00000000beef"
+# API group version -> [(plural, kind, namespaced)]
+DISCOVERY = {
+    "v1": [("namespaces", "Namespace", False), ("pods", "Pod", True), ("secrets", "Secret", True),
+           ("services", "Service", True)],
+    "apps/v1": [("deployments", "Deployment", True), ("statefulsets", "StatefulSet", True)],
+    "batch/v1": [("jobs", "Job", True)],
+    "awx.ansible.com/v1beta1": [("awxs", "AWX", True)]
+}
+PATH_PATTERN = re.compile(r"^/apis?/(?P<version>.+?)(?:/namespaces/(?P<namespace>[^/]+))?/(?P<plural>[a-z]+)"
+                          r"(?:/(?P<name>[^/]+))?(?P<scale>/scale)?$")
+
+def ready_awx_objects() -> Dict[Tuple[str, str, str], dict]:
+    """Objects of a ready AWX deployment, keyed by (plural, namespace, name)"""
+    managed = {"app.kubernetes.io/managed-by": "awx-operator"}
+    objects = [
+        ("namespaces", "", {"metadata": {"name": "kube-system", "uid": KUBE_SYSTEM_UID}}),
+        ("nodes", "", {"metadata": {"name": "awx-cluster-control-plane"},
+                       "status": {"conditions": [{"type": "Ready", "status": "True"}]}}),
+        ("deployments", "default", {"metadata": {"name": "awx-operator-controller-manager"},
+                                    "spec": {"replicas": 1}, "status": {"availableReplicas": 1}}),
+        ("deployments", "default", {"metadata": {"name": "awx-web", "labels": managed},
+                                    "spec": {"replicas": 1}, "status": {"availableReplicas": 1}}),
+        ("deployments", "default", {"metadata": {"name": "awx-task", "labels": managed},
+                                    "spec": {"replicas": 1}, "status": {"availableReplicas": 1}}),
+        ("jobs", "default", {"metadata": {"name": "awx-migration-24.6.1"}, "status": {"succeeded": 1}}),
+        ("services", "default", {"metadata": {"name": "awx-service", "labels": managed},
+                                 "spec": {"type": "NodePort", "ports": [{"port": 80, "nodePort": 30080}]}}),
+        ("awxs", "default", {"metadata": {"name": "awx"},
+                             "status": {"conditions": [{"type": "Running", "status": "True"},
+                                                       {"type": "Successful", "status": "True"}]}}),
+        ("secrets", "default", {"metadata": {"name": "awx-admin-password"},
+                                "data": {"password": base64.b64encode(b"stand-in-password").decode()}})
+    ]
+    for name in ("awx-web-0", "awx-task-0", "awx-postgres-15-0"):
+        objects.append(("pods", "default", {"metadata": {"name": name, "labels": managed},
+                                            "status": {"phase": "Running",
+                                                       "conditions": [{"type": "Ready", "status": "True"}]}}))
+    return {(plural, namespace, body["metadata"]["name"]): body for plural, namespace, body in objects}
+
+class FakeApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int]):
+        super().__init__(address, ApiHandler)
+        self.objects = ready_awx_objects()
+        self.resource_version = 1
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this Nagle delays every keep-alive reply
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body, content_type: str = "application/json"):
+        data = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self, what: str):
+        self._reply(404, {"kind": "Status", "status": "Failure", "message": f"{what} not found", "code": 404})
+
+    def _items(self, plural: str, namespace: str, selector: str) -> list:
+        wanted = dict(term.split("=", 1) for term in selector.split(",") if "=" in term)
+        return [body for (kind, ns, _), body in sorted(self.server.objects.items())
+                if kind == plural and (not namespace or ns == namespace)
+                and all(body["metadata"].get("labels", {}).get(k) == v for k, v in wanted.items())]
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        with self.server.lock:
+            self.server.requests += 1
+        if url.path == "/version":
+            return self._reply(200, {"major": "1", "minor": "27", "gitVersion": "v1.27.3"})
+        if url.path in ("/readyz", "/livez", "/healthz"):
+            return self._reply(200, "ok", "text/plain")
+        version = url.path[len("/api/"):] if url.path == "/api/v1" else url.path[len("/apis/"):]
+        if version in DISCOVERY:
+            return self._reply(200, {"kind": "APIResourceList", "groupVersion": version,
+                                     "resources": [{"name": plural, "kind": kind, "namespaced": namespaced}
+                                                   for plural, kind, namespaced in DISCOVERY[version]]})
+        match = PATH_PATTERN.match(url.path)
+        if not match:
+            return self._not_found(url.path)
+        plural, namespace, name = match["plural"], match["namespace"] or "", match["name"]
+        if name:
+            body = self.server.objects.get((plural, namespace, name))
+            return self._reply(200, body) if body else self._not_found(f"{plural} {name!r}")
+        items = self._items(plural, namespace, query.get("labelSelector", ""))
+        if query.get("watch") in ("1", "true"):
+            return self._watch(items)
+        self._reply(200, {"kind": "List", "metadata": {"resourceVersion": str(self.server.resource_version)},
+                          "items": items})
+
+    def _watch(self, items: list):
+        """Stream an ADDED event per object and end the watch, as a server timeout would"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for body in items:
+            line = json.dumps({"type": "ADDED", "object": body}).encode() + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_PATCH(self):
+        url = urlsplit(self.path)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        match = PATH_PATTERN.match(url.path)
+        if not match or not match["name"]:
+            return self._not_found(url.path)
+        key = (match["plural"], match["namespace"] or "", match["name"])
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.resource_version += 1
+            if match["scale"]:
+                if key not in self.server.objects:
+                    return self._not_found(f"{key[0]} {key[2]!r}")
+                replicas = body["spec"]["replicas"]
+                self.server.objects[key].setdefault("spec", {})["replicas"] = replicas
+                self.server.objects[key].setdefault("status", {})["availableReplicas"] = replicas
+                return self._reply(200, {"kind": "Scale", "spec": {"replicas": replicas}})
+            # Server-side apply: create or replace the object
+            body.setdefault("metadata", {})["resourceVersion"] = str(self.server.resource_version)
+            self.server.objects[key] = body
+        self._reply(200, body)
+
+def write_kubeconfig(path: str, server_url: str):
+    """Write a kubeconfig (as JSON, which is valid YAML) pointing at the stand-in server"""
+    config = {
+        "apiVersion": "v1", "kind": "Config", "current-context": "kind-fake",
+        "clusters": [{"name": "kind-fake", "cluster": {"server": server_url}}],
+        "users": [{"name": "kind-fake", "user": {"token": "fake-token"}}],
+        "contexts": [{"name": "kind-fake", "context": {"cluster": "kind-fake", "user": "kind-fake"}}]
+    }
+    with open(path, "w") as f:
+        json.dump(config, f, indent=2)
+
+def serve(port: int = 0) -> FakeApiServer:
+    """Start a stand-in API server on a background thread"""
+    server = FakeApiServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stand-in Kubernetes API server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--kubeconfig", help="Write a kubeconfig for the server to this path")
+    args = parser.parse_args()
+    server = FakeApiServer(("127.0.0.1", args.port))
+    if args.kubeconfig:
+        write_kubeconfig(args.kubeconfig, server.url)
+    print(f"Serving a stand-in API server at {server.url}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
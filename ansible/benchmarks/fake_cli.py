@@ -0,0 +1,161 @@
+"""Fake docker/kubectl/helm/kind/apt/dnf/conda/pip/ansible-galaxy used by the benchmark harness
+
+The harness installs this file under each tool's name in a private bin
+directory. The tool being faked is taken from argv[0]; latency and output
+volume come from the JSON file named by FAKE_CLI_CONFIG, and cluster state
+is kept in the directory named by FAKE_CLI_STATE.
+"""
+import base64
+import json
+import os
+import sys
+import time
+
+TOOL = os.path.basename(sys.argv[0])
+ARGS = sys.argv[1:]
+
+def load_config() -> dict:
+    with open(os.environ["FAKE_CLI_CONFIG"]) as f:
+        return json.load(f)
+
+def clusters_file() -> str:
+    return os.path.join(os.environ["FAKE_CLI_STATE"], "kind-clusters")
+
+def read_clusters() -> list:
+    try:
+        with open(clusters_file()) as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
+
+def write_clusters(clusters: list):
+    with open(clusters_file(), "w") as f:
+        f.write("".join(f"{name}\n" for name in clusters))
+
+def option(name: str, default: str = "") -> str:
+    return ARGS[ARGS.index(name) + 1] if name in ARGS and ARGS.index(name) + 1 < len(ARGS) else default
+
+def ready_objects(kinds: str) -> dict:
+    """Kubernetes list responses in which every AWX component is ready; kinds may be comma-separated"""
+    items = {
+        "deployments": [{"kind": "Deployment", "metadata": {"name": "awx-operator-controller-manager"},
+                         "status": {"availableReplicas": 1}},
+                        {"kind": "Deployment", "metadata": {"name": "awx-web"}, "status": {"availableReplicas": 1}},
+                        {"kind": "Deployment", "metadata": {"name": "awx-task"}, "status": {"availableReplicas": 1}}],
+        "pods": [{"kind": "Pod", "metadata": {"name": name},
+                  "status": {"phase": "Running", "conditions": [{"type": "Ready", "status": "True"}]}}
+                 for name in ("awx-web-0", "awx-task-0", "awx-postgres-15-0")],
+        "jobs": [{"kind": "Job", "metadata": {"name": "awx-migration-24.6.1"}, "status": {"succeeded": 1}}],
+        "services": [{"kind": "Service", "metadata": {"name": "awx-service"},
+                      "spec": {"type": "NodePort", "ports": [{"port": 80, "nodePort": 30080}]}}],
+        "secrets": [{"kind": "Secret", "metadata": {"name": "awx-admin-password"}, "type": "Opaque"}],
+        "awxs": [{"kind": "AWX", "metadata": {"name": "awx"},
+                 "status": {"conditions": [{"type": "Running", "status": "True"},
+                                           {"type": "Successful", "status": "True"}]}}]
+    }
+    return {"apiVersion": "v1", "kind": "List",
+            "items": [item for kind in kinds.split(",") for item in items.get(kind, [])]}
+
+def kubectl(config: dict) -> str:
+    if ARGS[:1] == ["version"]:
+        return "Client Version: v1.32.0\nKustomize Version: v5.5.0"
+    if ARGS[:1] == ["cluster-info"]:
+        return "Kubernetes control plane is running at https://127.0.0.1:6443"
+    if ARGS[:2] == ["get", "namespace"]:
+        return "6f1c2a0e-0000-4000-8000-00000000beef"
+    if ARGS[:2] == ["get", "secret"]:
+        return base64.b64encode(b"benchmark-password").decode()
+    if ARGS[:1] == ["get"] and "json" in option("-o"):
+        return json.dumps(ready_objects(ARGS[1]))
+    if ARGS[:2] == ["get", "nodes"]:
+        return "NAME                        STATUS   ROLES           AGE   VERSION\nawx-cluster-control-plane   Ready    control-plane   1m    v1.27.3"
+    return filler(config)
+
+def kind(config: dict) -> str:
+    clusters = read_clusters()
+    name = option("--name", "kind")
+    if ARGS[:1] == ["version"]:
+        return "kind v0.20.0 go1.20.4 linux/amd64"
+    if ARGS[:2] == ["get", "clusters"]:
+        return "\n".join(clusters)
+    if ARGS[:2] == ["create", "cluster"]:
+        write_clusters(clusters + [name])
+    elif ARGS[:2] == ["delete", "cluster"]:
+        write_clusters([c for c in clusters if c != name])
+    return filler(config)
+
+def pip(config: dict) -> str:
+    count = config.get("outdated_packages", 0)
+    if ARGS[:1] == ["--version"]:
+        return "pip 25.0 from /fake/site-packages/pip (python 3.11)"
+    if ARGS[:1] == ["list"] and "--outdated" in ARGS:
+        return json.dumps([{"name": f"fakepkg{i}", "version": "1.0", "latest_version": "1.1",
+                            "latest_filetype": "wheel"} for i in range(count)])
+    if ARGS[:1] == ["show"]:
+        # Each package depends on the one before it
+        return "\n---\n".join(f"Name: {name}\nVersion: 1.0\nRequires: {ARGS[i] if i else ''}"
+                              for i, name in enumerate(ARGS[1:], start=0))
+    return filler(config)
+
+def apt(config: dict) -> str:
+    if ARGS[:2] == ["list", "--upgradable"]:
+        return "Listing...\n" + "\n".join(f"fakedeb{i}/stable 1.1 amd64 [upgradable from: 1.0]"
+                                            for i in range(config.get("outdated_packages", 0)))
+    return filler(config)
+
+def dnf(config: dict) -> str:
+    if ARGS[:1] == ["check-update"]:
+        return "\n".join(f"fakerpm{i}.x86_64    1.1-1    fake-repo" for i in range(config.get("outdated_packages", 0)))
+    return filler(config)
+
+def conda(config: dict) -> str:
+    if ARGS[:1] == ["info"] and "--json" in ARGS:
+        return json.dumps({"active_prefix": "/fake/conda", "root_prefix": "/fake/conda",
+                           "envs": ["/fake/conda", "/fake/conda/envs/tools"]})
+    if "--dry-run" in ARGS and "--json" in ARGS:
+        return json.dumps({"actions": {"LINK": [{"name": f"fakeconda{i}", "version": "1.1"}
+                                                for i in range(config.get("outdated_packages", 0))]}})
+    return filler(config)
+
+def ansible_galaxy(config: dict) -> str:
+    if ARGS[:2] == ["collection", "download"]:
+        target = option("-p", ".")
+        os.makedirs(target, exist_ok=True)
+        with open(option("-r")) as f:
+            names = [line.split("name:", 1)[1].strip() for line in f if "name:" in line]
+        for name in names:
+            open(os.path.join(target, f"{name.replace('.', '-')}-1.0.0.tar.gz"), "w").close()
+    return filler(config)
+
+def filler(config: dict) -> str:
+    lines = config.get("output_lines", {}).get(TOOL, config.get("default_output_lines", 0))
+    return "\n".join(f"{TOOL}: fake progress output line {i}" for i in range(lines))
+
+HANDLERS = {
+    "docker": lambda config: "Docker version 24.0.7, build fake" if ARGS[:1] == ["--version"] else filler(config),
+    "kubectl": kubectl,
+    "helm": lambda config: 'version.BuildInfo{Version:"v3.16.2"}' if ARGS[:1] == ["version"] else filler(config),
+    "kind": kind,
+    "pip": pip,
+    "apt": apt,
+    "dnf": dnf,
+    "conda": conda,
+    "ansible-galaxy": ansible_galaxy
+}
+
+def main():
+    if TOOL == "sudo":
+        # Drop sudo's own options and run the real (fake) command
+        args = ARGS
+        while args and args[0].startswith("-"):
+            args = args[1:]
+        os.execvp(args[0], args)
+
+    config = load_config()
+    time.sleep(config.get("latency", {}).get(TOOL, config.get("default_latency", 0.0)))
+    output = HANDLERS.get(TOOL, filler)(config)
+    if output:
+        sys.stdout.write(output + "\n")
+
+if __name__ == "__main__":
+    main()
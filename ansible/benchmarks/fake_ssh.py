@@ -0,0 +1,51 @@
+"""Stand-in for ssh used to exercise rolling_upgrade.py without real hosts
+
+Accepts ssh's command line, pretends to run the remote command on the
+target host and prints a few lines of simulated upgrade output. Behaviour
+is controlled through the environment:
+
+    FAKE_SSH_LATENCY     seconds each "upgrade" takes (default 0.5)
+    FAKE_SSH_FAIL_HOSTS  comma-separated hosts whose upgrade fails
+    FAKE_SSH_EXEC=1      really run the remote command locally instead
+
+The tar stream rolling_upgrade.py sends to copy its files is read and
+discarded unless FAKE_SSH_EXEC is set.
+"""
+import os
+import subprocess
+import sys
+import time
+
+# ssh options that take a value
+OPTIONS_WITH_VALUE = set("bcDEeFIiJLlmOoPpRSWw")
+
+def parse(args: list) -> tuple:
+    """Return (target host, remote command) from an ssh argument list"""
+    index = 0
+    while index < len(args) and args[index].startswith("-"):
+        option = args[index][1:]
+        index += 2 if option in OPTIONS_WITH_VALUE else 1
+    target = args[index].rsplit("@", 1)[-1]
+    return target, " ".join(args[index + 1:])
+
+def main():
+    host, command = parse(sys.argv[1:])
+    if os.environ.get("FAKE_SSH_EXEC") == "1":
+        sys.exit(subprocess.run(command, shell=True, env=dict(os.environ, ROLLING_UPGRADE_HOST=host)).returncode)
+
+    if command.startswith("mkdir -p") and "tar -C" in command:
+        sys.stdin.buffer.read()
+        return
+
+    latency = float(os.environ.get("FAKE_SSH_LATENCY", "0.5"))
+    print(f"Running on {host}: {command}", flush=True)
+    for step in ("Updating package index", "Downloading upgrades", "Installing upgrades"):
+        time.sleep(latency / 3)
+        print(f"{step}...", flush=True)
+    if host in os.environ.get("FAKE_SSH_FAIL_HOSTS", "").split(","):
+        print("E: Could not get lock /var/lib/dpkg/lock-frontend", file=sys.stderr)
+        sys.exit(100)
+    print("Upgrade process completed.")
+
+if __name__ == "__main__":
+    main()
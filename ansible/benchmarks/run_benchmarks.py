@@ -0,0 +1,233 @@
+"""Benchmark the provisioning scripts offline against fake CLI tools
+
+Each scenario runs one entry point (setup main(), start_awx(), cleanup_awx()
+or the upgrade flow) in a fresh interpreter with fake docker, kubectl, helm,
+kind, apt, dnf, conda, pip and ansible-galaxy executables first on PATH. The
+end-to-end wall time and the per-tool command timings recorded by the
+command engine are compared against a stored baseline. With --api-server a
+stand-in Kubernetes API server is started as well, so the setup scenarios use
+the in-process API client instead of the fake kubectl.
+
+    python ansible/benchmarks/run_benchmarks.py
+    python ansible/benchmarks/run_benchmarks.py --latency 0.2 --scenario upgrade
+    python ansible/benchmarks/run_benchmarks.py --api-server --scenario start_awx
+    python ansible/benchmarks/run_benchmarks.py --update-baseline
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import fake_apiserver
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.dirname(BENCHMARK_DIR)
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, "baseline.json")
+FAKE_TOOLS = ["docker", "kubectl", "helm", "kind", "apt", "apt-get", "dnf", "yum", "conda", "pip",
+              "ansible-galaxy", "curl", "sudo"]
+# A scenario regresses when it is this much slower than the baseline
+DEFAULT_THRESHOLD = 0.20
+# Lines of a failed scenario's output kept for the report; the sandbox is removed
+LOG_TAIL_LINES = 20
+# setup_awx_tower's deploy journal, which records who created the Kind cluster
+DEPLOY_JOURNAL = ".awx-deploy-state.json"
+
+# Host requirement checks are not what is being measured, so any box can run the suite
+NO_HOST_REQUIREMENTS = {"REQUIRED_MEMORY_GB": 0, "REQUIRED_CPU_CORES": 0, "REQUIRED_DISK_SPACE_GB": 0}
+
+# scenario name -> (module, function, clusters that already exist, module overrides)
+SCENARIOS = {
+    "setup_main": ("setup_awx_tower", "main", [], NO_HOST_REQUIREMENTS),
+    "start_awx": ("setup_awx_tower", "start_awx", ["awx-cluster"], {}),
+    "cleanup_awx": ("setup_awx_tower", "cleanup_awx", ["awx-cluster"], {}),
+    "upgrade": ("upgrade_server_components", "main", [], {})
+}
+
+BOOTSTRAP = """
+import importlib, sys
+sys.path.insert(0, {script_dir!r})
+import command_runner
+command_runner.engine.report_at_exit({report!r})
+module = importlib.import_module({module!r})
+vars(module).update({overrides!r})
+getattr(module, {function!r})()
+"""
+
+def install_fake_tools(bin_dir: str):
+    """Install the fake CLI under every tool name it impersonates"""
+    with open(os.path.join(BENCHMARK_DIR, "fake_cli.py")) as f:
+        source = f.read()
+    for tool in FAKE_TOOLS:
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\n{source}")
+        os.chmod(path, 0o755)
+
+def run_scenario(name: str, config: dict) -> dict:
+    """Run one scenario in a private sandbox and return its timings"""
+    module, function, clusters, overrides = SCENARIOS[name]
+    sandbox = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        bin_dir, state_dir, home = (os.path.join(sandbox, d) for d in ("bin", "state", "home"))
+        for directory in (bin_dir, state_dir, home):
+            os.makedirs(directory)
+        install_fake_tools(bin_dir)
+        config_file = os.path.join(sandbox, "config.json")
+        with open(config_file, "w") as f:
+            json.dump(config, f)
+        with open(os.path.join(state_dir, "kind-clusters"), "w") as f:
+            f.write("".join(f"{cluster}\n" for cluster in clusters))
+        if clusters:
+            # The clusters stand in for ones an earlier setup run created, as its deploy journal records
+            with open(os.path.join(sandbox, DEPLOY_JOURNAL), "w") as f:
+                json.dump({"cluster_uid": "", "steps": {}, "kind_cluster_owner": "setup"}, f)
+
+        api_server = None
+        if config.get("api_server"):
+            api_server = fake_apiserver.serve()
+            os.makedirs(os.path.join(home, ".kube"))
+            fake_apiserver.write_kubeconfig(os.path.join(home, ".kube", "config"), api_server.url)
+
+        report = os.path.join(sandbox, "commands.json")
+        env = dict(os.environ, PATH=f"{bin_dir}{os.pathsep}/usr/bin{os.pathsep}/bin", HOME=home,
+                   FAKE_CLI_CONFIG=config_file, FAKE_CLI_STATE=state_dir)
+        env.pop("DEVOPS_COMMAND_LOG", None)
+        code = BOOTSTRAP.format(script_dir=SCRIPT_DIR, report=report, module=module,
+                                function=function, overrides=overrides)
+
+        log_path = os.path.join(sandbox, f"{name}.log")
+        started = time.monotonic()
+        with open(log_path, "w") as log:
+            result = subprocess.run([sys.executable, "-c", code], cwd=sandbox, env=env,
+                                    stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+        wall_seconds = time.monotonic() - started
+        if api_server:
+            api_server.shutdown()
+
+        try:
+            with open(report) as f:
+                by_tool = json.load(f)["by_tool"]
+        except (OSError, ValueError):
+            by_tool = {}
+        log_tail = []
+        if result.returncode != 0:
+            with open(log_path, errors="replace") as f:
+                log_tail = f.read().splitlines()[-LOG_TAIL_LINES:]
+        return {"returncode": result.returncode, "wall_seconds": wall_seconds, "log_tail": log_tail,
+                "steps": {tool: round(totals["wall_seconds"], 4) for tool, totals in by_tool.items()},
+                "commands": sum(totals["commands"] for totals in by_tool.values()),
+                "api_requests": api_server.requests if api_server else 0}
+    finally:
+        shutil.rmtree(sandbox, ignore_errors=True)
+
+def run_benchmarks(scenarios: List[str], config: dict, repeat: int) -> Dict[str, dict]:
+    """Run every scenario ``repeat`` times and keep the median run"""
+    results = {}
+    for name in scenarios:
+        runs = [run_scenario(name, config) for _ in range(repeat)]
+        failed = [run for run in runs if run["returncode"] != 0]
+        median = statistics.median(run["wall_seconds"] for run in runs)
+        chosen = min(runs, key=lambda run: abs(run["wall_seconds"] - median))
+        results[name] = dict(chosen, wall_seconds=round(median, 4), failures=len(failed))
+        status = f"FAILED ({len(failed)}/{repeat})" if failed else "ok"
+        print(f"{name:<14}{median:>9.3f}s  {chosen['commands']:>4} commands  {chosen['api_requests']:>4} API requests  {status}")
+        for line in failed[0]["log_tail"] if failed else []:
+            print(f"    {line}")
+    return results
+
+def compare(results: Dict[str, dict], baseline: dict, config: dict, threshold: float) -> List[str]:
+    """Print current vs baseline timings and return the scenarios that regressed"""
+    if baseline.get("config") != config:
+        print("\nWarning: baseline was recorded with a different fake CLI configuration")
+    regressions = []
+    print(f"\n{'Scenario':<14}{'Baseline s':>12}{'Current s':>12}{'Change':>9}")
+    for name, result in results.items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            print(f"{name:<14}{'-':>12}{result['wall_seconds']:>12.3f}{'new':>9}")
+            continue
+        change = result["wall_seconds"] / previous["wall_seconds"] - 1
+        marker = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<14}{previous['wall_seconds']:>12.3f}{result['wall_seconds']:>12.3f}{change:>+9.1%}{marker}")
+        for tool, seconds in result["steps"].items():
+            before = previous.get("steps", {}).get(tool)
+            if before and seconds / before - 1 > threshold:
+                print(f"  {tool}: {before:.3f}s -> {seconds:.3f}s")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def build_config(args) -> dict:
+    """Translate command-line options into the fake CLI configuration"""
+    latency = {}
+    for override in args.tool_latency:
+        tool, _, seconds = override.partition("=")
+        latency[tool] = float(seconds)
+    return {
+        "default_latency": args.latency,
+        "latency": latency,
+        "default_output_lines": args.output_lines,
+        "outdated_packages": args.outdated_packages,
+        "api_server": args.api_server
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the provisioning scripts against fake CLI tools")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is reported")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds every fake tool call takes")
+    parser.add_argument("--tool-latency", action="append", default=[], metavar="TOOL=SECONDS",
+                        help="Override the latency of one tool, e.g. helm=0.5")
+    parser.add_argument("--output-lines", type=int, default=200, help="Lines of output per fake tool call")
+    parser.add_argument("--outdated-packages", type=int, default=50, help="Outdated packages reported by fake pip")
+    parser.add_argument("--api-server", action="store_true",
+                        help="Serve a stand-in Kubernetes API so the scripts use the in-process client")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before a scenario counts as a regression")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="Baseline file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    config = build_config(args)
+
+    print(f"Running benchmarks ({args.repeat} runs each, {args.latency}s per tool call)...")
+    results = run_benchmarks(args.scenario or list(SCENARIOS), config, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": config, "scenarios": results}, f, indent=2)
+
+    if args.update_baseline:
+        scenarios = {name: {"wall_seconds": r["wall_seconds"], "steps": r["steps"]} for name, r in results.items()}
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "scenarios": scenarios}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+
+    regressions = compare(results, baseline, config, args.threshold)
+    failures = [name for name, result in results.items() if result["failures"]]
+    if regressions or failures:
+        print(f"\nRegressions: {', '.join(regressions) or 'none'}; failures: {', '.join(failures) or 'none'}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
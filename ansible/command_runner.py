@@ -0,0 +1,297 @@
+"""Shared command execution engine used by the provisioning scripts"""
+import atexit
+import json
+import os
+import platform
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Number of recent output lines kept per stream for error reporting
+DEFAULT_TAIL_LINES = 200
+# Set this environment variable to a file path to log every command and its output
+LOG_FILE_ENV = "DEVOPS_COMMAND_LOG"
+# Maximum number of commands the engine runs at the same time
+MAX_CONCURRENCY_ENV = "DEVOPS_MAX_PARALLEL_COMMANDS"
+DEFAULT_MAX_CONCURRENCY = 8
+# How long to keep reading a timed-out command's output when part of it could not be killed
+SUDO_DRAIN_SECONDS = 5
+# Characters that only a shell can interpret when they appear outside quotes
+SHELL_SYNTAX = set("|&;<>()$`*?[]{}~#\\")
+
+OutputCallback = Callable[[str, str], None]
+
+class CommandResult(NamedTuple):
+    """Outcome of a command; unpacks like the (returncode, stdout, stderr) tuple"""
+    returncode: int
+    stdout: str
+    stderr: str
+
+class CommandRecord(NamedTuple):
+    """Resource accounting for a single finished command"""
+    command: str
+    tool: str
+    shell: bool
+    returncode: int
+    timed_out: bool
+    started: float
+    wall_seconds: float
+    user_seconds: Optional[float]
+    system_seconds: Optional[float]
+    max_rss_kb: Optional[int]
+
+_log_lock = threading.Lock()
+_log_file = None
+
+def set_log_file(path: Optional[str]):
+    """Append command output to the given file, or stop logging when path is None"""
+    global _log_file
+    with _log_lock:
+        if _log_file:
+            _log_file.close()
+        _log_file = open(path, "a", buffering=1) if path else None
+
+def log_line(line: str):
+    """Write a single line to the command log, if one is configured"""
+    with _log_lock:
+        if _log_file:
+            _log_file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {line}\n")
+
+def needs_shell(command: str) -> bool:
+    """Return True if the command uses shell syntax and cannot be run as a plain argv"""
+    if os.name == "nt":
+        return True
+    quote = None
+    for char in command:
+        if quote == "'":
+            if char == "'":
+                quote = None
+        elif quote == '"':
+            if char == '"':
+                quote = None
+            elif char in "$`\\":
+                return True
+        elif char in "'\"":
+            quote = char
+        elif char in SHELL_SYNTAX:
+            return True
+    first_word = command.split(None, 1)[0] if command.strip() else ""
+    # Unbalanced quotes or leading VAR=value assignments need the shell too
+    return quote is not None or "=" in first_word
+
+def command_tool(command: str) -> str:
+    """Return the program a command line mainly runs, skipping sudo and echo feeders"""
+    segments = [s for s in command.replace("&&", "|").replace(";", "|").split("|") if s.strip()]
+    for segment in segments:
+        try:
+            words = shlex.split(segment)
+        except ValueError:
+            words = segment.split()
+        while words and (words[0] == "sudo" or words[0].startswith("-") or "=" in words[0]):
+            words.pop(0)
+        if words and (words[0] != "echo" or segment is segments[-1]):
+            return os.path.basename(words[0])
+    return command.split()[0] if command.split() else ""
+
+def _pump(pipe, stream: str, tail: deque, echo: Optional[OutputCallback]):
+    """Forward lines from a child pipe to the console and log, keeping only a bounded tail"""
+    for line in pipe:
+        line = line.rstrip("\n")
+        tail.append(line)
+        log_line(f"[{stream}] {line}")
+        if echo:
+            echo(line, stream)
+    pipe.close()
+
+def _exit_code(status: int) -> int:
+    """Convert a wait status to a returncode the way subprocess does (negative for a signal)"""
+    if hasattr(os, "waitstatus_to_exitcode"):
+        return os.waitstatus_to_exitcode(status)
+    # Python 3.8 and older, as on remote hosts that run this module with their own python3
+    return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+def _reap(process: subprocess.Popen, outcome: dict):
+    """Wait for a child with wait4 so its resource usage can be recorded"""
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = _exit_code(status)
+        outcome["usage"] = usage
+    except ChildProcessError:
+        # Already reaped elsewhere (for example by Popen.kill); usage is lost
+        process.wait()
+
+def _kill(process: subprocess.Popen):
+    """Kill a command together with everything it started
+
+    Every command leads its own process group, so killing the group also stops
+    the grandchildren of a shell command, which would otherwise keep running
+    and hold the output pipes open.
+    """
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except ProcessLookupError:
+            return
+        except PermissionError:
+            # A group member runs as another user (sudo); kill what we may
+            pass
+    try:
+        process.kill()
+    except PermissionError:
+        pass
+
+class ExecutionEngine:
+    """Runs commands with timeouts and a concurrency limit, recording wall time, CPU and peak RSS"""
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.records: List[CommandRecord] = []
+        self.listeners: List[Callable[[CommandRecord], None]] = []
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+
+    def run(self, command: str, echo: Optional[OutputCallback] = None, tail_lines: Optional[int] = DEFAULT_TAIL_LINES,
+            timeout: Optional[float] = None, env: Optional[dict] = None) -> CommandResult:
+        """Run a command, streaming its output line by line as it arrives
+
+        Commands without shell syntax are executed directly from their argv.
+        Only the last ``tail_lines`` lines of each stream are kept in memory and
+        returned; pass ``tail_lines=None`` when the caller needs to parse the
+        full output.
+        """
+        with self._slots:
+            return self._run(command, echo, tail_lines, timeout, env)
+
+    def _run(self, command, echo, tail_lines, timeout, env) -> CommandResult:
+        shell = needs_shell(command)
+        log_line(f"Executing: {command}")
+        started = time.time()
+        wall_started = time.monotonic()
+        try:
+            process = subprocess.Popen(command if shell else shlex.split(command), shell=shell,
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, errors="replace", env=env or os.environ,
+                                       start_new_session=hasattr(os, "killpg"))
+        except OSError as e:
+            # Match the shell's "command not found" status for argv execution
+            self._record(CommandRecord(command, command_tool(command), shell, 127, False, started,
+                                       time.monotonic() - wall_started, None, None, None))
+            return CommandResult(127, "", str(e))
+
+        tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+        readers = [threading.Thread(target=_pump, args=(pipe, stream, tails[stream], echo), daemon=True)
+                   for pipe, stream in ((process.stdout, "stdout"), (process.stderr, "stderr"))]
+        for reader in readers:
+            reader.start()
+
+        outcome = {"usage": None}
+        timed_out = False
+        try:
+            if hasattr(os, "wait4"):
+                reaper = threading.Thread(target=_reap, args=(process, outcome), daemon=True)
+                reaper.start()
+                reaper.join(timeout)
+                if reaper.is_alive():
+                    timed_out = True
+                    _kill(process)
+                    reaper.join()
+            else:
+                try:
+                    process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+                    _kill(process)
+                    process.wait()
+        except BaseException:
+            # In its own session the command does not see the terminal's Ctrl-C
+            _kill(process)
+            raise
+        wall_seconds = time.monotonic() - wall_started
+
+        for reader in readers:
+            # Killing the group closes the pipes; only a member we may not
+            # signal (a command run under sudo) can keep them open
+            reader.join(timeout=SUDO_DRAIN_SECONDS if timed_out else None)
+        returncode = 124 if timed_out else process.returncode
+        if timed_out:
+            tails["stderr"].append(f"Timed out after {timeout}s")
+        log_line(f"Exit status {returncode}: {command}")
+
+        usage = outcome["usage"]
+        max_rss_kb = None
+        if usage:
+            # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+            max_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        self._record(CommandRecord(command, command_tool(command), shell, returncode, timed_out, started,
+                                   wall_seconds, usage.ru_utime if usage else None,
+                                   usage.ru_stime if usage else None, max_rss_kb))
+
+        return CommandResult(returncode, "\n".join(tails["stdout"]), "\n".join(tails["stderr"]))
+
+    def _record(self, record: CommandRecord):
+        with self._lock:
+            self.records.append(record)
+        for listener in self.listeners:
+            listener(record)
+
+    def totals_by_tool(self) -> Dict[str, dict]:
+        """Aggregate command count, wall time, CPU time and peak RSS per tool"""
+        totals = {}
+        for record in self.records:
+            tool = totals.setdefault(record.tool, {"commands": 0, "failures": 0, "wall_seconds": 0.0,
+                                                   "cpu_seconds": 0.0, "max_rss_kb": 0})
+            tool["commands"] += 1
+            tool["failures"] += record.returncode != 0
+            tool["wall_seconds"] += record.wall_seconds
+            tool["cpu_seconds"] += (record.user_seconds or 0.0) + (record.system_seconds or 0.0)
+            tool["max_rss_kb"] = max(tool["max_rss_kb"], record.max_rss_kb or 0)
+        return dict(sorted(totals.items(), key=lambda item: item[1]["wall_seconds"], reverse=True))
+
+    def summary_table(self) -> str:
+        """Render the per-tool totals as a plain-text table, slowest first"""
+        lines = [f"{'Tool':<16}{'Cmds':>6}{'Fail':>6}{'Wall s':>10}{'CPU s':>10}{'Peak RSS MB':>13}"]
+        for tool, totals in self.totals_by_tool().items():
+            lines.append(f"{tool[:15]:<16}{totals['commands']:>6}{totals['failures']:>6}"
+                         f"{totals['wall_seconds']:>10.2f}{totals['cpu_seconds']:>10.2f}"
+                         f"{totals['max_rss_kb'] / 1024:>13.1f}")
+        return "\n".join(lines)
+
+    def write_report(self, path: str):
+        """Write every command record and the per-tool totals as JSON"""
+        report = {
+            "script": os.path.basename(sys.argv[0]),
+            "argv": sys.argv[1:],
+            "host": platform.node(),
+            "commands": [record._asdict() for record in self.records],
+            "by_tool": self.totals_by_tool()
+        }
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    def report_at_exit(self, path: str):
+        """Print the summary table and write the JSON report when the script exits"""
+        def _report():
+            if not self.records:
+                return
+            print("\n=== Command Summary ===")
+            print(self.summary_table())
+            self.write_report(path)
+            print(f"Command report written to {path}")
+        atexit.register(_report)
+
+engine = ExecutionEngine(int(os.environ.get(MAX_CONCURRENCY_ENV, DEFAULT_MAX_CONCURRENCY)))
+
+def run_command(command: str, echo: Optional[OutputCallback] = None, tail_lines: Optional[int] = DEFAULT_TAIL_LINES,
+                timeout: Optional[float] = None, env: Optional[dict] = None) -> CommandResult:
+    """Run a command through the shared engine"""
+    return engine.run(command, echo=echo, tail_lines=tail_lines, timeout=timeout, env=env)
+
+# Honour the log file environment variable for every script that imports the runner
+if os.environ.get(LOG_FILE_ENV):
+    set_log_file(os.environ[LOG_FILE_ENV])
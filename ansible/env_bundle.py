@@ -0,0 +1,269 @@
+"""Build and install a prebuilt Ansible environment bundle from environment.yaml
+
+The bundle is a single .tar.gz with a SHA-256 sidecar. It is built once and
+installed on any number of hosts offline, at exactly the versions pinned in
+environment.yaml instead of whatever `pip install ansible` resolves that day:
+
+    python ansible/env_bundle.py --build                    # wheelhouse of the pinned Python packages
+    python ansible/env_bundle.py --build --format conda-pack
+    python ansible/env_bundle.py --compare dist/ansible-env-*.tar.gz
+    python ansible/install_ansible_ce.py --bundle dist/ansible-env-wheelhouse-<hash>.tar.gz
+
+A wheelhouse bundle holds wheels for the Python packages in environment.yaml
+and is installed with pip --no-index. A conda-pack bundle is the whole
+conda environment, relocated with conda-unpack after extraction.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import artifact_cache
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENVIRONMENT_FILE = os.path.join(REPO_DIR, "environment.yaml")
+DIST_DIR = os.path.join(REPO_DIR, "dist")
+BUNDLE_MANIFEST = "bundle.json"
+# Build tools in the conda environment that are not part of what gets installed
+SKIPPED_PACKAGES = {"pip", "setuptools", "wheel", "python"}
+# Conda package names that differ from their PyPI names, for the packages an
+# Ansible control node pulls in: requests' Brotli support, and the clients
+# behind the docker, kubernetes, Kerberos/WinRM and ansible-lint tooling.
+# Names that differ only in case, "-" versus "_" or "." (pyyaml,
+# typing_extensions) need no entry, since pip normalises them.
+CONDA_TO_PYPI = {
+    "brotli-python": "Brotli",
+    "docker-py": "docker",
+    "python-gssapi": "gssapi",
+    "python-kubernetes": "kubernetes",
+    "ruamel_yaml": "ruamel.yaml",
+}
+# Where install timings are kept for comparing the bundle and pip paths
+TIMINGS_FILE = os.path.join(os.path.expanduser("~"), ".cache", "devops-public", "install-timings.json")
+
+class BundleError(Exception):
+    """Raised when a bundle cannot be built, verified or installed"""
+
+def read_environment(path: str = ENVIRONMENT_FILE) -> dict:
+    """Parse environment.yaml, with a small fallback parser when PyYAML is missing"""
+    with open(path) as f:
+        text = f.read()
+    if yaml:
+        return yaml.safe_load(text)
+    environment: Dict[str, object] = {"dependencies": []}
+    section = None
+    for line in text.splitlines():
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        if not line.startswith(" "):
+            key, _, value = line.partition(":")
+            section = key.strip()
+            if value.strip():
+                environment[section] = value.strip()
+        elif section == "dependencies" and line.strip().startswith("- "):
+            environment["dependencies"].append(line.strip()[2:].strip())
+    return environment
+
+def python_requirements(environment: dict) -> List[str]:
+    """Return pinned pip requirements for the Python packages of a conda environment
+
+    Conda builds of Python packages have build strings starting with "py"
+    (py311..., pyh...); everything else (openssl, docker-compose, ...) is a
+    native package that a wheelhouse does not carry.
+    """
+    requirements = []
+    for dependency in environment.get("dependencies", []):
+        if isinstance(dependency, dict):
+            # A nested "pip:" list is already in pip's format
+            requirements.extend(dependency.get("pip", []))
+            continue
+        name, version, build = (dependency.split("=") + ["", ""])[:3]
+        if build.startswith("py") and name not in SKIPPED_PACKAGES:
+            requirements.append(f"{CONDA_TO_PYPI.get(name, name)}=={version}")
+    return requirements
+
+def python_tag() -> str:
+    """Interpreter tag the wheelhouse is built for, e.g. cp311-linux-x86_64"""
+    return f"cp{sys.version_info.major}{sys.version_info.minor}-{platform.system().lower()}-{platform.machine()}"
+
+def environment_hash(path: str = ENVIRONMENT_FILE) -> str:
+    return artifact_cache.file_sha256(path)
+
+def _run(command: List[str], **kwargs):
+    print(f"Executing: {' '.join(command)}")
+    result = subprocess.run(command, **kwargs)
+    if result.returncode != 0:
+        raise BundleError(f"{command[0]} {command[1] if len(command) > 1 else ''} exited with status {result.returncode}")
+
+def write_sidecar(bundle: str) -> str:
+    """Write a sha256sum-compatible checksum file next to the bundle and return the digest"""
+    digest = artifact_cache.file_sha256(bundle)
+    with open(bundle + ".sha256", "w") as f:
+        f.write(f"{digest}  {os.path.basename(bundle)}\n")
+    return digest
+
+def build_bundle(environment_file: str = ENVIRONMENT_FILE, output_dir: str = DIST_DIR,
+                 bundle_format: str = "wheelhouse") -> str:
+    """Build a bundle from environment.yaml and return its path"""
+    environment = read_environment(environment_file)
+    source_hash = environment_hash(environment_file)
+    os.makedirs(output_dir, exist_ok=True)
+    bundle = os.path.join(output_dir, f"ansible-env-{bundle_format}-{source_hash[:12]}.tar.gz")
+    manifest = {"format": bundle_format, "created": time.time(), "environment_sha256": source_hash,
+                "python": python_tag()}
+
+    with tempfile.TemporaryDirectory() as staging:
+        if bundle_format == "wheelhouse":
+            requirements = python_requirements(environment)
+            manifest["requirements"] = requirements
+            with open(os.path.join(staging, "requirements.txt"), "w") as f:
+                f.write("\n".join(requirements) + "\n")
+            # Only wheels: the install step must not compile anything
+            _run([sys.executable, "-m", "pip", "download", "--only-binary", ":all:", "-d",
+                  os.path.join(staging, "wheels"), "-r", os.path.join(staging, "requirements.txt")])
+        elif bundle_format == "conda-pack":
+            if not shutil.which("conda-pack"):
+                raise BundleError("conda-pack is not installed (conda install -c conda-forge conda-pack)")
+            packed = os.path.join(staging, "env.tar.gz")
+            _run(["conda-pack", "-n", environment["name"], "-o", packed, "--ignore-missing-files"])
+            manifest["environment"] = environment["name"]
+        else:
+            raise BundleError(f"Unknown bundle format {bundle_format!r}")
+
+        with open(os.path.join(staging, BUNDLE_MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        with tarfile.open(bundle, "w:gz") as archive:
+            for entry in sorted(os.listdir(staging)):
+                archive.add(os.path.join(staging, entry), arcname=entry)
+
+    digest = write_sidecar(bundle)
+    print(f"Bundle written to {bundle} ({os.path.getsize(bundle) / (1024 * 1024):.1f} MB, sha256 {digest})")
+    return bundle
+
+def verify_bundle(bundle: str, expected: Optional[str] = None) -> str:
+    """Check the bundle against an expected digest or its .sha256 sidecar and return the digest"""
+    if not expected:
+        try:
+            with open(bundle + ".sha256") as f:
+                expected = f.read().split()[0]
+        except (OSError, IndexError):
+            raise BundleError(f"No checksum for {bundle}: pass one or keep {os.path.basename(bundle)}.sha256 beside it")
+    digest = artifact_cache.file_sha256(bundle)
+    if digest != expected:
+        raise BundleError(f"Checksum mismatch for {bundle}: expected {expected}, got {digest}")
+    return digest
+
+def _extract(bundle: str, destination: str):
+    with tarfile.open(bundle) as archive:
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(destination, filter="data")
+        else:
+            archive.extractall(destination)
+
+def install_bundle(bundle: str, expected: Optional[str] = None, python: str = sys.executable,
+                   prefix: Optional[str] = None) -> float:
+    """Verify and install a bundle offline; returns the seconds taken
+
+    Wheelhouse bundles are installed into the given interpreter's
+    environment. conda-pack bundles are unpacked to prefix (by default
+    ~/.local/share/devops-public/<environment name>).
+    """
+    started = time.monotonic()
+    verify_bundle(bundle, expected)
+    with tempfile.TemporaryDirectory() as workdir:
+        _extract(bundle, workdir)
+        with open(os.path.join(workdir, BUNDLE_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest["format"] == "wheelhouse":
+            if manifest["python"] != python_tag() and python == sys.executable:
+                raise BundleError(f"Bundle was built for {manifest['python']}, this host is {python_tag()}")
+            _run([python, "-m", "pip", "install", "--no-index", "--find-links", os.path.join(workdir, "wheels"),
+                  "-r", os.path.join(workdir, "requirements.txt")])
+        else:
+            prefix = prefix or os.path.join(os.path.expanduser("~"), ".local", "share", "devops-public",
+                                            manifest["environment"])
+            os.makedirs(prefix, exist_ok=True)
+            _extract(os.path.join(workdir, "env.tar.gz"), prefix)
+            # Rewrite the prefixes baked into scripts and binaries for the new location
+            _run([os.path.join(prefix, "bin", "python"), os.path.join(prefix, "bin", "conda-unpack")])
+            print(f"Environment unpacked to {prefix}; activate it with: source {prefix}/bin/activate")
+    seconds = time.monotonic() - started
+    record_timing("bundle", seconds)
+    return seconds
+
+def record_timing(method: str, seconds: float):
+    """Remember how long the last install by a method took"""
+    try:
+        with open(TIMINGS_FILE) as f:
+            timings = json.load(f)
+    except (OSError, ValueError):
+        timings = {}
+    timings[method] = seconds
+    os.makedirs(os.path.dirname(TIMINGS_FILE), exist_ok=True)
+    with open(TIMINGS_FILE, "w") as f:
+        json.dump(timings, f, indent=2)
+
+def last_timing(method: str) -> Optional[float]:
+    try:
+        with open(TIMINGS_FILE) as f:
+            return json.load(f).get(method)
+    except (OSError, ValueError):
+        return None
+
+def compare_install_times(bundle: str, expected: Optional[str] = None) -> Dict[str, float]:
+    """Install Ansible into two throwaway virtualenvs, from PyPI and from the bundle, and time both"""
+    timings = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for method in ("pip", "bundle"):
+            venv = os.path.join(workdir, method)
+            _run([sys.executable, "-m", "venv", venv])
+            python = os.path.join(venv, "bin", "python")
+            started = time.monotonic()
+            if method == "pip":
+                _run([python, "-m", "pip", "install", "ansible"])
+                timings[method] = time.monotonic() - started
+            else:
+                timings[method] = install_bundle(bundle, expected, python=python)
+    print(f"\npip install ansible: {timings['pip']:.1f}s")
+    print(f"bundle install:      {timings['bundle']:.1f}s ({timings['pip'] / max(timings['bundle'], 1e-6):.1f}x faster)")
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Build, verify and install Ansible environment bundles")
+    parser.add_argument("--build", action="store_true", help="Build a bundle from environment.yaml")
+    parser.add_argument("--format", choices=["wheelhouse", "conda-pack"], default="wheelhouse")
+    parser.add_argument("--environment", default=ENVIRONMENT_FILE, help="Conda environment file")
+    parser.add_argument("--output-dir", default=DIST_DIR)
+    parser.add_argument("--verify", metavar="BUNDLE", help="Check a bundle against its checksum")
+    parser.add_argument("--install", metavar="BUNDLE", help="Install a bundle offline")
+    parser.add_argument("--compare", metavar="BUNDLE", help="Time a pip install against a bundle install")
+    parser.add_argument("--sha256", help="Expected checksum instead of the .sha256 sidecar")
+    args = parser.parse_args()
+
+    try:
+        if args.build:
+            build_bundle(args.environment, args.output_dir, args.format)
+        if args.verify:
+            print(f"{args.verify}: OK ({verify_bundle(args.verify, args.sha256)})")
+        if args.install:
+            print(f"Installed {args.install} in {install_bundle(args.install, args.sha256):.1f}s")
+        if args.compare:
+            compare_install_times(args.compare, args.sha256)
+    except BundleError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
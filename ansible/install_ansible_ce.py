@@ -1,23 +1,53 @@
 import os
-import subprocess
 import platform
+import argparse
+import glob
+import sys
+import tempfile
+import time
+import functools
+from concurrent.futures import ThreadPoolExecutor
 import distro
+import command_runner
+import probe_cache
+import artifact_cache
+import env_bundle
+import ansible_profile
+
+# Maximum number of collection artifacts installed at the same time
+COLLECTION_INSTALL_JOBS = 4
+COMMAND_REPORT_FILE = "ansible-install-commands.json"
+
+POPULAR_COLLECTIONS = [
+    "community.general",
+    "ansible.posix",
+    "community.network",
+    "community.kubernetes",
+    "community.aws",
+    "community.docker",
+    "community.crypto",
+    "community.vmware",
+    "community.windows"
+]
+
+# Echo streamed command output to the console
+def echo_output(line, stream):
+    print(line)
 
 # Function to run a shell command
 def run_command(command):
-    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    result = command_runner.run_command(command, echo=echo_output)
     if result.returncode != 0:
-        print(f"Error running command: {command}\n{result.stderr}")
-    else:
-        print(result.stdout)
+        print(f"Error running command: {command}")
     return result
 
-# Determine OS family
+# Determine OS family, once per run
+@functools.lru_cache(maxsize=None)
 def determine_os_family():
     os_family = platform.system().lower()
     if os_family == 'linux':
         # Use the distro package to check for specific Linux distributions
-        distro_name = distro.id().lower()
+        distro_name = probe_cache.cached_value("distro.id", ["/etc/os-release"], distro.id).lower()
         if 'redhat' in distro_name or 'centos' in distro_name or 'fedora' in distro_name:
             return 'redhat'
         elif 'debian' in distro_name or 'ubuntu' in distro_name:
@@ -48,18 +78,22 @@ def install_python():
         # If ensurepip doesn't work, use get-pip.py
         pip_check = run_command("pip --version")
         if pip_check.returncode != 0:
-            print("Downloading get-pip.py to install pip...")
-            run_command("curl https://bootstrap.pypa.io/get-pip.py -o get-pip.py")
-            run_command("python get-pip.py")
+            print("Installing pip with get-pip.py from the artifact cache...")
+            try:
+                artifact_cache.install("get-pip.py", "get-pip.py")
+                run_command("python get-pip.py")
+            except artifact_cache.ArtifactError as e:
+                print(f"Could not obtain get-pip.py: {e}")
 
     # Upgrade pip to the latest version
     run_command("python -m pip install --upgrade pip")
+    probe_cache.invalidate("python", "pip")
 
 # Ensure Python and pip are installed
 def check_python():
     print("Checking Python and pip installation...")
-    python_result = run_command("python --version")
-    pip_result = run_command("pip --version")
+    python_result = probe_cache.cached_probe("python --version", run_command)
+    pip_result = probe_cache.cached_probe("pip --version", run_command)
 
     # if python and pip are not installed, install them
     if python_result.returncode != 0 or pip_result.returncode != 0:
@@ -67,29 +101,40 @@ def check_python():
 
         
 
-def install_ansible():
-    # Install Ansible using pip
+# Install Ansible from a prebuilt bundle when given one, otherwise with pip,
+# and compare the time taken with the last install by the other method
+def install_ansible(bundle=None, sha256=None, offline=False):
     print("Installing Ansible...")
-    run_command("python -m pip install ansible")
+    method = "pip"
+    started = time.monotonic()
+    if bundle:
+        try:
+            env_bundle.install_bundle(bundle, sha256)
+            method = "bundle"
+        except (env_bundle.BundleError, OSError) as e:
+            if offline:
+                raise
+            print(f"Could not install from {bundle}: {e}")
+            print("Falling back to pip...")
+    if method == "pip":
+        if run_command("python -m pip install ansible").returncode != 0:
+            print("Ansible could not be installed with pip")
+            return False
+        env_bundle.record_timing("pip", time.monotonic() - started)
+    elapsed = time.monotonic() - started
+    other = env_bundle.last_timing("bundle" if method == "pip" else "pip")
+    comparison = f" (last {'bundle' if method == 'pip' else 'pip'} install took {other:.1f}s)" if other else ""
+    print(f"Ansible installed with {method} in {elapsed:.1f}s{comparison}")
     # Verify Ansible installation
     print("Verifying Ansible installation...")
     run_command("ansible --version")
+    return True
 
 # Show a numbered menu of the top 20 most popular Ansible collections 
 # allow the user to select any of them and return to the menu
 def show_collections_menu():
     collections = []
-    popular_collections = [
-        "community.general",
-        "ansible.posix",
-        "community.network",
-        "community.kubernetes",
-        "community.aws",
-        "community.docker",
-        "community.crypto",
-        "community.vmware",
-        "community.windows"
-    ]
+    popular_collections = POPULAR_COLLECTIONS
 
     while True:
         print("Select a collection to install or press Enter to continue:")
@@ -133,27 +178,124 @@ def show_collections_menu():
 
     return collections
 
-# check if python and pip are installed
-try:
-    check_python()
-except Exception as e:
-    print(f"Error checking Python and pip installation: {e}")
-    install_python()
-
-# Install Ansible using pip
-try:
-    install_ansible()
-except Exception as e:
-    print(f"Error installing Ansible: {e}")
-
-# Show collections menu and get selected collections
-selected_collections = show_collections_menu()
-
-# Install selected collections
-if selected_collections:
-    print("Installing selected collections...")
-    for collection in selected_collections:
-        print(f"Installing {collection}...")
-        run_command(f"ansible-galaxy collection install {collection}")
-else:
-    print("No collections selected. Exiting.")
+# Write a single requirements file covering every selected collection
+def write_collection_requirements(collections, path):
+    with open(path, "w") as f:
+        f.write("collections:\n")
+        for collection in collections:
+            f.write(f"  - name: {collection}\n")
+
+# Install one downloaded collection artifact; dependencies were already resolved
+def install_collection_artifact(artifact):
+    print(f"Installing {os.path.basename(artifact)}...")
+    return run_command(f"ansible-galaxy collection install --no-deps {artifact}")
+
+# Resolve all selected collections in one pass, then install the artifacts
+# with bounded concurrency
+def install_collections(collections, jobs=COLLECTION_INSTALL_JOBS):
+    started = time.monotonic()
+    with tempfile.TemporaryDirectory() as workdir:
+        requirements = os.path.join(workdir, "requirements.yml")
+        download_dir = os.path.join(workdir, "artifacts")
+        write_collection_requirements(collections, requirements)
+
+        print(f"Resolving {len(collections)} collections...")
+        result = run_command(f"ansible-galaxy collection download -r {requirements} -p {download_dir}")
+        artifacts = sorted(glob.glob(os.path.join(download_dir, "*.tar.gz")))
+        if result.returncode != 0 or not artifacts:
+            # Older ansible-galaxy releases cannot download; still resolve once
+            print("Falling back to a single ansible-galaxy install run...")
+            result = run_command(f"ansible-galaxy collection install -r {requirements}")
+            failed = [] if result.returncode == 0 else list(collections)
+        else:
+            print(f"Installing {len(artifacts)} collection artifacts ({jobs} at a time)...")
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(install_collection_artifact, artifacts))
+            failed = [os.path.basename(a) for a, r in zip(artifacts, results) if r.returncode != 0]
+
+    elapsed = time.monotonic() - started
+    if failed:
+        print(f"Failed to install: {', '.join(failed)}")
+    print(f"Collection installation finished in {elapsed:.1f}s")
+    return not failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Install Ansible Community Edition and popular collections")
+    parser.add_argument("--collections", nargs="*", metavar="NAME",
+                        help="Install these collections without showing the menu")
+    parser.add_argument("--all-collections", action="store_true",
+                        help="Install every collection listed in the menu")
+    parser.add_argument("--jobs", type=int, default=COLLECTION_INSTALL_JOBS,
+                        help="Number of collection artifacts to install concurrently")
+    parser.add_argument("--offline", action="store_true",
+                        help="Install Ansible only from --bundle and use downloaded installers only from the local artifact cache")
+    parser.add_argument("--bundle", metavar="PATH",
+                        help="Install Ansible from a bundle built by env_bundle.py instead of PyPI")
+    parser.add_argument("--bundle-sha256", metavar="DIGEST",
+                        help="Expected bundle checksum, instead of the .sha256 file beside it")
+    parser.add_argument("--performance-profile", action="store_true",
+                        help="Write an ansible.cfg with fact caching, tuned forks, pipelining and task profiling")
+    parser.add_argument("--profile-path", default=ansible_profile.PROFILE_FILE,
+                        help="Where to write the performance profile")
+    parser.add_argument("--benchmark-profile", action="store_true",
+                        help="Compare the performance profile with Ansible's defaults on a localhost playbook")
+    args = parser.parse_args()
+    if args.offline and not args.bundle:
+        parser.error("--offline needs --bundle; without one Ansible is installed from PyPI")
+    return args
+
+def main():
+    args = parse_args()
+    if args.offline:
+        artifact_cache.OFFLINE = True
+
+    # check if python and pip are installed
+    try:
+        check_python()
+    except Exception as e:
+        print(f"Error checking Python and pip installation: {e}")
+        install_python()
+
+    # Install Ansible from the bundle or with pip
+    try:
+        install_ansible(args.bundle, args.bundle_sha256, args.offline)
+    except (env_bundle.BundleError, OSError) as e:
+        # Only raised with --offline, where there is no pip to fall back to
+        print(f"Error installing Ansible from {args.bundle}: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error installing Ansible: {e}")
+
+    # Pick collections from the command line, or show the menu
+    if args.all_collections:
+        selected_collections = list(POPULAR_COLLECTIONS)
+    elif args.collections is not None:
+        selected_collections = args.collections
+    else:
+        selected_collections = show_collections_menu()
+
+    # The profiling callbacks come from ansible.posix
+    if args.performance_profile or args.benchmark_profile:
+        selected_collections = list(selected_collections) + [
+            c for c in ansible_profile.PROFILE_COLLECTIONS if c not in selected_collections]
+
+    # Install selected collections
+    if selected_collections:
+        print("Installing selected collections...")
+        install_collections(selected_collections, jobs=args.jobs)
+    else:
+        print("No collections selected.")
+
+    # Tune the control node and show what the tuning buys
+    if args.performance_profile:
+        ansible_profile.write_profile(args.profile_path)
+    if args.benchmark_profile:
+        try:
+            ansible_profile.benchmark_profile()
+        except RuntimeError as e:
+            print(f"Error benchmarking the performance profile: {e}")
+
+
+if __name__ == "__main__":
+    command_runner.engine.report_at_exit(COMMAND_REPORT_FILE)
+    main()
@@ -0,0 +1,312 @@
+"""Minimal in-process Kubernetes API client for the AWX scripts
+
+The kubeconfig is read once and requests go over a small pool of keep-alive
+connections to the API server, instead of starting a kubectl process (which
+parses the kubeconfig and does a new TLS handshake) for every call. Only the
+operations the scripts need are covered: get, list, watch, scale, server-side
+apply and secrets. Plain http:// servers are accepted, so the client can be
+exercised against a local stand-in API server such as
+benchmarks/fake_apiserver.py.
+"""
+import base64
+import http.client
+import json
+import os
+import queue
+import ssl
+import subprocess
+import tempfile
+import threading
+import urllib.parse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import yaml
+except ImportError:
+    # PyYAML comes with ansible-core; without it kubeconfigs are read through kubectl
+    yaml = None
+
+DEFAULT_KUBECONFIG = os.path.join(os.path.expanduser("~"), ".kube", "config")
+REQUEST_TIMEOUT_SECONDS = 30
+POOL_SIZE = 4
+FIELD_MANAGER = "devops-public"
+# Resources the scripts read or scale: plural name -> (API path prefix, namespaced)
+RESOURCES = {
+    "namespaces": ("/api/v1", False),
+    "nodes": ("/api/v1", False),
+    "pods": ("/api/v1", True),
+    "secrets": ("/api/v1", True),
+    "services": ("/api/v1", True),
+    "deployments": ("/apis/apps/v1", True),
+    "statefulsets": ("/apis/apps/v1", True),
+    "jobs": ("/apis/batch/v1", True),
+    "awxs": ("/apis/awx.ansible.com/v1beta1", True)
+}
+
+class ApiError(Exception):
+    """Raised when the API server answers with an error status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+def kubeconfig_path() -> str:
+    """Return the kubeconfig kubectl would use first"""
+    paths = [p for p in os.environ.get("KUBECONFIG", "").split(os.pathsep) if p]
+    return paths[0] if paths else DEFAULT_KUBECONFIG
+
+def load_kubeconfig(path: str) -> dict:
+    """Parse a kubeconfig file"""
+    with open(path) as f:
+        text = f.read()
+    if yaml:
+        return yaml.safe_load(text) or {}
+    try:
+        return json.loads(text)
+    except ValueError:
+        # kubectl can print any kubeconfig as JSON
+        result = subprocess.run(["kubectl", "config", "view", "--raw", "-o", "json", "--kubeconfig", path],
+                                capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+def _named(entries: List[dict], name: str, key: str) -> dict:
+    for entry in entries or []:
+        if entry.get("name") == name:
+            return entry.get(key) or {}
+    raise ValueError(f"kubeconfig has no {key} named {name!r}")
+
+def _pem(config: dict, key: str, base_dir: str) -> Optional[bytes]:
+    """Return inline *-data PEM content or the content of the referenced file"""
+    if config.get(f"{key}-data"):
+        return base64.b64decode(config[f"{key}-data"])
+    if config.get(key):
+        with open(os.path.join(base_dir, config[key]), "rb") as f:
+            return f.read()
+    return None
+
+def _ssl_context(cluster: dict, user: dict, base_dir: str) -> ssl.SSLContext:
+    context = ssl.create_default_context()
+    if cluster.get("insecure-skip-tls-verify"):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    else:
+        ca = _pem(cluster, "certificate-authority", base_dir)
+        if ca:
+            context.load_verify_locations(cadata=ca.decode())
+    certificate = _pem(user, "client-certificate", base_dir)
+    key = _pem(user, "client-key", base_dir)
+    if certificate and key:
+        # ssl only loads client certificates from files; keep the key on disk just long enough to read it
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(certificate + b"\n" + key)
+            context.load_cert_chain(path)
+        finally:
+            os.remove(path)
+    return context
+
+class KubeClient:
+    """Kubernetes API client that keeps a pool of keep-alive connections to one server"""
+
+    def __init__(self, server: str, ssl_context: Optional[ssl.SSLContext] = None, token: str = "",
+                 namespace: str = "default", pool_size: int = POOL_SIZE, timeout: float = REQUEST_TIMEOUT_SECONDS):
+        url = urllib.parse.urlsplit(server)
+        self.server = server
+        self.secure = url.scheme == "https"
+        self.host = url.hostname
+        self.port = url.port or (443 if self.secure else 80)
+        self.base_path = url.path.rstrip("/")
+        self.ssl_context = ssl_context
+        self.token = token
+        self.namespace = namespace
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=pool_size)
+        self._kinds: Dict[str, Dict[str, Tuple[str, bool]]] = {}
+
+    @classmethod
+    def from_kubeconfig(cls, path: Optional[str] = None, context: Optional[str] = None) -> "KubeClient":
+        """Build a client for a kubeconfig context (the current context by default)"""
+        path = path or kubeconfig_path()
+        config = load_kubeconfig(path)
+        context_name = context or config.get("current-context")
+        if not context_name:
+            raise ValueError(f"{path} has no current context")
+        context_config = _named(config.get("contexts"), context_name, "context")
+        cluster = _named(config.get("clusters"), context_config.get("cluster"), "cluster")
+        user = _named(config.get("users"), context_config.get("user"), "user")
+        base_dir = os.path.dirname(os.path.abspath(path))
+        server = cluster["server"]
+        ssl_context = _ssl_context(cluster, user, base_dir) if server.startswith("https:") else None
+        return cls(server, ssl_context, token=user.get("token", ""),
+                   namespace=context_config.get("namespace") or "default")
+
+    def _connect(self, timeout: Optional[float] = None) -> http.client.HTTPConnection:
+        if self.secure:
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout or self.timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout or self.timeout)
+
+    def _headers(self, content_type: Optional[str]) -> Dict[str, str]:
+        headers = {"Accept": "application/json"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _send(self, method: str, path: str, body: Optional[bytes], content_type: Optional[str]) -> Tuple[int, bytes]:
+        while True:
+            try:
+                connection, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            try:
+                connection.request(method, self.base_path + path, body=body, headers=self._headers(content_type))
+                response = connection.getresponse()
+                data = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if reused:
+                    # The server closed an idle keep-alive connection; try the next one
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                try:
+                    self._idle.put_nowait(connection)
+                except queue.Full:
+                    connection.close()
+            return response.status, data
+
+    def request(self, method: str, path: str, body: Optional[dict] = None,
+                content_type: str = "application/json", query: Optional[Dict[str, str]] = None) -> dict:
+        """Send a request and return the decoded JSON response"""
+        if query:
+            path += "?" + urllib.parse.urlencode(query)
+        payload = json.dumps(body).encode() if body is not None else None
+        status, data = self._send(method, path, payload, content_type if payload is not None else None)
+        if status >= 400:
+            try:
+                message = json.loads(data).get("message", "")
+            except ValueError:
+                message = data.decode(errors="replace").strip()
+            raise ApiError(status, message or http.client.responses.get(status, ""))
+        return json.loads(data) if data else {}
+
+    def healthy(self, path: str = "/readyz") -> bool:
+        """Check a health endpoint of the API server"""
+        try:
+            status, _ = self._send("GET", path, None, None)
+        except (http.client.HTTPException, OSError):
+            return False
+        return status == 200
+
+    def resource_path(self, resource: str, name: str = "", namespace: Optional[str] = None) -> str:
+        """Return the API path of a resource collection or object"""
+        prefix, namespaced = RESOURCES[resource]
+        path = prefix
+        if namespaced:
+            path += f"/namespaces/{namespace or self.namespace}"
+        path += f"/{resource}"
+        return f"{path}/{name}" if name else path
+
+    def get(self, resource: str, name: str, namespace: Optional[str] = None) -> dict:
+        """Return one object"""
+        return self.request("GET", self.resource_path(resource, name, namespace))
+
+    def list(self, resource: str, namespace: Optional[str] = None, selector: Optional[str] = None) -> dict:
+        """Return a list response, including metadata.resourceVersion for a later watch"""
+        query = {"labelSelector": selector} if selector else None
+        return self.request("GET", self.resource_path(resource, namespace=namespace), query=query)
+
+    def watch(self, resource: str, namespace: Optional[str] = None, selector: Optional[str] = None,
+              resource_version: str = "", timeout_seconds: int = 60) -> Iterator[dict]:
+        """Yield watch events ({"type": ..., "object": ...}) until the server ends the watch
+
+        Watches stream for a long time, so they use their own connection
+        rather than one from the pool.
+        """
+        query = {"watch": "1", "timeoutSeconds": str(timeout_seconds), "allowWatchBookmarks": "true"}
+        if selector:
+            query["labelSelector"] = selector
+        if resource_version:
+            query["resourceVersion"] = resource_version
+        path = self.resource_path(resource, namespace=namespace) + "?" + urllib.parse.urlencode(query)
+        connection = self._connect(timeout=timeout_seconds + self.timeout)
+        try:
+            connection.request("GET", self.base_path + path, headers=self._headers(None))
+            response = connection.getresponse()
+            if response.status >= 400:
+                raise ApiError(response.status, response.read().decode(errors="replace").strip())
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+
+    def scale(self, resource: str, name: str, replicas: int, namespace: Optional[str] = None) -> dict:
+        """Set the replica count through the scale subresource"""
+        return self.request("PATCH", self.resource_path(resource, name, namespace) + "/scale",
+                            {"spec": {"replicas": replicas}}, content_type="application/merge-patch+json")
+
+    def get_secret(self, name: str, namespace: Optional[str] = None) -> Dict[str, str]:
+        """Return a secret's data with the values base64-decoded"""
+        data = self.get("secrets", name, namespace).get("data") or {}
+        return {key: base64.b64decode(value).decode() for key, value in data.items()}
+
+    def _discover(self, api_version: str) -> Dict[str, Tuple[str, bool]]:
+        """Map the kinds served under an API group version to (plural, namespaced)"""
+        if api_version not in self._kinds:
+            prefix = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+            resources = self.request("GET", prefix).get("resources", [])
+            self._kinds[api_version] = {r["kind"]: (r["name"], r.get("namespaced", True))
+                                        for r in resources if "/" not in r["name"]}
+        return self._kinds[api_version]
+
+    def apply(self, document: dict, namespace: Optional[str] = None) -> dict:
+        """Create or update an object with server-side apply"""
+        api_version, kind = document["apiVersion"], document["kind"]
+        kinds = self._discover(api_version)
+        if kind not in kinds:
+            raise ApiError(404, f"{api_version} does not serve kind {kind}")
+        plural, namespaced = kinds[kind]
+        path = "/api/v1" if api_version == "v1" else f"/apis/{api_version}"
+        if namespaced:
+            path += f"/namespaces/{namespace or document['metadata'].get('namespace') or self.namespace}"
+        path += f"/{plural}/{document['metadata']['name']}"
+        # JSON is valid YAML, so the document can be sent as an apply patch as-is
+        return self.request("PATCH", path, document, content_type="application/apply-patch+yaml",
+                            query={"fieldManager": FIELD_MANAGER, "force": "true"})
+
+    def apply_manifest(self, text: str, namespace: Optional[str] = None) -> List[dict]:
+        """Apply every document of a YAML (or JSON) manifest"""
+        documents = [d for d in yaml.safe_load_all(text) if d] if yaml else [json.loads(text)]
+        return [self.apply(document, namespace) for document in documents]
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().close()
+
+_clients: Dict[Tuple[str, int], KubeClient] = {}
+_clients_lock = threading.Lock()
+
+def client_for(path: Optional[str] = None) -> Optional[KubeClient]:
+    """Return a shared client for a kubeconfig, or None if it is missing or unusable
+
+    Clients are reused while the kubeconfig is unchanged, so a recreated
+    cluster (new port and certificates) gets a new client.
+    """
+    path = path or kubeconfig_path()
+    try:
+        key = (os.path.abspath(path), os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    with _clients_lock:
+        if key not in _clients:
+            try:
+                _clients[key] = KubeClient.from_kubeconfig(path)
+            except (OSError, ValueError, KeyError, ssl.SSLError, subprocess.CalledProcessError):
+                return None
+        return _clients[key]
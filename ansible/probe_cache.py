@@ -0,0 +1,108 @@
+"""Memoised, on-disk cache for OS detection and tool version probes"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, List, Optional
+
+from command_runner import CommandResult
+
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "devops-public", "probes.json")
+CACHE_TTL_SECONDS = 24 * 3600
+
+_lock = threading.Lock()
+_entries: Optional[dict] = None
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """Identify a file by its resolved path, mtime and size, or None if it does not exist"""
+    try:
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+
+def binary_fingerprint(binary: str) -> Optional[str]:
+    """Fingerprint the executable a command name resolves to on PATH"""
+    path = shutil.which(binary)
+    return file_fingerprint(path) if path else None
+
+def _load() -> dict:
+    """Load the on-disk cache once per process, dropping expired entries"""
+    global _entries
+    if _entries is None:
+        try:
+            with open(CACHE_FILE) as f:
+                _entries = json.load(f)
+        except (OSError, ValueError):
+            _entries = {}
+        now = time.time()
+        _entries = {k: v for k, v in _entries.items() if now - v.get("stored", 0) < CACHE_TTL_SECONDS}
+    return _entries
+
+def _save():
+    """Atomically write the cache so concurrent runs never see a partial file"""
+    try:
+        os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=os.path.dirname(CACHE_FILE))
+        with os.fdopen(fd, "w") as f:
+            json.dump(_entries, f)
+        os.replace(path, CACHE_FILE)
+    except OSError:
+        # The cache is an optimisation; an unwritable home must not break a run
+        pass
+
+def _key(name: str, fingerprints: List[Optional[str]]) -> Optional[str]:
+    if any(fingerprint is None for fingerprint in fingerprints):
+        return None
+    return "|".join([name] + fingerprints)
+
+def lookup(command: str) -> Optional[CommandResult]:
+    """Return the cached result of a probe command if its binary is unchanged"""
+    key = _key(command, [binary_fingerprint(command.split()[0])])
+    with _lock:
+        entry = _load().get(key) if key else None
+    return CommandResult(*entry["result"]) if entry else None
+
+def store(command: str, result: CommandResult):
+    """Remember a successful probe result, keyed by the binary's current fingerprint"""
+    key = _key(command, [binary_fingerprint(command.split()[0])])
+    if not key or result.returncode != 0:
+        return
+    with _lock:
+        _load()[key] = {"stored": time.time(), "result": list(result)}
+        _save()
+
+def cached_probe(command: str, run: Callable[[str], CommandResult]) -> CommandResult:
+    """Run a probe command through the cache"""
+    result = lookup(command)
+    if result is None:
+        result = run(command)
+        store(command, result)
+    return result
+
+def cached_value(name: str, files: List[str], compute: Callable[[], str]) -> str:
+    """Cache a computed string for as long as the files it was derived from are unchanged"""
+    key = _key(name, [file_fingerprint(path) for path in files])
+    with _lock:
+        entry = _load().get(key) if key else None
+    if entry:
+        return entry["result"]
+    value = compute()
+    if key:
+        with _lock:
+            _load()[key] = {"stored": time.time(), "result": value}
+            _save()
+    return value
+
+def invalidate(*binaries: str):
+    """Drop cached probes for the given binaries, or every entry when none are given"""
+    with _lock:
+        entries = _load()
+        for key in list(entries):
+            program = key.split()[0].split("|")[0]
+            if not binaries or program in binaries:
+                del entries[key]
+        _save()
@@ -0,0 +1,121 @@
+"""Local pull-through registry mirrors for the AWX Kind cluster
+
+One registry:2 container runs per upstream registry, each in proxy mode with
+its own persistent volume. The Kind node's containerd is pointed at them, so
+a cluster recreated after --cleanup pulls every image from the local host
+instead of the internet.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+REGISTRY_IMAGE = "registry:2"
+KIND_NETWORK = "kind"
+# upstream registry -> (container name, host port, proxied remote URL)
+MIRRORS = {
+    "docker.io": ("kind-registry-docker", 5001, "https://registry-1.docker.io"),
+    "quay.io": ("kind-registry-quay", 5002, "https://quay.io"),
+    "gcr.io": ("kind-registry-gcr", 5003, "https://gcr.io"),
+    "ghcr.io": ("kind-registry-ghcr", 5004, "https://ghcr.io")
+}
+# The AWX operator chart release the setup script installs, and the AWX release
+# that operator deploys. The seed list below is built from them, so bumping the
+# chart here keeps the mirror seeding the images the operator actually pulls.
+AWX_OPERATOR_VERSION = "2.19.1"
+AWX_VERSION = "24.6.1"
+SEED_IMAGES = [
+    f"quay.io/ansible/awx-operator:{AWX_OPERATOR_VERSION}",
+    f"quay.io/ansible/awx:{AWX_VERSION}",
+    f"quay.io/ansible/awx-ee:{AWX_VERSION}",
+    "quay.io/sclorg/postgresql-15-c9s:latest",
+    "docker.io/library/redis:7",
+    "gcr.io/kubebuilder/kube-rbac-proxy:v0.15.0"
+]
+SEED_JOBS = 3
+STATE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "devops-public", "registry-mirror.json")
+
+Runner = Callable[..., Tuple[int, str, str]]
+
+def containerd_config_patches() -> str:
+    """Return the kind config section that points containerd at the local mirrors"""
+    lines = ["containerdConfigPatches:", "- |-"]
+    for registry, (name, _, _) in MIRRORS.items():
+        lines.append(f'  [plugins."io.containerd.grpc.v1.cri".registry.mirrors."{registry}"]')
+        lines.append(f'    endpoint = ["http://{name}:5000"]')
+    return "\n".join(lines) + "\n"
+
+def ensure_registries(run: Runner):
+    """Start a proxy registry container for every upstream registry, creating it if needed"""
+    for registry, (name, port, remote) in MIRRORS.items():
+        returncode, stdout, _ = run(f"docker inspect -f '{{{{.State.Running}}}}' {name}", check=False)
+        if returncode == 0 and stdout.strip() == "true":
+            continue
+        if returncode == 0:
+            run(f"docker start {name}")
+        else:
+            run(f"docker run -d --restart=always --name {name} -p 127.0.0.1:{port}:5000 "
+                f"-e REGISTRY_PROXY_REMOTEURL={remote} -v {name}-data:/var/lib/registry {REGISTRY_IMAGE}")
+
+def connect_to_kind_network(run: Runner):
+    """Attach the mirrors to the kind network so the nodes can resolve them by name"""
+    for name, _, _ in MIRRORS.values():
+        returncode, stdout, _ = run(f"docker inspect -f '{{{{json .NetworkSettings.Networks}}}}' {name}", check=False)
+        if returncode == 0 and f'"{KIND_NETWORK}"' not in stdout:
+            run(f"docker network connect {KIND_NETWORK} {name}")
+
+def mirror_reference(image: str) -> str:
+    """Rewrite an upstream image reference to go through its local mirror port"""
+    registry, _, path = image.partition("/")
+    _, port, _ = MIRRORS[registry]
+    return f"localhost:{port}/{path}"
+
+def _load_state() -> Dict[str, dict]:
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state: Dict[str, dict]):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w") as f:
+        json.dump(state, f, indent=2)
+
+def seed_images(run: Runner, images: List[str] = SEED_IMAGES, jobs: int = SEED_JOBS) -> Dict[str, float]:
+    """Pull every image through its mirror to fill the proxy cache, returning pull times
+
+    The host copy is removed again afterwards, so each seed measures a full
+    pull from the mirror rather than a hit in the local Docker image store.
+    """
+    state = _load_state()
+    lock = threading.Lock()
+
+    def _seed(image: str) -> float:
+        reference = mirror_reference(image)
+        started = time.monotonic()
+        returncode, _, _ = run(f"docker pull {reference}")
+        seconds = time.monotonic() - started
+        run(f"docker rmi {reference}", check=False)
+        if returncode == 0:
+            with lock:
+                entry = state.setdefault(image, {})
+                # The first successful pull went to the internet; later ones hit the mirror
+                if "cold_seconds" not in entry:
+                    entry["cold_seconds"] = seconds
+                else:
+                    entry["warm_seconds"] = seconds
+        return seconds
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        timings = dict(zip(images, executor.map(_seed, images)))
+    _save_state(state)
+    return timings
+
+def pull_time_saved(images: List[str] = SEED_IMAGES) -> Tuple[float, float]:
+    """Return (cold, warm) total pull seconds for images that have both measurements"""
+    state = _load_state()
+    measured = [state[i] for i in images if "warm_seconds" in state.get(i, {})]
+    return sum(e["cold_seconds"] for e in measured), sum(e["warm_seconds"] for e in measured)
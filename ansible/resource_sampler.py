@@ -0,0 +1,195 @@
+"""Low-overhead /proc readers and a background resource sampler for deployment phases"""
+import contextlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Seconds between samples; override with the DEVOPS_SAMPLE_INTERVAL environment variable
+DEFAULT_INTERVAL_SECONDS = float(os.environ.get("DEVOPS_SAMPLE_INTERVAL", "1.0"))
+SECTOR_BYTES = 512
+
+class ProcFile:
+    """A /proc file kept open and re-read from offset zero on every call"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def read(self) -> str:
+        # pread avoids a shared file offset, so threads can read the same handle
+        return os.pread(self._fd, 65536, 0).decode()
+
+    def close(self):
+        os.close(self._fd)
+
+_proc_files: Dict[str, ProcFile] = {}
+
+def proc_file(path: str) -> ProcFile:
+    """Return a shared open handle for a /proc file"""
+    if path not in _proc_files:
+        _proc_files[path] = ProcFile(path)
+    return _proc_files[path]
+
+def read_meminfo() -> Dict[str, int]:
+    """Return /proc/meminfo values in kB"""
+    values = {}
+    for line in proc_file("/proc/meminfo").read().splitlines():
+        key, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields:
+            values[key] = int(fields[0])
+    return values
+
+def read_loadavg() -> float:
+    """Return the one-minute load average"""
+    return float(proc_file("/proc/loadavg").read().split()[0])
+
+def read_cpu_times() -> List[int]:
+    """Return the aggregate CPU jiffy counters from /proc/stat"""
+    return [int(field) for field in proc_file("/proc/stat").read().splitlines()[0].split()[1:]]
+
+def block_devices() -> List[str]:
+    """Return whole-disk block devices, skipping loop and RAM devices"""
+    try:
+        return [d for d in os.listdir("/sys/block") if not d.startswith(("loop", "ram"))]
+    except OSError:
+        return []
+
+def read_disk_sectors(devices: List[str]) -> List[int]:
+    """Return total sectors read and written across the given devices"""
+    read_sectors = written_sectors = 0
+    for line in proc_file("/proc/diskstats").read().splitlines():
+        fields = line.split()
+        if len(fields) > 9 and fields[2] in devices:
+            read_sectors += int(fields[5])
+            written_sectors += int(fields[9])
+    return [read_sectors, written_sectors]
+
+def disk_usage_gb(path: str = "/") -> Dict[str, float]:
+    """Return used and free space of the filesystem holding path, in GB"""
+    stat = os.statvfs(path)
+    return {
+        "used": ((stat.f_blocks - stat.f_bfree) * stat.f_frsize) / (1024**3),
+        "free": (stat.f_bavail * stat.f_frsize) / (1024**3)
+    }
+
+class ResourceSampler(threading.Thread):
+    """Samples memory, load, CPU and disk at a fixed interval and attributes samples to phases"""
+
+    METRICS = ["mem_used_gb", "load_1m", "cpu_percent", "iowait_percent", "disk_read_mb_s",
+               "disk_write_mb_s", "disk_used_gb"]
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL_SECONDS):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._phases: List[str] = []
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._devices = block_devices()
+        self._previous = None
+
+    @property
+    def current_phase(self) -> str:
+        return self._phases[-1] if self._phases else "idle"
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Attribute samples taken inside the block to the named phase"""
+        self._phases.append(name)
+        try:
+            yield
+        finally:
+            # Make sure even a short phase gets at least one sample
+            self._sample_once()
+            self._phases.pop()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._sample_once()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def _sample_once(self):
+        with self._lock:
+            self._record_sample()
+
+    def _record_sample(self):
+        now = time.monotonic()
+        cpu = read_cpu_times()
+        disk = read_disk_sectors(self._devices)
+        previous, self._previous = self._previous, (now, cpu, disk)
+        if previous is None:
+            return
+        elapsed = max(now - previous[0], 1e-6)
+        cpu_delta = [current - before for current, before in zip(cpu, previous[1])]
+        total = sum(cpu_delta) or 1
+        idle = cpu_delta[3] + (cpu_delta[4] if len(cpu_delta) > 4 else 0)
+        meminfo = read_meminfo()
+        self.samples.append({
+            "time": time.time(),
+            "phase": self.current_phase,
+            "mem_used_gb": (meminfo["MemTotal"] - meminfo.get("MemAvailable", meminfo["MemFree"])) / (1024 * 1024),
+            "load_1m": read_loadavg(),
+            "cpu_percent": 100.0 * (total - idle) / total,
+            "iowait_percent": 100.0 * (cpu_delta[4] if len(cpu_delta) > 4 else 0) / total,
+            "disk_read_mb_s": (disk[0] - previous[2][0]) * SECTOR_BYTES / (1024 * 1024) / elapsed,
+            "disk_write_mb_s": (disk[1] - previous[2][1]) * SECTOR_BYTES / (1024 * 1024) / elapsed,
+            "disk_used_gb": disk_usage_gb()["used"]
+        })
+
+    def start(self):
+        # Prime the CPU and disk counters so the first real sample has a baseline
+        self._sample_once()
+        super().start()
+
+    def peaks(self) -> Dict[str, Dict[str, float]]:
+        """Return the maximum of every metric per phase"""
+        peaks = {}
+        for sample in self.samples:
+            phase = peaks.setdefault(sample["phase"], {metric: 0.0 for metric in self.METRICS})
+            for metric in self.METRICS:
+                phase[metric] = max(phase[metric], sample[metric])
+        return peaks
+
+    def peaks_table(self) -> str:
+        """Render per-phase peaks as a plain-text table"""
+        lines = [f"{'Phase':<24}{'Mem GB':>8}{'Load':>7}{'CPU %':>7}{'IOwait':>8}{'Rd MB/s':>9}{'Wr MB/s':>9}{'Disk GB':>9}"]
+        for phase, peak in self.peaks().items():
+            lines.append(f"{phase[:23]:<24}{peak['mem_used_gb']:>8.2f}{peak['load_1m']:>7.2f}{peak['cpu_percent']:>7.1f}"
+                         f"{peak['iowait_percent']:>8.1f}{peak['disk_read_mb_s']:>9.1f}{peak['disk_write_mb_s']:>9.1f}"
+                         f"{peak['disk_used_gb']:>9.1f}")
+        return "\n".join(lines)
+
+    def write_report(self, path: str):
+        """Write the per-phase peaks and the full time series as JSON"""
+        with open(path, "w") as f:
+            json.dump({"interval": self.interval, "peaks": self.peaks(), "samples": self.samples}, f, indent=2)
+
+_active: Optional[ResourceSampler] = None
+
+def start_sampling(interval: float = DEFAULT_INTERVAL_SECONDS) -> Optional[ResourceSampler]:
+    """Start the process-wide sampler; returns None where /proc is unavailable"""
+    global _active
+    if not os.path.exists("/proc/stat"):
+        return None
+    _active = ResourceSampler(interval)
+    _active.start()
+    return _active
+
+def stop_sampling() -> Optional[ResourceSampler]:
+    """Stop the process-wide sampler and return it for reporting"""
+    global _active
+    sampler, _active = _active, None
+    if sampler:
+        sampler.stop()
+    return sampler
+
+def phase(name: str):
+    """Attribute samples to a phase on the active sampler, or do nothing if none is running"""
+    return _active.phase(name) if _active else contextlib.nullcontext()
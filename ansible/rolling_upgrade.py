@@ -0,0 +1,283 @@
+"""Rolling upgrade of many servers with upgrade_server_components.py
+
+Hosts come from an inventory file (plain host-per-line or Ansible INI). A
+canary batch is upgraded first, then the remaining hosts in batches. Up to
+--concurrency hosts in a batch run at once. Over ssh, the upgrade script and
+the modules it imports are first copied to REMOTE_DIR on each host. The
+thresholds are checked as each host finishes: once a canary fails, or once
+the failures exceed --max-failure-rate of the hosts rolled out so far, no
+new hosts are started. Each host's output is streamed with a [host] prefix,
+and a progress line is printed as each host finishes.
+
+    python ansible/rolling_upgrade.py -i hosts.ini --concurrency 50 --batch-size 100
+    python ansible/rolling_upgrade.py -i hosts.ini --phase prefetch
+    python ansible/rolling_upgrade.py -i hosts.ini --ssh-command "python ansible/benchmarks/fake_ssh.py"
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import command_runner
+
+DEFAULT_CONCURRENCY = 20
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CANARY_HOSTS = 1
+DEFAULT_MAX_FAILURE_RATE = 0.1
+HOST_TIMEOUT_SECONDS = 3600
+REPORT_FILE = "rolling-upgrade-report.json"
+REMOTE_SCRIPT = "upgrade_server_components.py"
+# The upgrade script and the local modules it imports
+REMOTE_FILES = [REMOTE_SCRIPT, "command_runner.py", "probe_cache.py"]
+# Relative to the remote user's home directory
+REMOTE_DIR = ".cache/devops-public/rolling-upgrade"
+SSH_OPTIONS = "-o BatchMode=yes -o ConnectTimeout=10 -o StrictHostKeyChecking=accept-new"
+# Output lines kept per host for the report
+REPORT_TAIL_LINES = 20
+
+class Host(NamedTuple):
+    name: str
+    address: str
+    user: str = ""
+
+class HostResult(NamedTuple):
+    host: str
+    batch: str
+    returncode: int
+    seconds: float
+    output_tail: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0
+
+def load_inventory(path: str, group: Optional[str] = None) -> List[Host]:
+    """Read hosts from a host-per-line or Ansible INI inventory, optionally from one group only"""
+    hosts: Dict[str, Host] = {}
+    section = ""
+    with open(path) as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if line.startswith("["):
+                section = line.strip("[]")
+                continue
+            # Group variable and child sections do not list hosts
+            if ":" in section or (group and section != group):
+                continue
+            name, *settings = line.split()
+            variables = dict(setting.split("=", 1) for setting in settings if "=" in setting)
+            hosts.setdefault(name, Host(name, variables.get("ansible_host", name), variables.get("ansible_user", "")))
+    return list(hosts.values())
+
+class LocalTransport:
+    """Runs the upgrade command on this machine, with the host name in ROLLING_UPGRADE_HOST"""
+
+    def command(self, host: Host, remote_command: str) -> str:
+        return remote_command
+
+    def copy_command(self, host: Host, files: List[str], remote_dir: str) -> Optional[str]:
+        # The upgrade runs from this checkout
+        return None
+
+    def env(self, host: Host) -> Optional[dict]:
+        return dict(os.environ, ROLLING_UPGRADE_HOST=host.name)
+
+class SshTransport:
+    """Runs the upgrade command over SSH; ssh_command can name a stand-in for testing"""
+
+    def __init__(self, ssh_command: str = "ssh", options: str = SSH_OPTIONS):
+        self.ssh_command = ssh_command
+        self.options = options
+
+    def command(self, host: Host, remote_command: str) -> str:
+        target = f"{host.user}@{host.address}" if host.user else host.address
+        return f"{self.ssh_command} {self.options} {target} {shlex.quote(remote_command)}"
+
+    def copy_command(self, host: Host, files: List[str], remote_dir: str) -> Optional[str]:
+        """Copy local files into remote_dir as a tar stream over the same ssh client and options"""
+        local_dir = os.path.dirname(os.path.abspath(__file__))
+        names = " ".join(shlex.quote(name) for name in files)
+        unpack = f"mkdir -p {remote_dir} && tar -C {remote_dir} -xf -"
+        return f"tar -C {shlex.quote(local_dir)} -cf - {names} | {self.command(host, unpack)}"
+
+    def env(self, host: Host) -> Optional[dict]:
+        return None
+
+class RollingUpgrade:
+    """Upgrades hosts in a canary batch and then fixed-size batches, aborting on too many failures"""
+
+    def __init__(self, transport, remote_command: str, concurrency: int = DEFAULT_CONCURRENCY,
+                 batch_size: int = DEFAULT_BATCH_SIZE, canary: int = DEFAULT_CANARY_HOSTS,
+                 max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE, timeout: float = HOST_TIMEOUT_SECONDS,
+                 quiet: bool = False, copy_files: Optional[List[str]] = None):
+        self.transport = transport
+        self.remote_command = remote_command
+        self.copy_files = copy_files or []
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.canary = canary
+        self.max_failure_rate = max_failure_rate
+        self.timeout = timeout
+        self.quiet = quiet
+        self.results: List[HostResult] = []
+        self.aborted = ""
+        # A private engine, so the rollout is not held to the engine-wide command limit
+        self._engine = command_runner.ExecutionEngine(max_concurrency=concurrency)
+        self._print_lock = threading.Lock()
+        self._total = 0
+        # Hosts in the batches started so far, the base of the failure budget
+        self._rolled_out = 0
+
+    def _print(self, message: str):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def batches(self, hosts: List[Host]) -> List[tuple]:
+        """Split hosts into (label, hosts) batches, canaries first"""
+        canaries, rest = hosts[:self.canary], hosts[self.canary:]
+        batches = [("canary", canaries)] if canaries else []
+        for index, start in enumerate(range(0, len(rest), self.batch_size), start=1):
+            batches.append((f"batch {index}", rest[start:start + self.batch_size]))
+        return batches
+
+    def upgrade_host(self, host: Host, batch: str) -> Optional[HostResult]:
+        """Upgrade one host; returns None without starting it once the rollout is aborting"""
+        if self.aborted:
+            return None
+
+        def echo(line: str, stream: str):
+            if not self.quiet:
+                self._print(f"[{host.name}] {line}")
+
+        started = time.monotonic()
+        copy = self.transport.copy_command(host, self.copy_files, REMOTE_DIR) if self.copy_files else None
+        result = self._engine.run(copy, echo=echo, tail_lines=REPORT_TAIL_LINES, timeout=self.timeout) if copy else None
+        if not result or result.returncode == 0:
+            result = self._engine.run(self.transport.command(host, self.remote_command), echo=echo,
+                                      tail_lines=REPORT_TAIL_LINES, timeout=self.timeout, env=self.transport.env(host))
+        lines = (result.stdout + "\n" + result.stderr).strip().splitlines()
+        host_result = HostResult(host.name, batch, result.returncode, time.monotonic() - started,
+                                 lines[-REPORT_TAIL_LINES:])
+        with self._print_lock:
+            self.results.append(host_result)
+            failed = sum(1 for r in self.results if not r.ok)
+            status = "ok" if host_result.ok else f"FAILED (exit {host_result.returncode})"
+            print(f"[{len(self.results)}/{self._total} done, {failed} failed] {host.name}: {status} "
+                  f"in {host_result.seconds:.1f}s", flush=True)
+            self._check_thresholds(host_result, failed)
+        return host_result
+
+    def _check_thresholds(self, host_result: HostResult, failed: int):
+        """Abort as soon as a canary fails or the failures exceed the budget of the batches started so far
+
+        Failures only grow, so this fires exactly when the end-of-batch
+        failure rate would, just without waiting for the batch to finish.
+        """
+        if self.aborted:
+            return
+        if host_result.batch == "canary" and not host_result.ok:
+            self.aborted = "a canary host failed"
+        elif failed > self.max_failure_rate * self._rolled_out:
+            self.aborted = (f"{failed} failed hosts exceed {self.max_failure_rate:.0%} "
+                            f"of the {self._rolled_out} hosts rolled out so far")
+        if self.aborted:
+            print(f"\nAborting the rollout: {self.aborted}; no new hosts will be started", flush=True)
+
+    def failure_rate(self) -> float:
+        return sum(1 for r in self.results if not r.ok) / len(self.results) if self.results else 0.0
+
+    def run(self, hosts: List[Host]) -> bool:
+        """Roll the upgrade out to every host; returns True if all hosts succeeded"""
+        self._total = len(hosts)
+        for label, batch in self.batches(hosts):
+            self._print(f"\n=== {label}: {len(batch)} hosts ===")
+            self._rolled_out += len(batch)
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                list(executor.map(lambda host: self.upgrade_host(host, label), batch))
+            if self.aborted:
+                break
+        return not self.aborted and all(r.ok for r in self.results)
+
+    def summary(self, hosts: List[Host], elapsed: float) -> str:
+        done = {r.host for r in self.results}
+        failed = [r for r in self.results if not r.ok]
+        lines = [f"Upgraded {len(self.results) - len(failed)} of {len(hosts)} hosts in {elapsed:.1f}s "
+                 f"({len(failed)} failed, {len(hosts) - len(done)} not attempted)"]
+        if self.results:
+            slowest = max(self.results, key=lambda r: r.seconds)
+            lines.append(f"Slowest host: {slowest.host} ({slowest.seconds:.1f}s); "
+                         f"sequential total would be {sum(r.seconds for r in self.results):.1f}s")
+        for result in failed:
+            lines.append(f"  {result.host}: exit {result.returncode}: {result.output_tail[-1] if result.output_tail else ''}")
+        return "\n".join(lines)
+
+    def write_report(self, hosts: List[Host], path: str):
+        done = {r.host for r in self.results}
+        with open(path, "w") as f:
+            json.dump({"aborted": self.aborted, "results": [r._asdict() for r in self.results],
+                       "not_attempted": [h.name for h in hosts if h.name not in done]}, f, indent=2)
+
+def default_remote_command(transport: str, phase: str) -> str:
+    """The upgrade command for a phase; local runs use this checkout, remote hosts the copy in REMOTE_DIR"""
+    if transport == "local":
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), REMOTE_SCRIPT)
+    else:
+        script = f"{REMOTE_DIR}/{REMOTE_SCRIPT}"
+    interpreter = sys.executable if transport == "local" else "python3"
+    command = f"{interpreter} {script}"
+    return f"{command} --{phase}" if phase != "all" else command
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upgrade many servers in canary-first rolling batches")
+    parser.add_argument("-i", "--inventory", required=True, help="Inventory file (host per line or Ansible INI)")
+    parser.add_argument("--group", help="Only upgrade hosts in this inventory group")
+    parser.add_argument("--transport", choices=["ssh", "local"], default="ssh")
+    parser.add_argument("--ssh-command", default="ssh", help="SSH client to run, e.g. a local stand-in for testing")
+    parser.add_argument("--phase", choices=["all", "prefetch", "apply"], default="all",
+                        help="Upgrade phase to run on every host")
+    parser.add_argument("--remote-command", help="Command to run on each host instead of the upgrade script")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Hosts upgraded at once")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Hosts per batch after the canary")
+    parser.add_argument("--canary", type=int, default=DEFAULT_CANARY_HOSTS, help="Hosts in the first, canary batch")
+    parser.add_argument("--max-failure-rate", type=float, default=DEFAULT_MAX_FAILURE_RATE,
+                        help="Abort when more than this fraction of finished hosts failed")
+    parser.add_argument("--timeout", type=float, default=HOST_TIMEOUT_SECONDS, help="Seconds allowed per host")
+    parser.add_argument("--quiet", action="store_true", help="Show only per-host progress, not their output")
+    parser.add_argument("--report", default=REPORT_FILE, help="Write per-host results to this JSON file")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    hosts = load_inventory(args.inventory, args.group)
+    if not hosts:
+        print(f"No hosts found in {args.inventory}")
+        sys.exit(1)
+    transport = LocalTransport() if args.transport == "local" else SshTransport(args.ssh_command)
+    remote_command = args.remote_command or default_remote_command(args.transport, args.phase)
+    # A custom remote command brings its own files
+    copy_files = None if args.remote_command else REMOTE_FILES
+    rollout = RollingUpgrade(transport, remote_command, concurrency=args.concurrency, batch_size=args.batch_size,
+                             canary=args.canary, max_failure_rate=args.max_failure_rate, timeout=args.timeout,
+                             quiet=args.quiet, copy_files=copy_files)
+
+    print(f"Upgrading {len(hosts)} hosts ({args.canary} canary, batches of {args.batch_size}, "
+          f"{args.concurrency} at a time)...")
+    started = time.monotonic()
+    succeeded = rollout.run(hosts)
+    rollout.write_report(hosts, args.report)
+
+    print("\n=== Rolling Upgrade Summary ===")
+    print(rollout.summary(hosts, time.monotonic() - started))
+    print(f"Per-host results written to {args.report}")
+    if not succeeded:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
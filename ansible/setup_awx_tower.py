@@ -1,42 +1,220 @@
-import subprocess
 import os
+import base64
+import hashlib
+import http.client
+import argparse
+import json
 import platform
 import distro
+import command_runner
+import probe_cache
+import resource_sampler
+import tracing
+import artifact_cache
+import awx_sizing
+import registry_mirror
+import kube_client
 import sys
 import time
-from typing import Tuple, Dict
+import functools
+import atexit
+import contextlib
+import shutil
+import socket
+import tarfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple, Dict, List
 
 # Global configuration
 VERBOSE = True
 REQUIRED_MEMORY_GB = 4
 REQUIRED_CPU_CORES = 2
 REQUIRED_DISK_SPACE_GB = 20
+PROBE_TIMEOUT_SECONDS = 30
+COMMAND_REPORT_FILE = "awx-setup-commands.json"
+RESOURCE_REPORT_FILE = "awx-setup-resources.json"
+AWX_READY_TIMEOUT_SECONDS = 900
+READINESS_INITIAL_DELAY_SECONDS = 1
+READINESS_MAX_DELAY_SECONDS = 15
+# Deployments that serve AWX: separate web and task since operator 2.0, a single one before
+AWX_SERVING_DEPLOYMENTS = ["awx-web", "awx-task"]
+AWX_LEGACY_DEPLOYMENT = "awx"
+AWX_ADMIN_SECRET = "awx-admin-password"
+AWX_OPERATOR_REPO_NAME = "awx-operator"
+AWX_OPERATOR_REPO_URL = "https://ansible-community.github.io/awx-operator-helm/"
+AWX_OPERATOR_CHART = "awx-operator/awx-operator"
+# Pinned together with the images the registry mirror seeds; bump it in
+# registry_mirror.py. Empty means the newest version in the local repo index.
+AWX_OPERATOR_CHART_VERSION = registry_mirror.AWX_OPERATOR_VERSION
+AWX_OPERATOR_VALUES: Dict[str, object] = {}
+AWX_OPERATOR_VALUES_FILE = "awx-operator-values.yaml"
+# Extra AWX custom resource spec fields, filled in by --auto-size
+AWX_SPEC_FIELDS: Dict[str, object] = {}
+DEPLOY_STATE_FILE = ".awx-deploy-state.json"
+# Incremental runs refresh the Helm repository index at most this often
+HELM_REPO_REFRESH_SECONDS = 24 * 3600
+# Pinned Helm release in artifacts.json, and the binary inside it
+HELM_ARCHIVE = "helm-v3.12.3-linux-amd64.tar.gz"
+HELM_ARCHIVE_BINARY = "linux-amd64/helm"
+KIND_CLUSTER_NAME = "awx-cluster"
+AWX_NODEPORT = 30080
+RESUME_TIMEOUT_SECONDS = 30
+FLEET_DIR = "awx-fleet"
+FLEET_FILE = os.path.join(FLEET_DIR, "fleet.json")
+FLEET_BASE_PORT = 30100
+# Concurrent `kind create cluster` runs; each one boots a node container and unpacks its image
+KIND_CREATE_CONCURRENCY = 2
+# What --status reads: resource -> kind
+STATUS_RESOURCES = {"deployments": "Deployment", "pods": "Pod", "services": "Service", "secrets": "Secret",
+                    "awxs": "AWX"}
+STATUS_REFRESH_SECONDS = 5
+# Last teardown time per mode, for comparing fast and graceful cleanup
+TEARDOWN_TIMINGS_FILE = os.path.join(os.path.expanduser("~"), ".cache", "devops-public", "teardown-timings.json")
+STATUS_REWATCH_SECONDS = 1
+STATUS_REDRAW_DELAY_SECONDS = 0.2
+
+class ClusterSpec(NamedTuple):
+    """A Kind cluster hosting one AWX instance, with its own host port and files"""
+    name: str
+    host_port: int
+    workdir: str = ""
+    # Empty means the user's default kubeconfig
+    kubeconfig: str = ""
+
+    @property
+    def context(self) -> str:
+        return f"kind-{self.name}"
+
+DEFAULT_CLUSTER = ClusterSpec(KIND_CLUSTER_NAME, AWX_NODEPORT)
+_cluster_context = threading.local()
+_buffered_output = threading.local()
+_kind_create_slots = threading.BoundedSemaphore(KIND_CREATE_CONCURRENCY)
+
+def current_cluster() -> ClusterSpec:
+    """Return the cluster the calling thread is working on"""
+    return getattr(_cluster_context, "cluster", DEFAULT_CLUSTER)
+
+@contextlib.contextmanager
+def use_cluster(cluster: ClusterSpec):
+    """Direct the calling thread's commands and files at one cluster"""
+    previous = current_cluster()
+    _cluster_context.cluster = cluster
+    tracing.name_thread(cluster.name)
+    try:
+        yield cluster
+    finally:
+        _cluster_context.cluster = previous
+
+def cluster_file(name: str) -> str:
+    """Return the path of a generated file in the current cluster's directory"""
+    return os.path.join(current_cluster().workdir, name)
+
+def _show(message: str, level: int, cluster: ClusterSpec, lines: Optional[List[str]]):
+    prefix = "  " * level
+    if cluster is not DEFAULT_CLUSTER:
+        # Output from concurrently provisioned clusters is interleaved
+        prefix = f"[{cluster.name}] {prefix}"
+    if lines is not None:
+        lines.append(f"{prefix}{message}")
+    else:
+        print(f"{prefix}{message}")
 
 def print_verbose(message: str, level: int = 0):
     """Print verbose output with indentation based on level"""
     if VERBOSE:
-        prefix = "  " * level
-        print(f"{prefix}{message}")
+        _show(message, level, current_cluster(), getattr(_buffered_output, "lines", None))
+
+@contextlib.contextmanager
+def buffered_output() -> Iterator[List[str]]:
+    """Collect the calling thread's verbose output instead of printing it, so concurrent work prints whole blocks"""
+    previous = getattr(_buffered_output, "lines", None)
+    _buffered_output.lines = lines = []
+    try:
+        yield lines
+    finally:
+        _buffered_output.lines = previous
+
+def _output_echo() -> Callable[[str, str], None]:
+    """Echo for streamed command output at command-output indentation
 
-def run_command(command: str, use_sudo: bool = False, check: bool = True) -> Tuple[int, str, str]:
-    """Run a shell command with verbose output"""
+    The output arrives on the engine's reader threads, so the calling
+    thread's cluster and output buffer are captured here.
+    """
+    cluster = current_cluster()
+    lines = getattr(_buffered_output, "lines", None)
+
+    def echo(line: str, stream: str):
+        if VERBOSE:
+            _show(line, 2, cluster, lines)
+    return echo
+
+def run_command(command: str, use_sudo: bool = False, check: bool = True, timeout: Optional[float] = None,
+                quiet: bool = False, full_output: bool = False) -> Tuple[int, str, str]:
+    """Run a shell command, streaming its output as it arrives"""
     if use_sudo:
         command = f"echo 'your_password' | sudo -S {command}"
     print_verbose(f"Executing: {command}", 1)
     
-    result = subprocess.run(command, shell=True, capture_output=True, text=True, env=os.environ)
+    tail_lines = None if full_output else command_runner.DEFAULT_TAIL_LINES
+    kubeconfig = current_cluster().kubeconfig
+    env = dict(os.environ, KUBECONFIG=kubeconfig) if kubeconfig else None
+    result = command_runner.run_command(command, echo=None if quiet else _output_echo(),
+                                        tail_lines=tail_lines, timeout=timeout, env=env)
     
     if result.returncode != 0 and check:
         print_verbose(f"Error running command: {command}", 1)
-        print_verbose(f"Error output: {result.stderr}", 2)
-    else:
-        print_verbose(f"Command output: {result.stdout}", 2)
+        if quiet:
+            print_verbose(f"Error output: {result.stderr}", 2)
+
+    return result
+
+def run_probe(command: str, timeout: Optional[float] = None) -> Tuple[int, str, str]:
+    """Run a tool version probe, reusing the cached result while the binary is unchanged"""
+    cached = probe_cache.lookup(command)
+    if cached:
+        print_verbose(f"Using cached result of: {command}", 1)
+        return cached
+    result = run_command(command, check=False, timeout=timeout)
+    probe_cache.store(command, result)
+    return result
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until a time.monotonic() deadline, for a command timeout; None means no deadline"""
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
 
-    return result.returncode, result.stdout, result.stderr
+def kube_api() -> Optional[kube_client.KubeClient]:
+    """Return the pooled API client for the current cluster, or None if there is no usable kubeconfig"""
+    return kube_client.client_for(current_cluster().kubeconfig or None)
 
-def check_system_resources() -> Dict[str, bool]:
-    """Check system resources and return status"""
+def api_request(description: str, request: Callable[[kube_client.KubeClient], object]) -> Tuple[bool, object]:
+    """Send a request through the in-process API client instead of starting kubectl
+
+    Returns (False, None) when there is no client or the API server cannot be
+    reached, so the caller falls back to kubectl. An error answer from the
+    server is returned as (True, ApiError).
+    """
+    api = kube_api()
+    if api is None:
+        return False, None
+    print_verbose(f"API request: {description}", 1)
+    try:
+        return True, request(api)
+    except kube_client.ApiError as e:
+        print_verbose(f"API error: {e}", 2)
+        return True, e
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        print_verbose(f"API request failed ({e}), using kubectl instead", 2)
+        return False, None
+
+@tracing.traced
+def check_system_resources(clusters: int = 1) -> Dict[str, bool]:
+    """Check system resources for the given number of clusters and return status"""
     print_verbose("Checking system resources...")
+    required_memory_gb = REQUIRED_MEMORY_GB * clusters
+    required_cpu_cores = REQUIRED_CPU_CORES * clusters
+    required_disk_space_gb = REQUIRED_DISK_SPACE_GB * clusters
     status = {
         "memory": False,
         "cpu": False,
@@ -45,33 +223,30 @@ def check_system_resources() -> Dict[str, bool]:
     
     # Check memory
     if platform.system() == "Linux":
-        with open("/proc/meminfo") as f:
-            meminfo = f.read()
-            total_memory_kb = int(meminfo.split("MemTotal:")[1].split()[0])
-            total_memory_gb = total_memory_kb / (1024 * 1024)
-            status["memory"] = total_memory_gb >= REQUIRED_MEMORY_GB
-            print_verbose(f"Total memory: {total_memory_gb:.2f}GB (Required: {REQUIRED_MEMORY_GB}GB)", 1)
+        total_memory_gb = resource_sampler.read_meminfo()["MemTotal"] / (1024 * 1024)
+        status["memory"] = total_memory_gb >= required_memory_gb
+        print_verbose(f"Total memory: {total_memory_gb:.2f}GB (Required: {required_memory_gb}GB)", 1)
     
     # Check CPU cores
     cpu_count = os.cpu_count()
-    status["cpu"] = cpu_count >= REQUIRED_CPU_CORES
-    print_verbose(f"CPU cores: {cpu_count} (Required: {REQUIRED_CPU_CORES})", 1)
+    status["cpu"] = cpu_count >= required_cpu_cores
+    print_verbose(f"CPU cores: {cpu_count} (Required: {required_cpu_cores})", 1)
     
     # Check disk space
     if platform.system() == "Linux":
-        stat = os.statvfs('/')
-        free_space_gb = (stat.f_bavail * stat.f_frsize) / (1024**3)
-        status["disk"] = free_space_gb >= REQUIRED_DISK_SPACE_GB
-        print_verbose(f"Free disk space: {free_space_gb:.2f}GB (Required: {REQUIRED_DISK_SPACE_GB}GB)", 1)
+        free_space_gb = resource_sampler.disk_usage_gb('/')["free"]
+        status["disk"] = free_space_gb >= required_disk_space_gb
+        print_verbose(f"Free disk space: {free_space_gb:.2f}GB (Required: {required_disk_space_gb}GB)", 1)
     
     return status
 
-def check_docker() -> bool:
+@tracing.traced(record_result=True)
+def check_docker(deadline: Optional[float] = None) -> bool:
     """Check Docker installation and status"""
     print_verbose("Checking Docker installation...")
     
     # Check Docker version
-    returncode, stdout, stderr = run_command("docker --version", check=False)
+    returncode, stdout, stderr = run_probe("docker --version", timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("Docker is not installed", 1)
         return False
@@ -79,7 +254,7 @@ def check_docker() -> bool:
     print_verbose(f"Docker version: {stdout.strip()}", 1)
     
     # Check Docker daemon
-    returncode, stdout, stderr = run_command("docker info", check=False)
+    returncode, stdout, stderr = run_command("docker info", check=False, timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("Docker daemon is not running", 1)
         return False
@@ -87,12 +262,13 @@ def check_docker() -> bool:
     print_verbose("Docker daemon is running", 1)
     return True
 
-def check_kubernetes() -> bool:
+@tracing.traced(record_result=True)
+def check_kubernetes(deadline: Optional[float] = None) -> bool:
     """Check Kubernetes installation and status"""
     print_verbose("Checking Kubernetes installation...")
     
     # Check kubectl version
-    returncode, stdout, stderr = run_command("kubectl version --client", check=False)
+    returncode, stdout, stderr = run_probe("kubectl version --client", timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("kubectl is not installed", 1)
         return False
@@ -100,7 +276,11 @@ def check_kubernetes() -> bool:
     print_verbose(f"kubectl version: {stdout.strip()}", 1)
     
     # Check cluster connection
-    returncode, stdout, stderr = run_command("kubectl cluster-info", check=False)
+    handled, result = api_request("get /version", lambda api: api.request("GET", "/version"))
+    if handled:
+        returncode = 1 if isinstance(result, kube_client.ApiError) else 0
+    else:
+        returncode, stdout, stderr = run_command("kubectl cluster-info", check=False, timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("Cannot connect to Kubernetes cluster", 1)
         return False
@@ -108,11 +288,12 @@ def check_kubernetes() -> bool:
     print_verbose("Connected to Kubernetes cluster", 1)
     return True
 
-def check_helm() -> bool:
+@tracing.traced(record_result=True)
+def check_helm(deadline: Optional[float] = None) -> bool:
     """Check Helm installation"""
     print_verbose("Checking Helm installation...")
     
-    returncode, stdout, stderr = run_command("helm version", check=False)
+    returncode, stdout, stderr = run_probe("helm version", timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("Helm is not installed", 1)
         return False
@@ -120,11 +301,12 @@ def check_helm() -> bool:
     print_verbose(f"Helm version: {stdout.strip()}", 1)
     return True
 
-def check_kind() -> bool:
+@tracing.traced(record_result=True)
+def check_kind(deadline: Optional[float] = None) -> bool:
     """Check Kind installation"""
     print_verbose("Checking Kind installation...")
     
-    returncode, stdout, stderr = run_command("kind version", check=False)
+    returncode, stdout, stderr = run_probe("kind version", timeout=time_left(deadline))
     if returncode != 0:
         print_verbose("Kind is not installed", 1)
         return False
@@ -132,13 +314,70 @@ def check_kind() -> bool:
     print_verbose(f"Kind version: {stdout.strip()}", 1)
     return True
 
+def _timed_probe(probe: Callable[..., bool], deadline: float) -> Tuple[bool, float, List[str]]:
+    """Run a single prerequisite probe and return its result, duration and buffered output"""
+    started = time.monotonic()
+    with buffered_output() as output:
+        try:
+            passed = probe(deadline=deadline)
+        except Exception as e:
+            print_verbose(f"Probe {probe.__name__} failed: {e}", 1)
+            passed = False
+    return passed, time.monotonic() - started, output
+
+@tracing.traced
+def run_preflight_checks(timeout: float = PROBE_TIMEOUT_SECONDS) -> Tuple[Dict[str, bool], Dict[str, float]]:
+    """Run all prerequisite probes concurrently and return pass/fail status and timing per probe"""
+    probes = {
+        "docker": check_docker,
+        "kubernetes": check_kubernetes,
+        "helm": check_helm,
+        "kind": check_kind
+    }
+    print_verbose(f"Running {len(probes)} prerequisite probes concurrently (timeout: {timeout}s)...")
+    status = {}
+    timings = {}
+
+    started = time.monotonic()
+    # All probes start together and share one deadline, which every command
+    # they run is held to, however many commands a probe needs
+    deadline = started + timeout
+    executor = ThreadPoolExecutor(max_workers=len(probes))
+    timed_probe = tracing.in_current_context(_timed_probe)
+    futures = {executor.submit(timed_probe, probe, deadline): name for name, probe in probes.items()}
+    try:
+        # Each probe's output is printed as one block when it finishes
+        for future in as_completed(futures, timeout=time_left(deadline)):
+            status[futures[future]], timings[futures[future]], output = future.result()
+            for line in output:
+                print(line)
+    except FutureTimeoutError:
+        for name in probes:
+            if name not in status:
+                print_verbose(f"Probe '{name}' did not finish within {timeout}s", 1)
+                status[name], timings[name] = False, timeout
+    finally:
+        # Do not wait for a probe stuck past the deadline (an API request, say);
+        # its commands are already being killed by their own timeouts
+        executor.shutdown(wait=False, cancel_futures=True)
+    elapsed = time.monotonic() - started
+
+    print_verbose("Preflight results:", 1)
+    for name in probes:
+        result = "ok" if status[name] else "FAILED"
+        print_verbose(f"{name}: {result} ({timings[name]:.2f}s)", 2)
+    print_verbose(f"Preflight took {elapsed:.2f}s (sequential total would be {sum(timings.values()):.2f}s)", 1)
+
+    return status, timings
+
+@functools.lru_cache(maxsize=None)
 def determine_os_family() -> str:
     """Determine OS family with verbose output"""
     print_verbose("Detecting operating system...")
     platform_type = platform.system().lower()
     
     if platform_type == 'linux':
-        os_family = distro.id().lower()
+        os_family = probe_cache.cached_value("distro.id", ["/etc/os-release"], distro.id).lower()
         if 'redhat' in os_family or 'centos' in os_family or 'fedora' in os_family or 'rocky' in os_family:
             print_verbose("Detected RedHat-based Linux distribution", 1)
             return 'redhat'
@@ -155,6 +394,20 @@ def determine_os_family() -> str:
     print_verbose("Unknown operating system", 1)
     return 'unknown'
 
+@tracing.traced
+def install_helm():
+    """Install Helm from the pinned release archive in the artifact cache, without further downloads"""
+    try:
+        archive = artifact_cache.fetch(HELM_ARCHIVE)
+    except artifact_cache.ArtifactError as e:
+        print_verbose(f"Could not obtain the Helm archive: {e}", 1)
+        return
+    with tempfile.TemporaryDirectory() as workdir:
+        with tarfile.open(archive) as f:
+            f.extract(HELM_ARCHIVE_BINARY, workdir)
+        run_command(f"sudo install -m 0755 {os.path.join(workdir, HELM_ARCHIVE_BINARY)} /usr/local/bin/helm")
+
+@tracing.traced
 def install_kubernetes_tools():
     """Install Kubernetes tools with verbose output"""
     os_family = determine_os_family()
@@ -176,7 +429,7 @@ gpgkey=https://pkgs.k8s.io/core:/stable:/v1.32/rpm/repodata/repomd.xml.key
 """
         run_command(f"echo '{kubernetes_repo}' | sudo tee /etc/yum.repos.d/kubernetes.repo")
         run_command("sudo yum install -y kubectl")
-        run_command("curl https://raw.githubusercontent.com/helm/helm/main/scripts/get-helm-3 | bash")
+        install_helm()
     elif os_family == 'debian':
         print_verbose("Installing kubectl and helm on Debian...", 1)
         run_command("sudo apt-get install -y apt-transport-https ca-certificates curl")
@@ -184,8 +437,10 @@ gpgkey=https://pkgs.k8s.io/core:/stable:/v1.32/rpm/repodata/repomd.xml.key
         run_command("echo 'deb [signed-by=/usr/share/keyrings/kubernetes-archive-keyring.gpg] https://apt.kubernetes.io/ kubernetes-xenial main' | sudo tee /etc/apt/sources.list.d/kubernetes.list")
         run_command("sudo apt-get update")
         run_command("sudo apt-get install -y kubectl")
-        run_command("curl https://raw.githubusercontent.com/helm/helm/main/scripts/get-helm-3 | bash")
+        install_helm()
+    probe_cache.invalidate("kubectl", "helm")
 
+@tracing.traced
 def install_kind():
     """Install Kind with verbose output"""
     os_family = determine_os_family()
@@ -196,112 +451,535 @@ def install_kind():
         run_command("choco install kind -y")
     elif os_family in ['redhat', 'debian']:
         print_verbose("Installing Kind on Linux...", 1)
-        run_command("curl -Lo ./kind https://kind.sigs.k8s.io/dl/v0.20.0/kind-linux-amd64")
-        run_command("chmod +x ./kind")
+        try:
+            artifact_cache.install("kind-linux-amd64", "./kind", mode=0o755)
+        except artifact_cache.ArtifactError as e:
+            print_verbose(f"Could not obtain the Kind binary: {e}", 1)
+            return
         run_command("sudo mv ./kind /usr/local/bin/kind")
     elif os_family == 'macos':
         print_verbose("Installing Kind on macOS...", 1)
         run_command("brew install kind")
+    probe_cache.invalidate("kind")
 
-def create_kind_cluster():
-    """Create and verify Kind cluster"""
-    print_verbose("Creating Kind cluster...")
-    
-    # Check if cluster already exists
-    returncode, stdout, stderr = run_command("kind get clusters", check=False)
-    if returncode == 0 and "awx-cluster" in stdout:
-        print_verbose("Kind cluster 'awx-cluster' already exists", 1)
-    else:
-        # Create new cluster with specific name
-        print_verbose("Creating new Kind cluster 'awx-cluster'...", 1)
-        kind_config = """
+def render_kind_config(use_registry_mirror: bool = False) -> str:
+    """Render the Kind cluster configuration"""
+    kind_config = f"""
 kind: Cluster
 apiVersion: kind.x-k8s.io/v1alpha4
 nodes:
 - role: control-plane
   extraPortMappings:
-  - containerPort: 30080
-    hostPort: 30080
+  - containerPort: {AWX_NODEPORT}
+    hostPort: {current_cluster().host_port}
     protocol: TCP
 """
-        with open("kind-config.yaml", "w") as f:
-            f.write(kind_config)
-        
-        run_command("kind create cluster --name awx-cluster --config kind-config.yaml")
-    
-    # Verify cluster is ready
-    print_verbose("Verifying cluster status...", 1)
-    run_command("kubectl cluster-info")
-    run_command("kubectl get nodes")
+    if use_registry_mirror:
+        kind_config += registry_mirror.containerd_config_patches()
+    return kind_config
 
-def deploy_awx_kubernetes():
-    """Deploy AWX on Kubernetes with verbose output"""
-    print_verbose("Deploying AWX on Kubernetes...")
+@tracing.traced(record_result=True)
+def create_kind_cluster(use_registry_mirror: bool = False) -> bool:
+    """Create and verify Kind cluster; return True if this call created it"""
+    print_verbose("Creating Kind cluster...")
+    name = current_cluster().name
+    created = False
     
-    # Ensure cluster exists and is ready
-    create_kind_cluster()
+    # Check if cluster already exists
+    returncode, stdout, stderr = run_command("kind get clusters", check=False)
+    if returncode == 0 and name in stdout.split():
+        print_verbose(f"Kind cluster '{name}' already exists", 1)
+    else:
+        # Create new cluster with specific name
+        print_verbose(f"Creating new Kind cluster '{name}'...", 1)
+        config_path = cluster_file("kind-config.yaml")
+        with open(config_path, "w") as f:
+            f.write(render_kind_config(use_registry_mirror))
+        
+        # Cluster creation is the heaviest Docker step, so only a few run at once
+        with _kind_create_slots:
+            created = run_command(f"kind create cluster --name {name} --config {config_path}")[0] == 0
     
-    print_verbose("Adding AWX operator Helm repository...", 1)
-    run_command("helm repo add awx-operator https://ansible-community.github.io/awx-operator-helm/")
-    run_command("helm repo update")
+    if use_registry_mirror:
+        print_verbose("Connecting registry mirrors to the Kind network...", 1)
+        registry_mirror.connect_to_kind_network(run_command)
     
-    print_verbose("Installing AWX operator...", 1)
-    run_command("helm install awx-operator awx-operator/awx-operator")
+    # Verify cluster is ready, through the API client when there is one
+    print_verbose("Verifying cluster status...", 1)
+    api = kube_api()
+    if api is not None and api.healthy():
+        nodes = get_kubernetes_objects("nodes")
+        ready = [n for n in nodes if any(c.get("type") == "Ready" and c.get("status") == "True"
+                                         for c in n.get("status", {}).get("conditions", []))]
+        print_verbose(f"API server is healthy; {len(ready)} of {len(nodes)} nodes Ready", 1)
+    else:
+        run_command("kubectl cluster-info")
+        run_command("kubectl get nodes")
+    return created
 
-    print_verbose("Creating AWX instance manifest...", 1)
-    awx_manifest = """
+@functools.lru_cache(maxsize=None)
+@tracing.traced
+def prepare_registry_mirror():
+    """Start the local pull-through registries and pre-seed the AWX images"""
+    print_verbose("Preparing local registry mirrors...", 1)
+    registry_mirror.ensure_registries(run_command)
+    if AWX_OPERATOR_CHART_VERSION != registry_mirror.AWX_OPERATOR_VERSION:
+        print_verbose(f"Warning: the mirror seeds images for AWX operator {registry_mirror.AWX_OPERATOR_VERSION}, "
+                      f"but chart version {AWX_OPERATOR_CHART_VERSION or '(newest)'} is installed", 1)
+    print_verbose(f"Seeding {len(registry_mirror.SEED_IMAGES)} AWX images into the mirrors...", 1)
+    for image, seconds in registry_mirror.seed_images(run_command).items():
+        print_verbose(f"{image}: {seconds:.1f}s", 2)
+
+def report_registry_mirror_savings():
+    """Report how much image-pull time the local mirror saves compared to the first pulls"""
+    cold, warm = registry_mirror.pull_time_saved()
+    if warm:
+        print_verbose(f"Image pulls from the local mirror take {warm:.1f}s instead of {cold:.1f}s "
+                      f"from the internet (saved {cold - warm:.1f}s)", 1)
+    else:
+        print_verbose("Image pull savings will be reported once the mirror cache is warm", 1)
+
+def render_awx_manifest() -> str:
+    """Render the AWX custom resource manifest"""
+    manifest = f"""
 apiVersion: awx.ansible.com/v1beta1
 kind: AWX
 metadata:
   name: awx
 spec:
   service_type: nodeport
-  nodeport_port: 30080
+  nodeport_port: {AWX_NODEPORT}
 """
-    with open("awx-instance.yaml", "w") as f:
-        f.write(awx_manifest)
+    if AWX_SPEC_FIELDS:
+        manifest += "\n".join(awx_sizing.to_yaml(AWX_SPEC_FIELDS, 2)) + "\n"
+    return manifest
 
-    print_verbose("Applying AWX instance manifest...", 1)
-    run_command("kubectl apply -f awx-instance.yaml")
+def auto_size_awx(clusters: int = 1) -> awx_sizing.AwxSizing:
+    """Size AWX to the measured host resources and use the result in the AWX manifest"""
+    sizing = awx_sizing.size_awx(awx_sizing.measure_host(), clusters)
+    AWX_SPEC_FIELDS.update(sizing.spec())
+    return sizing
 
-def cleanup_awx():
-    """Clean up AWX Tower deployment"""
-    print_verbose("Cleaning up AWX Tower deployment...")
+def preview_awx_sizing(clusters: int = 1):
+    """Show the sizing and the AWX manifest --auto-size would apply, without deploying"""
+    sizing = auto_size_awx(clusters)
+    print("=== AWX Sizing Preview ===")
+    print(sizing.describe())
+    print("\n=== AWX Instance Manifest ===")
+    print(render_awx_manifest().strip())
+    print("\nNothing was deployed. Run with --auto-size to deploy with this sizing.")
+
+def resolved_chart_version() -> str:
+    """Return the operator chart version helm will install, or "" if it cannot be told
+
+    An unpinned chart resolves to the newest version in the local repository
+    index, so a new upstream release changes the operator step's inputs.
+    """
+    if AWX_OPERATOR_CHART_VERSION:
+        return AWX_OPERATOR_CHART_VERSION
+    returncode, stdout, stderr = run_command(f"helm search repo {AWX_OPERATOR_CHART} -o json",
+                                             check=False, quiet=True, full_output=True)
+    if returncode != 0:
+        return ""
+    try:
+        versions = [entry["version"] for entry in json.loads(stdout) if entry.get("name") == AWX_OPERATOR_CHART]
+    except (ValueError, TypeError, KeyError):
+        return ""
+    return versions[0] if versions else ""
+
+def input_hash(*inputs: str) -> str:
+    """Hash the inputs of a deployment step"""
+    digest = hashlib.sha256()
+    for value in inputs:
+        digest.update(value.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def load_deploy_state() -> dict:
+    """Read the deployment state journal, or return an empty one"""
+    try:
+        with open(cluster_file(DEPLOY_STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"cluster_uid": "", "steps": {}}
+
+def save_deploy_state(state: dict):
+    """Write the deployment state journal"""
+    with open(cluster_file(DEPLOY_STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2)
+
+def get_cluster_uid() -> str:
+    """Identify the current cluster so a recreated cluster invalidates the journal"""
+    handled, result = api_request("get namespace kube-system",
+                                  lambda api: api.get("namespaces", "kube-system")["metadata"]["uid"])
+    if handled:
+        return "" if isinstance(result, kube_client.ApiError) else result
+    returncode, stdout, stderr = run_command("kubectl get namespace kube-system -o jsonpath='{.metadata.uid}'",
+                                             check=False, quiet=True)
+    return stdout.strip() if returncode == 0 else ""
+
+def apply_manifest(path: str) -> bool:
+    """Apply a manifest file with server-side apply, or kubectl apply without an API client"""
+    with open(path) as f:
+        manifest = f.read()
+    handled, result = api_request(f"apply {path}", lambda api: api.apply_manifest(manifest))
+    if handled:
+        return not isinstance(result, kube_client.ApiError)
+    return run_command(f"kubectl apply -f {path}")[0] == 0
+
+def scale_deployment(name: str, replicas: int) -> bool:
+    """Set a deployment's replica count"""
+    handled, result = api_request(f"scale deployment {name} to {replicas}",
+                                  lambda api: api.scale("deployments", name, replicas))
+    if handled:
+        return not isinstance(result, kube_client.ApiError)
+    return run_command(f"kubectl scale deployment {name} --replicas={replicas}")[0] == 0
+
+def write_if_changed(path: str, content: str) -> bool:
+    """Write a file only when its content differs; return True if it was written"""
+    if os.path.exists(path):
+        with open(path) as f:
+            if f.read() == content:
+                return False
+    with open(path, "w") as f:
+        f.write(content)
+    return True
+
+@tracing.traced
+def deploy_awx_kubernetes(incremental: bool = False, use_registry_mirror: bool = False):
+    """Deploy AWX on Kubernetes with verbose output
+
+    In incremental mode every step is skipped when the hash of its inputs
+    matches the state journal recorded for the same cluster.
+    """
+    print_verbose("Deploying AWX on Kubernetes...")
+    started = time.monotonic()
     
-    # Delete AWX instance
-    print_verbose("Deleting AWX instance...", 1)
-    run_command("kubectl delete -f awx-instance.yaml")
+    if use_registry_mirror:
+        with resource_sampler.phase("registry_mirror"):
+            prepare_registry_mirror()
+    
+    # Ensure cluster exists and is ready
+    with resource_sampler.phase("create_kind_cluster"):
+        created = create_kind_cluster(use_registry_mirror)
+    
+    state = load_deploy_state()
+    cluster_uid = get_cluster_uid()
+    fresh = state.get("cluster_uid") != cluster_uid
+    if fresh:
+        # A different (or recreated) cluster has none of the recorded state
+        state = {"cluster_uid": cluster_uid, "steps": {}}
+    if created or fresh:
+        # Cleanup deletes only clusters this script created; others may be shared
+        state["kind_cluster_owner"] = "setup" if created else "existing"
+        save_deploy_state(state)
+    steps = state["steps"]
+
+    def unchanged(step: str, digest: str) -> bool:
+        if incremental and steps.get(step, {}).get("hash") == digest:
+            print_verbose(f"{step}: inputs unchanged, skipping", 1)
+            return True
+        return False
+
+    def record(step: str, digest: str):
+        steps[step] = {"hash": digest, "applied": time.time()}
+        save_deploy_state(state)
+
+    with resource_sampler.phase("install_awx_operator"), \
+            tracing.span("install_awx_operator", chart=AWX_OPERATOR_CHART, version=AWX_OPERATOR_CHART_VERSION):
+        repo_hash = input_hash(AWX_OPERATOR_REPO_NAME, AWX_OPERATOR_REPO_URL)
+        repo_age = time.time() - steps.get("helm-repo", {}).get("applied", 0)
+        # An old index is refreshed whatever the hash says, so check its age first
+        if repo_age > HELM_REPO_REFRESH_SECONDS or not unchanged("helm-repo", repo_hash):
+            print_verbose("Adding AWX operator Helm repository...", 1)
+            run_command(f"helm repo add {AWX_OPERATOR_REPO_NAME} {AWX_OPERATOR_REPO_URL} --force-update")
+            run_command("helm repo update")
+            record("helm-repo", repo_hash)
+        
+        values = json.dumps(AWX_OPERATOR_VALUES, sort_keys=True)
+        chart_version = resolved_chart_version()
+        # Without a known version the step cannot be compared, so it always runs
+        operator_hash = input_hash(AWX_OPERATOR_CHART, chart_version, values) if chart_version else ""
+        if not (operator_hash and unchanged("helm-operator", operator_hash)):
+            print_verbose("Installing AWX operator...", 1)
+            command = f"helm upgrade --install awx-operator {AWX_OPERATOR_CHART}"
+            if chart_version:
+                # Install exactly the version that was hashed
+                command += f" --version {chart_version}"
+            if AWX_OPERATOR_VALUES:
+                # JSON is valid YAML, so the values can be passed as-is
+                write_if_changed(cluster_file(AWX_OPERATOR_VALUES_FILE), values)
+                command += f" -f {cluster_file(AWX_OPERATOR_VALUES_FILE)}"
+            if run_command(command)[0] == 0 and operator_hash:
+                record("helm-operator", operator_hash)
+
+    awx_manifest = render_awx_manifest()
+    manifest_hash = input_hash(awx_manifest)
+    manifest_path = cluster_file("awx-instance.yaml")
+    if not (unchanged("awx-instance", manifest_hash) and os.path.exists(manifest_path)):
+        print_verbose("Creating AWX instance manifest...", 1)
+        write_if_changed(manifest_path, awx_manifest)
+
+        print_verbose("Applying AWX instance manifest...", 1)
+        with resource_sampler.phase("apply_awx_instance"), tracing.span("apply_awx_instance", manifest=manifest_path):
+            if apply_manifest(manifest_path):
+                record("awx-instance", manifest_hash)
+
+    if use_registry_mirror:
+        report_registry_mirror_savings()
+    print_verbose(f"Deployment steps finished in {time.monotonic() - started:.1f}s", 1)
+
+def get_kubernetes_objects(resource: str, selector: Optional[str] = None) -> List[dict]:
+    """Return the items of a resource listing, or an empty list if it cannot be read"""
+    handled, result = api_request(f"list {resource}", lambda api: api.list(resource, selector=selector).get("items") or [])
+    if handled:
+        return [] if isinstance(result, kube_client.ApiError) else result
+    command = f"kubectl get {resource} -o json"
+    if selector:
+        command += f" -l {selector}"
+    returncode, stdout, stderr = run_command(command, check=False, quiet=True, full_output=True)
+    if returncode != 0:
+        return []
+    try:
+        return json.loads(stdout).get("items", [])
+    except ValueError:
+        return []
+
+def get_admin_password() -> str:
+    """Read and decode the AWX admin password, or return an empty string if the secret is missing"""
+    handled, result = api_request(f"get secret {AWX_ADMIN_SECRET}",
+                                  lambda api: api.get_secret(AWX_ADMIN_SECRET).get("password", ""))
+    if handled:
+        return "" if isinstance(result, kube_client.ApiError) else result
+    returncode, stdout, stderr = run_command(f"kubectl get secret {AWX_ADMIN_SECRET} -o jsonpath=\"{{.data.password}}\"", check=False, quiet=True)
+    if returncode != 0 or not stdout.strip():
+        return ""
+    try:
+        return base64.b64decode(stdout.strip()).decode()
+    except ValueError:
+        return ""
+
+def operator_is_ready() -> bool:
+    """Check that the AWX operator deployment has an available replica"""
+    deployments = [d for d in get_kubernetes_objects("deployments") if d["metadata"]["name"].startswith("awx-operator")]
+    return bool(deployments) and all(d.get("status", {}).get("availableReplicas", 0) >= 1 for d in deployments)
+
+def awx_deployments_are_available() -> bool:
+    """Check that the AWX web and task deployments exist and each has an available replica"""
+    available = {d["metadata"]["name"]: d.get("status", {}).get("availableReplicas", 0) >= 1
+                 for d in get_kubernetes_objects("deployments")}
+    names = AWX_SERVING_DEPLOYMENTS if any(n in available for n in AWX_SERVING_DEPLOYMENTS) else [AWX_LEGACY_DEPLOYMENT]
+    return all(available.get(name, False) for name in names)
+
+def awx_pods_are_ready() -> bool:
+    """Check that AWX is served and every running AWX pod reports the Ready condition
+
+    Postgres and a finished migration job survive --shutdown, so "all current
+    pods Ready" alone would pass before any web or task pod exists.
+    """
+    if not awx_deployments_are_available():
+        return False
+    pods = [p for p in get_kubernetes_objects("pods", "app.kubernetes.io/managed-by=awx-operator")
+            if p.get("status", {}).get("phase") != "Succeeded"]
+    if not pods:
+        return False
+    for pod in pods:
+        conditions = pod.get("status", {}).get("conditions", [])
+        if not any(c["type"] == "Ready" and c["status"] == "True" for c in conditions):
+            return False
+    return True
+
+def migrations_are_done() -> bool:
+    """Check that the AWX database migration job has completed"""
+    jobs = [j for j in get_kubernetes_objects("jobs") if j["metadata"]["name"].startswith("awx-migration")]
+    return bool(jobs) and all(j.get("status", {}).get("succeeded", 0) >= 1 for j in jobs)
+
+def admin_secret_is_present() -> bool:
+    """Check that the AWX admin password secret exists and is populated"""
+    return bool(get_admin_password())
+
+READINESS_PHASES = {
+    "operator": ("AWX operator deployment", operator_is_ready),
+    "pods": ("AWX web and task pods", awx_pods_are_ready),
+    "migrations": ("AWX database migrations", migrations_are_done),
+    "secret": ("AWX admin password secret", admin_secret_is_present)
+}
+
+def wait_until(description: str, condition: Callable[[], bool], deadline: float,
+               initial_delay: float = READINESS_INITIAL_DELAY_SECONDS) -> bool:
+    """Poll a condition with exponential backoff until it holds or the deadline passes"""
+    delay = initial_delay
+    while True:
+        if condition():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        delay = min(delay, remaining)
+        print_verbose(f"{description} not ready yet, checking again in {delay:.1f}s", 2)
+        time.sleep(delay)
+        delay = min(delay * 2, READINESS_MAX_DELAY_SECONDS)
+
+@tracing.traced
+def wait_for_awx_ready(phases: Optional[List[str]] = None, timeout: float = AWX_READY_TIMEOUT_SECONDS) -> Tuple[bool, Dict[str, float]]:
+    """Wait for each readiness phase in turn and return whether AWX is usable plus per-phase timings"""
+    phases = phases or list(READINESS_PHASES)
+    deadline = time.monotonic() + timeout
+    timings = {}
+
+    for phase in phases:
+        description, condition = READINESS_PHASES[phase]
+        print_verbose(f"Waiting for {description}...", 1)
+        started = time.monotonic()
+        with tracing.span(f"wait_for_{phase}", description=description) as span:
+            ready = span["ready"] = wait_until(description, condition, deadline)
+        timings[phase] = time.monotonic() - started
+        if not ready:
+            print_verbose(f"Timed out after {timeout}s waiting for {description}", 1)
+            return False, timings
+        print_verbose(f"{description} ready after {timings[phase]:.1f}s", 2)
+
+    return True, timings
+
+def kind_clusters() -> List[str]:
+    """Return the names of the Kind clusters on this host"""
+    returncode, stdout, stderr = run_command("kind get clusters", check=False, quiet=True)
+    return stdout.split() if returncode == 0 else []
+
+def kind_cluster_owner(existing: List[str]) -> str:
+    """Who created the current cluster according to the deploy journal
+
+    "setup" (this script), "existing" (it was there before AWX was deployed),
+    "unknown" when there is no journal entry, or "" if it is not a Kind cluster.
+    """
+    if current_cluster().name not in existing:
+        return ""
+    return load_deploy_state().get("kind_cluster_owner", "unknown")
+
+def owns_kind_cluster(existing: List[str]) -> bool:
+    """Check that the current cluster is a Kind cluster this script created, so nothing else lives in it"""
+    return kind_cluster_owner(existing) == "setup"
+
+def teardown_mode(existing: List[str], requested: str = "auto") -> str:
+    """Pick fast teardown for clusters this script owns and graceful teardown for shared ones
+
+    Without a journal entry the cluster is treated as shared, with a warning;
+    an explicit --teardown fast still deletes it.
+    """
+    owner = kind_cluster_owner(existing)
+    if owner == "unknown":
+        print_verbose(f"Warning: no deploy journal ({cluster_file(DEPLOY_STATE_FILE)}) says who created Kind "
+                      f"cluster '{current_cluster().name}'; "
+                      + ("deleting it as --teardown fast asks" if requested == "fast" else
+                         "treating it as shared and keeping it (use --teardown fast to delete it)"), 1)
+    if requested == "fast" and owner in ("", "existing"):
+        print_verbose("Not a Kind cluster created by this script; using graceful teardown", 1)
+        return "graceful"
+    if requested != "auto":
+        return requested
+    return "fast" if owner == "setup" else "graceful"
+
+def load_teardown_timings() -> Dict[str, float]:
+    try:
+        with open(TEARDOWN_TIMINGS_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_teardown_timings(timings: Dict[str, float]):
+    os.makedirs(os.path.dirname(TEARDOWN_TIMINGS_FILE), exist_ok=True)
+    with open(TEARDOWN_TIMINGS_FILE, "w") as f:
+        json.dump(timings, f, indent=2)
+
+@tracing.traced(record_result=True)
+def remove_awx_cluster(mode: str, existing: List[str]) -> float:
+    """Tear down the current cluster's AWX deployment and local files; return the seconds taken
+
+    Fast mode deletes the Kind cluster outright, which removes AWX, the
+    operator and their finalizers with it. Graceful mode deletes the AWX
+    instance and uninstalls the operator first, and then deletes the Kind
+    cluster only if this script created it.
+    """
+    started = time.monotonic()
+    cluster = current_cluster()
+    owner = kind_cluster_owner(existing)
+    # Fast mode on a cluster without a journal entry was asked for explicitly
+    owned = owner == "setup" or (mode == "fast" and owner == "unknown")
     
-    # Delete AWX operator
-    print_verbose("Deleting AWX operator...", 1)
-    run_command("helm uninstall awx-operator")
+    if mode == "graceful":
+        # Delete AWX instance
+        print_verbose("Deleting AWX instance...", 1)
+        run_command(f"kubectl delete -f {cluster_file('awx-instance.yaml')}")
+        
+        # Delete AWX operator
+        print_verbose("Deleting AWX operator...", 1)
+        run_command("helm uninstall awx-operator")
     
     # Delete Kind cluster
-    print_verbose("Deleting Kind cluster...", 1)
-    run_command("kind delete cluster --name awx-cluster")
+    if owned:
+        print_verbose("Deleting Kind cluster...", 1)
+        run_command(f"kind delete cluster --name {cluster.name}")
+    elif cluster.name in existing:
+        print_verbose(f"Keeping Kind cluster '{cluster.name}': it was not created by this script", 1)
     
     # Clean up local files
     print_verbose("Cleaning up local files...", 1)
-    if os.path.exists("awx-instance.yaml"):
-        os.remove("awx-instance.yaml")
-    if os.path.exists("kind-config.yaml"):
-        os.remove("kind-config.yaml")
+    if cluster.workdir:
+        shutil.rmtree(cluster.workdir, ignore_errors=True)
+    else:
+        for path in ("awx-instance.yaml", "kind-config.yaml", DEPLOY_STATE_FILE, AWX_OPERATOR_VALUES_FILE):
+            if os.path.exists(path):
+                os.remove(path)
+    return time.monotonic() - started
+
+@tracing.traced
+def cleanup_awx(mode: str = "auto"):
+    """Clean up AWX Tower deployment, tearing down every cluster in parallel"""
+    print_verbose("Cleaning up AWX Tower deployment...")
+    started = time.monotonic()
+    
+    existing = kind_clusters()
+    fleet = load_fleet()
+    clusters = [DEFAULT_CLUSTER] if not fleet or KIND_CLUSTER_NAME in existing else []
+    clusters += fleet
+
+    def teardown() -> Tuple[str, float]:
+        cluster_mode = teardown_mode(existing, mode)
+        return cluster_mode, remove_awx_cluster(cluster_mode, existing)
+
+    results = for_each_cluster(clusters, teardown)
+    if fleet:
+        shutil.rmtree(FLEET_DIR, ignore_errors=True)
+    elapsed = time.monotonic() - started
     
+    previous = load_teardown_timings()
+    timings = dict(previous)
     print("\n=== Cleanup Complete ===")
+    print(f"{'Cluster':<16}{'Mode':<10}{'Seconds':>8}")
+    for name, (cluster_mode, seconds) in results.items():
+        print(f"{name:<16}{cluster_mode:<10}{seconds:>8.1f}")
+        timings[cluster_mode] = seconds
+    print(f"Teardown finished in {elapsed:.1f}s")
+    for cluster_mode in sorted({cluster_mode for cluster_mode, _ in results.values()}):
+        other = "graceful" if cluster_mode == "fast" else "fast"
+        if other in previous:
+            print(f"Last {other} teardown of a cluster took {previous[other]:.1f}s; "
+                  f"this {cluster_mode} one took {timings[cluster_mode]:.1f}s")
+    save_teardown_timings(timings)
     print("AWX Tower deployment has been removed.")
-    print("All associated resources have been cleaned up.")
 
+@tracing.traced
 def shutdown_awx():
     """Shutdown AWX Tower deployment while preserving configuration"""
     print_verbose("Shutting down AWX Tower deployment...")
     
     # Scale down AWX deployment
     print_verbose("Scaling down AWX deployment...", 1)
-    run_command("kubectl scale deployment awx --replicas=0")
+    scale_deployment("awx", 0)
     
     # Scale down AWX operator
     print_verbose("Scaling down AWX operator...", 1)
-    run_command("kubectl scale deployment awx-operator --replicas=0")
+    scale_deployment("awx-operator", 0)
     
     print("\n=== Shutdown Complete ===")
     print("AWX Tower has been shut down.")
@@ -309,101 +987,587 @@ def shutdown_awx():
     print("\nTo restart AWX, run:")
     print("python setup_awx_tower.py --start")
 
+@tracing.traced
 def start_awx():
     """Start AWX Tower deployment"""
     print_verbose("Starting AWX Tower deployment...")
     
     # Scale up AWX operator
     print_verbose("Starting AWX operator...", 1)
-    run_command("kubectl scale deployment awx-operator --replicas=1")
+    scale_deployment("awx-operator", 1)
     
     # Wait for operator to be ready
     print_verbose("Waiting for operator to be ready...", 1)
-    time.sleep(10)
+    wait_for_awx_ready(["operator"])
     
     # Scale up AWX deployment
     print_verbose("Starting AWX...", 1)
-    run_command("kubectl scale deployment awx --replicas=1")
+    scale_deployment("awx", 1)
     
     # Wait for AWX to be ready and get the password
     print_verbose("Waiting for AWX to be ready...", 1)
-    time.sleep(30)
+    ready, timings = wait_for_awx_ready()
+    for phase, seconds in timings.items():
+        print_verbose(f"{phase}: {seconds:.1f}s", 2)
     
     print_verbose("Retrieving admin password...", 1)
-    returncode, stdout, stderr = run_command("kubectl get secret awx-admin-password -o jsonpath=\"{.data.password}\" | base64 --decode", check=False)
+    password = get_admin_password()
     
     print("\n=== Startup Complete ===")
+    if not ready:
+        print("Warning: AWX did not become ready in time; it may still be starting.")
     print("AWX Tower has been started. You should be able to access it at:")
-    print("http://localhost:30080")
+    print(f"http://localhost:{current_cluster().host_port}")
     print("\nDefault credentials:")
     print("Username: admin")
-    print(f"Password: {stdout.strip()}")
+    print(f"Password: {password}")
 
-def main():
-    print("Starting AWX Tower setup with verbose output...")
+def report_resource_usage():
+    """Stop the resource sampler and report per-phase peaks"""
+    sampler = resource_sampler.stop_sampling()
+    if not sampler or not sampler.samples:
+        return
+    print("\n=== Peak Resource Usage by Phase ===")
+    print(sampler.peaks_table())
+    sampler.write_report(RESOURCE_REPORT_FILE)
+    print(f"Resource time series written to {RESOURCE_REPORT_FILE}")
+
+def kind_node_containers() -> List[str]:
+    """Return the Docker container names of the current Kind cluster's nodes"""
+    returncode, stdout, stderr = run_command(f"kind get nodes --name {current_cluster().name}", check=False, quiet=True)
+    return stdout.split() if returncode == 0 else []
+
+def paused_containers(containers: List[str]) -> List[str]:
+    """Return the subset of containers that are currently paused"""
+    if not containers:
+        return []
+    returncode, stdout, stderr = run_command(f"docker inspect -f '{{{{.Name}}}} {{{{.State.Paused}}}}' {' '.join(containers)}",
+                                             check=False, quiet=True)
+    return [line.split()[0].lstrip("/") for line in stdout.splitlines() if line.endswith(" true")]
+
+@tracing.traced
+def suspend_awx():
+    """Freeze the Kind node containers in place, keeping AWX's warm process state"""
+    print_verbose("Suspending AWX Tower...")
+    started = time.monotonic()
+    
+    nodes = kind_node_containers()
+    if nodes and len(paused_containers(nodes)) == len(nodes):
+        print("AWX Tower is already suspended.")
+        return
+    
+    # docker pause freezes every process in the node's cgroup
+    if nodes and run_command(f"docker pause {' '.join(nodes)}")[0] == 0:
+        print("\n=== Suspend Complete ===")
+        print(f"AWX Tower was frozen in {time.monotonic() - started:.2f}s and uses no CPU while suspended.")
+        print("\nTo resume AWX, run:")
+        print("python setup_awx_tower.py --resume")
+        return
+    
+    print_verbose("Could not pause the Kind nodes, scaling AWX down instead...", 1)
+    shutdown_awx()
+
+@tracing.traced
+def resume_awx():
+    """Thaw suspended Kind node containers, or start AWX normally if it was scaled down"""
+    print_verbose("Resuming AWX Tower...")
+    started = time.monotonic()
+    
+    paused = paused_containers(kind_node_containers())
+    if not paused or run_command(f"docker unpause {' '.join(paused)}")[0] != 0:
+        print_verbose("AWX Tower is not suspended, starting it instead...", 1)
+        start_awx()
+        return
+    
+    # The API server resumes with its state intact; confirm it answers again
+    api = kube_api()
+    api_ready = wait_until("Kubernetes API",
+                           api.healthy if api else
+                           lambda: run_command("kubectl get --raw /readyz", check=False, quiet=True)[0] == 0,
+                           time.monotonic() + RESUME_TIMEOUT_SECONDS, initial_delay=0.1)
+    
+    print("\n=== Resume Complete ===")
+    if not api_ready:
+        print(f"Warning: the Kubernetes API did not answer within {RESUME_TIMEOUT_SECONDS}s.")
+    print(f"AWX Tower resumed in {time.monotonic() - started:.2f}s at:")
+    print(f"http://localhost:{current_cluster().host_port}")
+
+def _status_entry(resource: str, obj: dict) -> dict:
+    """Keep an object for the status summary; secret values are never held"""
+    if resource == "secrets":
+        return {"metadata": {"name": obj["metadata"]["name"]}, "type": obj.get("type", "")}
+    return obj
+
+def _list_status_resource(api: kube_client.KubeClient, resource: str) -> Tuple[Dict[str, dict], str]:
+    """List one status resource; returns objects by name and the list's resourceVersion"""
+    try:
+        listing = api.list(resource)
+    except kube_client.ApiError as e:
+        if resource == "awxs" and e.status == 404:
+            # The AWX resource type only exists once the operator is installed
+            return {}, ""
+        raise
+    objects = {item["metadata"]["name"]: _status_entry(resource, item) for item in listing.get("items") or []}
+    return objects, listing.get("metadata", {}).get("resourceVersion", "")
+
+@tracing.traced
+def fetch_status_objects() -> Tuple[Optional[Dict[str, Dict[str, dict]]], Dict[str, str]]:
+    """Read every status resource of the current cluster in one batch
+
+    Returns the objects by resource and name (None if the cluster cannot be
+    reached) and each list's resourceVersion for watching from. The API
+    client issues the lists concurrently over its pooled connections;
+    without one, a single kubectl get covers all the resource types.
+    """
+    api = kube_api()
+    if api:
+        with ThreadPoolExecutor(max_workers=len(STATUS_RESOURCES)) as executor:
+            results = dict(zip(STATUS_RESOURCES, executor.map(
+                lambda resource: api_request(f"list {resource}", lambda api: _list_status_resource(api, resource)),
+                STATUS_RESOURCES)))
+        if all(handled for handled, _ in results.values()):
+            if any(isinstance(result, kube_client.ApiError) for _, result in results.values()):
+                return None, {}
+            return ({resource: result[0] for resource, (_, result) in results.items()},
+                    {resource: result[1] for resource, (_, result) in results.items()})
+
+    resources = list(STATUS_RESOURCES)
+    returncode, stdout, stderr = run_command(f"kubectl get {','.join(resources)} -o json", check=False,
+                                             quiet=True, full_output=True)
+    if returncode != 0 and "awx" in stderr.lower():
+        # The AWX resource type only exists once the operator is installed
+        resources.remove("awxs")
+        returncode, stdout, stderr = run_command(f"kubectl get {','.join(resources)} -o json", check=False,
+                                                 quiet=True, full_output=True)
+    try:
+        items = json.loads(stdout).get("items", []) if returncode == 0 else None
+    except ValueError:
+        items = None
+    if items is None:
+        return None, {}
+    kinds = {kind: resource for resource, kind in STATUS_RESOURCES.items()}
+    objects = {resource: {} for resource in STATUS_RESOURCES}
+    for item in items:
+        resource = kinds.get(item.get("kind", ""))
+        if resource:
+            objects[resource][item["metadata"]["name"]] = _status_entry(resource, item)
+    return objects, {}
+
+def summarize_status(objects: Optional[Dict[str, Dict[str, dict]]]) -> Dict[str, object]:
+    """Reduce a cluster's status objects to the facts the summary shows"""
+    if objects is None:
+        return {"health": "unreachable"}
+    deployments = []
+    for name, deployment in sorted(objects["deployments"].items()):
+        wanted = deployment.get("spec", {}).get("replicas", 1)
+        deployments.append((name, deployment.get("status", {}).get("availableReplicas", 0) or 0, wanted))
+    pods = [pod for pod in objects["pods"].values() if pod.get("status", {}).get("phase") != "Succeeded"]
+    not_ready, restarts = [], 0
+    for pod in sorted(pods, key=lambda pod: pod["metadata"]["name"]):
+        status = pod.get("status", {})
+        containers = status.get("containerStatuses") or []
+        restarts += sum(c.get("restartCount", 0) for c in containers)
+        if not any(c["type"] == "Ready" and c["status"] == "True" for c in status.get("conditions", [])):
+            waiting = [c["state"]["waiting"].get("reason", "") for c in containers if "waiting" in c.get("state", {})]
+            not_ready.append((pod["metadata"]["name"], waiting[0] if waiting else status.get("phase", "Unknown")))
+    awx = objects["awxs"].get("awx", {})
+    conditions = [c["type"] for c in awx.get("status", {}).get("conditions", []) if c.get("status") == "True"]
+    nodeports = [port["nodePort"] for service in objects["services"].values()
+                 for port in service.get("spec", {}).get("ports", []) if port.get("nodePort") == AWX_NODEPORT]
+    awx_deployments = [d for d in deployments if not d[0].startswith("awx-operator")]
+
+    if not awx and not awx_deployments:
+        health = "not deployed"
+    elif awx_deployments and all(wanted == 0 for _, _, wanted in awx_deployments):
+        health = "shut down"
+    elif (all(ready >= wanted for _, ready, wanted in deployments) and pods and not not_ready
+          and AWX_ADMIN_SECRET in objects["secrets"]):
+        health = "healthy"
+    else:
+        health = "degraded"
+    return {"health": health, "awx": ", ".join(conditions) or ("present" if awx else "missing"),
+            "deployments": deployments, "pods": len(pods), "pods_ready": len(pods) - len(not_ready),
+            "not_ready": not_ready, "restarts": restarts, "admin_secret": AWX_ADMIN_SECRET in objects["secrets"],
+            "nodeport": bool(nodeports)}
+
+def format_status(cluster: ClusterSpec, summary: Dict[str, object]) -> List[str]:
+    """Render a cluster's status summary as a short block"""
+    lines = [f"AWX on {cluster.name}: {summary['health']}"]
+    if summary["health"] == "unreachable":
+        return lines
+    lines.append(f"  AWX resource:  {summary['awx']}")
+    if summary["nodeport"]:
+        lines.append(f"  URL:           http://localhost:{cluster.host_port}")
+    lines.append("  Deployments:   " + (", ".join(f"{name} {ready}/{wanted}" for name, ready, wanted
+                                                  in summary["deployments"]) or "none"))
+    lines.append(f"  Pods:          {summary['pods_ready']}/{summary['pods']} ready, {summary['restarts']} restarts")
+    for name, reason in summary["not_ready"]:
+        lines.append(f"    not ready:   {name} ({reason})")
+    lines.append(f"  Admin secret:  {'present' if summary['admin_secret'] else 'missing'}")
+    return lines
+
+def status_line(cluster: ClusterSpec, summary: Dict[str, object]) -> str:
+    """Render a cluster's status summary as one table row"""
+    if summary["health"] == "unreachable":
+        return f"{cluster.name:<16}{summary['health']:<14}"
+    deployments = summary["deployments"]
+    return (f"{cluster.name:<16}{summary['health']:<14}"
+            f"{sum(ready >= wanted for _, ready, wanted in deployments)}/{len(deployments):<9}"
+            f"{summary['pods_ready']}/{summary['pods']:<6}{summary['restarts']:>9}  http://localhost:{cluster.host_port}")
+
+def render_status(clusters: List[ClusterSpec], objects: Dict[str, Optional[Dict[str, Dict[str, dict]]]]) -> str:
+    """The full summary for one cluster, or a row per cluster for a fleet"""
+    if len(clusters) == 1:
+        return "\n".join(format_status(clusters[0], summarize_status(objects[clusters[0].name])))
+    lines = [f"{'Cluster':<16}{'Health':<14}{'Deploys':<11}{'Pods':<8}{'Restarts':>9}  URL"]
+    lines += [status_line(cluster, summarize_status(objects[cluster.name])) for cluster in clusters]
+    return "\n".join(lines)
+
+class StatusWatcher:
+    """Keeps one cluster's status objects current, fetching only what changes
+
+    With the API client each resource is watched from the resourceVersion of
+    its list, so only changed objects cross the wire. Without it the batched
+    kubectl query is repeated every STATUS_REFRESH_SECONDS.
+    """
+
+    def __init__(self, cluster: ClusterSpec, objects: Optional[Dict[str, Dict[str, dict]]],
+                 versions: Dict[str, str], changed: threading.Event):
+        self.cluster = cluster
+        self.objects = objects
+        self.versions = dict(versions)
+        self.changed = changed
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Optional[Dict[str, Dict[str, dict]]]:
+        with self._lock:
+            return None if self.objects is None else {r: dict(items) for r, items in self.objects.items()}
+
+    def start(self):
+        with use_cluster(self.cluster):
+            api = kube_api()
+        if api and self.objects is not None:
+            for resource in STATUS_RESOURCES:
+                threading.Thread(target=self._watch, args=(api, resource), daemon=True).start()
+        else:
+            threading.Thread(target=self._poll, daemon=True).start()
+
+    def _update(self, resource: str, objects: Dict[str, dict]):
+        with self._lock:
+            if self.objects is not None and self.objects[resource] == objects:
+                return
+            if self.objects is None:
+                self.objects = {r: {} for r in STATUS_RESOURCES}
+            self.objects[resource] = objects
+        self.changed.set()
+
+    def _watch(self, api: kube_client.KubeClient, resource: str):
+        with use_cluster(self.cluster):
+            while True:
+                started = time.monotonic()
+                try:
+                    if not self.versions.get(resource):
+                        objects, self.versions[resource] = _list_status_resource(api, resource)
+                        self._update(resource, objects)
+                    for event in api.watch(resource, resource_version=self.versions[resource]):
+                        body = event.get("object", {})
+                        if event.get("type") == "ERROR":
+                            # The resourceVersion expired (410 Gone); list again and watch from there
+                            self.versions[resource] = ""
+                            break
+                        self.versions[resource] = body.get("metadata", {}).get("resourceVersion",
+                                                                               self.versions[resource])
+                        if event.get("type") == "BOOKMARK":
+                            continue
+                        objects = dict(self.snapshot()[resource])
+                        if event["type"] == "DELETED":
+                            objects.pop(body["metadata"]["name"], None)
+                        else:
+                            objects[body["metadata"]["name"]] = _status_entry(resource, body)
+                        self._update(resource, objects)
+                except (kube_client.ApiError, OSError, http.client.HTTPException, ValueError) as e:
+                    print_verbose(f"Watching {resource} failed ({e}), retrying", 2)
+                    self.versions[resource] = ""
+                    time.sleep(STATUS_REFRESH_SECONDS)
+                # Watches normally last minutes; do not spin if the server keeps ending them early
+                time.sleep(max(0.0, STATUS_REWATCH_SECONDS - (time.monotonic() - started)))
+
+    def _poll(self):
+        with use_cluster(self.cluster):
+            while True:
+                time.sleep(STATUS_REFRESH_SECONDS)
+                objects, _ = fetch_status_objects()
+                with self._lock:
+                    if objects == self.objects:
+                        continue
+                    self.objects = objects
+                self.changed.set()
+
+@tracing.traced
+def status_awx(watch: bool = False):
+    """Print the health of AWX on every cluster; with watch, reprint whenever it changes"""
+    clusters = load_fleet() or [DEFAULT_CLUSTER]
+    snapshots = for_each_cluster(clusters, fetch_status_objects)
+    if not watch:
+        print(render_status(clusters, {name: objects for name, (objects, _) in snapshots.items()}))
+        return
+
+    changed = threading.Event()
+    watchers = [StatusWatcher(cluster, *snapshots[cluster.name], changed) for cluster in clusters]
+    for watcher in watchers:
+        watcher.start()
+    shown = ""
+    try:
+        while True:
+            text = render_status(clusters, {w.cluster.name: w.snapshot() for w in watchers})
+            if text != shown:
+                print(f"\n[{time.strftime('%H:%M:%S')}]\n{text}", flush=True)
+                shown = text
+            changed.wait()
+            # Let a burst of events settle into one redraw
+            time.sleep(STATUS_REDRAW_DELAY_SECONDS)
+            changed.clear()
+    except KeyboardInterrupt:
+        pass
+
+@tracing.traced
+def ensure_prerequisites():
+    """Probe the required tools, installing Kubernetes tools and Kind if they are missing"""
+    with resource_sampler.phase("prerequisites"):
+        prerequisites, _ = run_preflight_checks()
+    if not prerequisites["docker"]:
+        print("\nError: Docker is required but not installed or not running")
+        sys.exit(1)
+    
+    if not prerequisites["kubernetes"]:
+        print_verbose("Installing Kubernetes tools...")
+        with resource_sampler.phase("install_kubernetes_tools"):
+            install_kubernetes_tools()
+        # Helm is installed alongside kubectl, so probe it again
+        if not prerequisites["helm"]:
+            prerequisites["helm"] = check_helm()
+    
+    if not prerequisites["helm"]:
+        print("\nError: Helm is required but not installed")
+        sys.exit(1)
+    
+    if not prerequisites["kind"]:
+        print_verbose("Installing Kind...")
+        with resource_sampler.phase("install_kind"):
+            install_kind()
+
+def load_fleet() -> List[ClusterSpec]:
+    """Return the clusters recorded for the fleet, or an empty list if there is none"""
+    try:
+        with open(FLEET_FILE) as f:
+            return [ClusterSpec(**cluster) for cluster in json.load(f)]
+    except (OSError, ValueError, TypeError):
+        return []
+
+def save_fleet(clusters: List[ClusterSpec]):
+    """Record the fleet's clusters so later runs and --cleanup can find them"""
+    os.makedirs(FLEET_DIR, exist_ok=True)
+    with open(FLEET_FILE, "w") as f:
+        json.dump([cluster._asdict() for cluster in clusters], f, indent=2)
+
+def port_is_free(port: int) -> bool:
+    """Check that nothing is listening on a host port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind(("", port))
+        except OSError:
+            return False
+    return True
+
+def plan_fleet(count: int) -> List[ClusterSpec]:
+    """Return specs for a fleet of clusters, keeping the ports of clusters that already exist"""
+    existing = {cluster.name: cluster for cluster in load_fleet()}
+    used_ports = {cluster.host_port for cluster in existing.values()} | {AWX_NODEPORT}
+    clusters = []
+    port = FLEET_BASE_PORT
+    for index in range(1, count + 1):
+        name = f"{FLEET_DIR}-{index}"
+        if name in existing:
+            clusters.append(existing[name])
+            continue
+        while port in used_ports or not port_is_free(port):
+            port += 1
+        used_ports.add(port)
+        workdir = os.path.abspath(os.path.join(FLEET_DIR, name))
+        clusters.append(ClusterSpec(name, port, workdir, os.path.join(workdir, "kubeconfig")))
+    # Clusters beyond the requested count stay recorded so --cleanup still removes them
+    return clusters + [cluster for name, cluster in existing.items() if name not in {c.name for c in clusters}]
+
+def for_each_cluster(clusters: List[ClusterSpec], action: Callable[[], object]) -> Dict[str, object]:
+    """Run an action against every cluster concurrently and return its results by cluster name"""
+    def _run(cluster: ClusterSpec):
+        with use_cluster(cluster):
+            return action()
+
+    with ThreadPoolExecutor(max_workers=max(len(clusters), 1)) as executor:
+        return dict(zip((cluster.name for cluster in clusters),
+                        executor.map(tracing.in_current_context(_run), clusters)))
+
+@tracing.traced
+def provision_cluster(incremental: bool = False, use_registry_mirror: bool = False) -> Tuple[bool, float, str]:
+    """Deploy AWX into the current cluster and return readiness, seconds taken and the admin password"""
+    started = time.monotonic()
+    if current_cluster().workdir:
+        os.makedirs(current_cluster().workdir, exist_ok=True)
+    deploy_awx_kubernetes(incremental=incremental, use_registry_mirror=use_registry_mirror)
+    ready, _ = wait_for_awx_ready()
+    return ready, time.monotonic() - started, get_admin_password()
+
+@tracing.traced
+def fleet_main(count: int, incremental: bool = False, use_registry_mirror: bool = False):
+    """Provision a fleet of independent AWX clusters concurrently"""
+    print(f"Starting setup of {count} AWX clusters...")
     
-    # Check system requirements
     print("\n=== Checking System Requirements ===")
-    resource_status = check_system_resources()
+    resource_status = check_system_resources(clusters=count)
     if not all(resource_status.values()):
-        print("\nError: System does not meet minimum requirements:")
+        print(f"\nError: System does not meet minimum requirements for {count} clusters:")
         for resource, status in resource_status.items():
             if not status:
                 print(f"- {resource.capitalize()} requirements not met")
         sys.exit(1)
     
-    # Check and install prerequisites
     print("\n=== Checking Prerequisites ===")
-    if not check_docker():
-        print("\nError: Docker is required but not installed or not running")
-        sys.exit(1)
+    ensure_prerequisites()
     
-    if not check_kubernetes():
-        print_verbose("Installing Kubernetes tools...")
-        install_kubernetes_tools()
+    clusters = plan_fleet(count)
+    save_fleet(clusters)
+    if use_registry_mirror:
+        # The mirrors are shared, so fill them once before any cluster pulls from them
+        prepare_registry_mirror()
     
-    if not check_helm():
-        print("\nError: Helm is required but not installed")
+    print(f"\n=== Deploying {count} AWX Clusters ===")
+    started = time.monotonic()
+    results = for_each_cluster(clusters[:count], lambda: provision_cluster(incremental, use_registry_mirror))
+    
+    print("\n=== Fleet Setup Complete ===")
+    print(f"{'Cluster':<16}{'URL':<26}{'Ready':<7}{'Seconds':>8}  {'Admin password':<34}Kubeconfig")
+    for cluster in clusters[:count]:
+        ready, seconds, password = results[cluster.name]
+        print(f"{cluster.name:<16}{f'http://localhost:{cluster.host_port}':<26}{'yes' if ready else 'no':<7}"
+              f"{seconds:>8.1f}  {password:<34}{cluster.kubeconfig}")
+    print(f"\n{count} clusters provisioned in {time.monotonic() - started:.1f}s")
+    print("\nTo remove every cluster, run:")
+    print("python setup_awx_tower.py --cleanup")
+
+@tracing.traced
+def main(incremental: bool = False, use_registry_mirror: bool = False):
+    print("Starting AWX Tower setup with verbose output...")
+    if resource_sampler.start_sampling():
+        atexit.register(report_resource_usage)
+    
+    # Check system requirements
+    print("\n=== Checking System Requirements ===")
+    with resource_sampler.phase("system_checks"):
+        resource_status = check_system_resources()
+    if not all(resource_status.values()):
+        print("\nError: System does not meet minimum requirements:")
+        for resource, status in resource_status.items():
+            if not status:
+                print(f"- {resource.capitalize()} requirements not met")
         sys.exit(1)
     
-    if not check_kind():
-        print_verbose("Installing Kind...")
-        install_kind()
+    # Check and install prerequisites
+    print("\n=== Checking Prerequisites ===")
+    ensure_prerequisites()
     
     # Deploy AWX
     print("\n=== Deploying AWX ===")
-    deploy_awx_kubernetes()
+    deploy_awx_kubernetes(incremental=incremental, use_registry_mirror=use_registry_mirror)
     
     # Wait for AWX to be ready and get the password
     print("\nWaiting for AWX to be ready...")
-    time.sleep(30)  # Give some time for the secret to be created
+    with resource_sampler.phase("wait_for_awx_ready"):
+        ready, timings = wait_for_awx_ready()
+    for phase, seconds in timings.items():
+        print_verbose(f"{phase}: {seconds:.1f}s", 1)
     
     print_verbose("Retrieving admin password...", 1)
-    returncode, stdout, stderr = run_command("kubectl get secret awx-admin-password -o jsonpath=\"{.data.password}\" | base64 --decode", check=False)
+    password = get_admin_password()
     
     print("\n=== Setup Complete ===")
+    if not ready:
+        print("Warning: AWX did not become ready in time; it may still be starting.")
+        print("Check progress with: kubectl get pods")
     print("AWX Tower has been deployed. You should be able to access it at:")
-    print("http://localhost:30080")
+    print(f"http://localhost:{current_cluster().host_port}")
     print("\nDefault credentials:")
     print("Username: admin")
-    print(f"Password: {stdout.strip()}")
+    print(f"Password: {password}")
     print("\nTo shut down AWX (preserving configuration), run:")
     print("python setup_awx_tower.py --shutdown")
     print("\nTo clean up the deployment completely, run:")
     print("python setup_awx_tower.py --cleanup")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Deploy and manage AWX Tower on a local Kind cluster")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--cleanup", action="store_true", help="Remove the AWX deployment and the Kind cluster")
+    action.add_argument("--shutdown", action="store_true", help="Scale AWX down, preserving configuration")
+    action.add_argument("--start", action="store_true", help="Scale a shut-down AWX back up")
+    action.add_argument("--suspend", action="store_true",
+                        help="Freeze the Kind nodes in place (falls back to --shutdown)")
+    action.add_argument("--resume", action="store_true",
+                        help="Thaw suspended Kind nodes (falls back to --start)")
+    action.add_argument("--status", action="store_true",
+                        help="Print a health summary of AWX (every fleet cluster if there is a fleet)")
+    action.add_argument("--size-preview", action="store_true",
+                        help="Show the AWX sizing and manifest --auto-size would deploy, and exit")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Skip deployment steps whose inputs have not changed since the last run")
+    parser.add_argument("--registry-mirror", action="store_true",
+                        help="Pull cluster images through local pull-through registry mirrors")
+    parser.add_argument("--offline", action="store_true",
+                        help="Install Kind and Helm only from the local artifact cache")
+    parser.add_argument("--auto-size", action="store_true",
+                        help="Size AWX replicas, resources, task capacity and Postgres to this host")
+    parser.add_argument("--teardown", choices=["auto", "fast", "graceful"], default="auto",
+                        help="With --cleanup: fast deletes Kind clusters outright, graceful removes AWX and the "
+                             "operator first; auto is fast for clusters this script created and graceful otherwise")
+    parser.add_argument("--watch", action="store_true",
+                        help="With --status, keep the summary current, fetching only what changes (Ctrl-C to stop)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Write a Chrome/Perfetto trace of the run's phases and commands to FILE")
+    parser.add_argument("--fleet", type=int, metavar="N",
+                        help="Provision N independent AWX clusters concurrently (removed again by --cleanup)")
+    args = parser.parse_args()
+    if args.fleet is not None and args.fleet < 1:
+        parser.error("--fleet needs at least 1 cluster")
+    return args
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
-        if sys.argv[1] == "--cleanup":
-            cleanup_awx()
-        elif sys.argv[1] == "--shutdown":
-            shutdown_awx()
-        elif sys.argv[1] == "--start":
-            start_awx()
-        else:
-            print("Invalid option. Use --cleanup, --shutdown, or --start")
-            sys.exit(1)
+    args = parse_args()
+    if not args.status:
+        command_runner.engine.report_at_exit(COMMAND_REPORT_FILE)
+    if args.offline:
+        artifact_cache.OFFLINE = True
+    if args.trace:
+        tracing.start_tracing(args.trace)
+    if args.auto_size and not args.size_preview:
+        sizing = auto_size_awx(args.fleet or 1)
+        print_verbose(f"Sizing AWX to this host:\n{sizing.describe()}", 1)
+    if args.status:
+        # Keep the summary compact: no per-command output
+        VERBOSE = False
+        status_awx(watch=args.watch)
+    elif args.size_preview:
+        preview_awx_sizing(args.fleet or 1)
+    elif args.cleanup:
+        cleanup_awx(args.teardown)
+    elif args.shutdown:
+        shutdown_awx()
+    elif args.start:
+        start_awx()
+    elif args.suspend:
+        suspend_awx()
+    elif args.resume:
+        resume_awx()
+    elif args.fleet:
+        fleet_main(args.fleet, incremental=args.incremental, use_registry_mirror=args.registry_mirror)
     else:
-        main()
-
-
+        main(incremental=args.incremental, use_registry_mirror=args.registry_mirror)
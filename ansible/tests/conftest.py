@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The scripts import each other as top-level modules from the ansible directory,
+# and the stand-ins in benchmarks/ (fake_apiserver, ...) are imported the same way
+ANSIBLE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ANSIBLE_DIR)
+sys.path.insert(1, os.path.join(ANSIBLE_DIR, "benchmarks"))
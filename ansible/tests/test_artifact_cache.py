@@ -0,0 +1,56 @@
+import hashlib
+
+import pytest
+
+import artifact_cache
+
+CONTENT = b"#!/bin/sh\necho kind v0.20.0\n"
+DIGEST = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_cache, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "kind-linux-amd64"
+    path.write_bytes(CONTENT)
+    return path.as_uri()
+
+def manifest(url, **entry):
+    return {"kind": {"url": url, **entry}}
+
+def test_pinned_download_is_verified_and_cached(source):
+    path = artifact_cache.fetch("kind", offline=False, manifest=manifest(source, sha256=DIGEST))
+    assert path == artifact_cache.blob_path(DIGEST)
+    # Served from the cache from now on, even offline
+    assert artifact_cache.fetch("kind", offline=True, manifest=manifest(source, sha256=DIGEST)) == path
+
+def test_checksum_mismatch_is_refused_and_not_cached(source):
+    with pytest.raises(artifact_cache.ArtifactError, match="checksum mismatch"):
+        artifact_cache.fetch("kind", offline=False, manifest=manifest(source, sha256="0" * 64))
+    with pytest.raises(artifact_cache.ArtifactError, match="offline"):
+        artifact_cache.fetch("kind", offline=True, manifest=manifest(source, sha256=DIGEST))
+
+def test_corrupted_cache_entry_is_downloaded_again(source):
+    path = artifact_cache.fetch("kind", offline=False, manifest=manifest(source, sha256=DIGEST))
+    with open(path, "wb") as f:
+        f.write(b"tampered")
+    assert artifact_cache.fetch("kind", offline=False, manifest=manifest(source, sha256=DIGEST)) == path
+    assert artifact_cache.file_sha256(path) == DIGEST
+
+def test_unpinned_artifact_is_refused(source):
+    with pytest.raises(artifact_cache.ArtifactError, match="no sha256 pinned"):
+        artifact_cache.fetch("kind", offline=False, manifest=manifest(source, sha256=None))
+
+def test_trust_on_first_use_warns_and_keeps_the_first_download(source, tmp_path, capsys):
+    entry = manifest(source, sha256=None, trust_on_first_use=True)
+    path = artifact_cache.fetch("kind", offline=False, manifest=entry)
+    assert path == artifact_cache.blob_path(DIGEST)
+    assert f"trusting this first download of {source} (sha256 {DIGEST})" in capsys.readouterr().out
+    # A changed upstream file is not picked up silently; the trusted copy is served
+    (tmp_path / "kind-linux-amd64").write_bytes(b"something else")
+    assert artifact_cache.fetch("kind", offline=False, manifest=entry) == path
+    assert capsys.readouterr().out == ""
+
+def test_get_pip_is_the_only_unpinned_artifact():
+    artifacts = artifact_cache.load_manifest()
+    assert [name for name, artifact in artifacts.items() if not artifact.get("sha256")] == ["get-pip.py"]
+    assert artifacts["get-pip.py"]["trust_on_first_use"]
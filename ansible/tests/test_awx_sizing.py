@@ -0,0 +1,80 @@
+import math
+
+import pytest
+import yaml
+
+import awx_sizing
+import setup_awx_tower
+from awx_sizing import HostResources, size_awx
+
+LAPTOP = HostResources(4, 8, 50)
+
+def test_laptop_gets_one_of_each_and_a_few_job_slots():
+    sizing = size_awx(LAPTOP)
+    # 1 core and 2GB are kept back for the OS and the control plane
+    assert sizing.budget == HostResources(3, 6, 50)
+    assert (sizing.web_replicas, sizing.task_replicas) == (1, 1)
+    # 42% of the budget is left for jobs: min(1.26 cores / 0.5, 2580MiB / 512MiB)
+    assert sizing.job_slots == 2
+    assert sizing.postgres_storage_gb == 12
+    assert sizing.postgres_settings["max_connections"] == "400"
+    assert sizing.containers["web"] == awx_sizing.ContainerSize(0.45, 921)
+    # redis runs beside both web and task, so each copy gets half its share
+    assert sizing.containers["redis"] == awx_sizing.ContainerSize(0.05, 92)
+
+def test_zero_capacity_host_still_gets_a_deployable_minimum():
+    sizing = size_awx(HostResources(0, 0, 0))
+    assert sizing.budget == HostResources(1.0, 1.0, 0.0)
+    assert (sizing.web_replicas, sizing.task_replicas, sizing.job_slots) == (1, 1, 1)
+    for name, size in sizing.containers.items():
+        assert size >= awx_sizing.ContainerSize(*awx_sizing.FLOORS[name])
+    assert sizing.postgres_storage_gb == awx_sizing.POSTGRES_MIN_STORAGE_GB
+    assert sizing.task_capacity() == {"SYSTEM_TASK_ABS_CPU": "1", "SYSTEM_TASK_ABS_MEM": "2148Mi"}
+
+def test_very_large_host_is_capped():
+    sizing = size_awx(HostResources(1024, 4096, 100000))
+    assert (sizing.web_replicas, sizing.task_replicas) == (awx_sizing.MAX_WEB_REPLICAS, awx_sizing.MAX_TASK_REPLICAS)
+    assert sizing.postgres_settings["max_connections"] == str(awx_sizing.POSTGRES_MAX_CONNECTIONS)
+    assert sizing.postgres_storage_gb == awx_sizing.POSTGRES_MAX_STORAGE_GB
+    assert sizing.postgres_settings["maintenance_work_mem"] == "2048MB"
+    # Thousands of job slots spread over the task pods, with Gi-sized memory
+    assert sizing.job_slots == 774
+    capacity = sizing.task_capacity()
+    assert capacity["SYSTEM_TASK_ABS_CPU"] == str(math.ceil(194 / awx_sizing.SYSTEM_TASK_FORKS_CPU))
+    assert capacity["SYSTEM_TASK_ABS_MEM"] == "20Gi"
+    assert sizing.containers["task"].requirements()["requests"]["cpu"] == "35"
+
+def test_clusters_split_the_host_after_the_reservation():
+    one, four = size_awx(LAPTOP), size_awx(LAPTOP, clusters=4)
+    assert four.budget == HostResources(one.budget.cpu_cores / 4, one.budget.memory_gb / 4, 12.5)
+    assert four.job_slots == 1
+    with pytest.raises(ValueError):
+        size_awx(LAPTOP, clusters=0)
+
+def test_limits_leave_burst_room_above_the_requests():
+    requirements = awx_sizing.ContainerSize(0.25, 1024).requirements()
+    assert requirements == {"requests": {"cpu": "250m", "memory": "1024Mi"},
+                            "limits": {"cpu": "500m", "memory": "1536Mi"}}
+
+@pytest.mark.parametrize("cores, quantity", [(0.05, "50m"), (9.99, "9990m"), (10, "10"), (12.4, "12")])
+def test_cpu_quantities(cores, quantity):
+    assert awx_sizing.cpu_quantity(cores) == quantity
+
+@pytest.mark.parametrize("megabytes, quantity", [(64, "64Mi"), (8191, "8191Mi"), (8192, "8Gi"), (40000, "39Gi")])
+def test_memory_quantities(megabytes, quantity):
+    assert awx_sizing.memory_quantity(megabytes) == quantity
+
+def test_spec_renders_as_yaml_that_reads_back_the_same():
+    spec = size_awx(HostResources(32, 128, 500)).spec()
+    assert yaml.safe_load("\n".join(awx_sizing.to_yaml(spec))) == spec
+
+def test_size_preview_shows_the_manifest_without_deploying(monkeypatch, capsys):
+    monkeypatch.setattr(awx_sizing, "measure_host", lambda: HostResources(32, 128, 500))
+    monkeypatch.setattr(setup_awx_tower, "AWX_SPEC_FIELDS", {})
+    monkeypatch.setattr(setup_awx_tower, "run_command", pytest.fail)
+    setup_awx_tower.preview_awx_sizing(clusters=2)
+    output = capsys.readouterr().out
+    assert "Budget per cluster (2 on this host): 14.4 cores, 57.6GB memory" in output
+    manifest = yaml.safe_load(output.split("=== AWX Instance Manifest ===")[1].split("\nNothing was deployed")[0])
+    assert manifest["spec"]["task_replicas"] == 1
+    assert manifest["spec"]["postgres_storage_requirements"] == {"requests": {"storage": "62Gi"}}
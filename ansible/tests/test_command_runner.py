@@ -0,0 +1,54 @@
+import os
+import signal
+import time
+
+import pytest
+
+import command_runner
+from command_runner import needs_shell
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="every command goes through the shell on Windows")
+
+@pytest.mark.parametrize("command", [
+    "kubectl get pods -o json",
+    "pip install -U requests==2.32.3",
+    "echo 'a | b; c > d'",
+    "echo '$HOME'",
+    "helm upgrade --set image.tag=1.2 awx awx-operator/awx-operator",
+    "",
+])
+def test_plain_commands_run_without_a_shell(command):
+    assert not needs_shell(command)
+
+@pytest.mark.parametrize("command", [
+    "echo hi | sudo tee /etc/hosts",
+    "sudo apt update && sudo apt upgrade -y",
+    "ls *.yaml",
+    'echo "$HOME"',
+    'echo "`date`"',
+    "echo $(whoami)",
+    "FOO=1 make build",
+    'echo "unterminated',
+    "cat ~/.kube/config",
+])
+def test_shell_syntax_needs_a_shell(command):
+    assert needs_shell(command)
+
+def test_timeout_kills_the_commands_a_shell_started(tmp_path):
+    marker = tmp_path / "still-running"
+    started = time.monotonic()
+    result = command_runner.run_command(f"(sleep 1; touch {marker}) | cat", timeout=0.3)
+    assert result.returncode == 124
+    assert result.stderr.endswith("Timed out after 0.3s")
+    # The pipes close as soon as the group is killed, not after a grace period
+    assert time.monotonic() - started < 1
+    time.sleep(1.5)
+    assert not marker.exists()
+
+@pytest.mark.parametrize("modern", [True, False])
+def test_exit_status_and_signals_are_reported_like_subprocess(monkeypatch, modern):
+    if not modern:
+        # Python 3.8 and older, as on some rolling-upgrade hosts
+        monkeypatch.delattr(os, "waitstatus_to_exitcode", raising=False)
+    assert command_runner.run_command("sh -c 'exit 3'").returncode == 3
+    assert command_runner.run_command("sh -c 'kill -TERM $$'").returncode == -signal.SIGTERM
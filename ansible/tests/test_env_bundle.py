@@ -0,0 +1,26 @@
+import env_bundle
+
+def test_only_python_packages_become_requirements():
+    environment = {"dependencies": [
+        "python=3.11.9=hab00c5b_0_cpython",
+        "ansible-core=2.17.1=pyhd8ed1ab_0",
+        "openssl=3.3.1=h4ab18f5_0",
+        "docker-compose=2.35.1=ha770c72_0",
+        "pip=24.0=pyhd8ed1ab_0",
+        "pyyaml=6.0.1=py311h459d7ec_1",
+        {"pip": ["ansible-lint==24.6.1"]},
+    ]}
+    assert env_bundle.python_requirements(environment) == \
+        ["ansible-core==2.17.1", "pyyaml==6.0.1", "ansible-lint==24.6.1"]
+
+def test_renamed_conda_packages_use_their_pypi_names():
+    environment = {"dependencies": ["python-kubernetes=30.1.0=pyhd8ed1ab_0", "brotli-python=1.1.0=py311hb755f60_1",
+                                    "ruamel_yaml=0.15.80=py311h459d7ec_1007"]}
+    assert env_bundle.python_requirements(environment) == \
+        ["kubernetes==30.1.0", "Brotli==1.1.0", "ruamel.yaml==0.15.80"]
+
+def test_repository_environment_parses_without_pyyaml(monkeypatch):
+    with_yaml = env_bundle.python_requirements(env_bundle.read_environment())
+    monkeypatch.setattr(env_bundle, "yaml", None)
+    assert env_bundle.python_requirements(env_bundle.read_environment()) == with_yaml
+    assert any(requirement.startswith("ansible-core==") for requirement in with_yaml)
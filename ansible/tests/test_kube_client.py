@@ -0,0 +1,131 @@
+import json
+import socket
+
+import pytest
+
+import fake_apiserver
+import kube_client
+import setup_awx_tower
+from command_runner import CommandResult
+
+@pytest.fixture(scope="module")
+def running_server():
+    server = fake_apiserver.serve()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def server(running_server):
+    """The stand-in server, back to a ready AWX deployment with fresh counters"""
+    running_server.objects = fake_apiserver.ready_awx_objects()
+    running_server.requests = running_server.connections = 0
+    return running_server
+
+@pytest.fixture
+def kubeconfig(server, tmp_path):
+    path = str(tmp_path / "kubeconfig")
+    fake_apiserver.write_kubeconfig(path, server.url)
+    return path
+
+@pytest.fixture
+def api(kubeconfig):
+    client = kube_client.KubeClient.from_kubeconfig(kubeconfig)
+    yield client
+    client.close()
+
+def names(items):
+    return [item["metadata"]["name"] for item in items]
+
+def test_requests_share_one_keep_alive_connection(api, server):
+    assert api.healthy()
+    for _ in range(5):
+        api.get("deployments", "awx-web")
+    api.list("pods")
+    assert server.requests == 7
+    assert server.connections == 1
+
+def test_a_connection_the_server_dropped_is_replaced(api, server):
+    api.get("namespaces", "kube-system")
+    # Break the idle pooled connection, as a server closing it after its keep-alive timeout would
+    api._idle.queue[0].sock.shutdown(socket.SHUT_RDWR)
+    assert api.get("namespaces", "kube-system")["metadata"]["uid"] == fake_apiserver.KUBE_SYSTEM_UID
+    assert server.connections == 2
+
+def test_list_filters_by_label_selector(api):
+    assert names(api.list("pods")["items"]) == ["awx-postgres-15-0", "awx-task-0", "awx-web-0"]
+    assert names(api.list("deployments", selector="app.kubernetes.io/managed-by=awx-operator")["items"]) == \
+        ["awx-task", "awx-web"]
+    assert api.list("pods", selector="app=other")["items"] == []
+
+def test_watch_streams_events_until_the_server_ends_it(api):
+    events = list(api.watch("pods", resource_version="1", timeout_seconds=5))
+    assert [event["type"] for event in events] == ["ADDED"] * 3
+    assert names(event["object"] for event in events) == ["awx-postgres-15-0", "awx-task-0", "awx-web-0"]
+
+def test_errors_carry_the_status(api):
+    with pytest.raises(kube_client.ApiError) as error:
+        api.get("deployments", "missing")
+    assert error.value.status == 404
+    assert "not found" in str(error.value)
+
+def test_scale_and_secrets(api):
+    api.scale("deployments", "awx-web", 0)
+    assert api.get("deployments", "awx-web")["spec"]["replicas"] == 0
+    assert api.get_secret("awx-admin-password") == {"password": "stand-in-password"}
+
+def test_server_side_apply_creates_and_updates(api, server):
+    document = {"apiVersion": "awx.ansible.com/v1beta1", "kind": "AWX",
+                "metadata": {"name": "awx"}, "spec": {"service_type": "nodeport", "nodeport_port": 30080}}
+    applied = api.apply(document)
+    assert applied["spec"] == document["spec"]
+    assert api.get("awxs", "awx")["metadata"]["resourceVersion"] == applied["metadata"]["resourceVersion"]
+    # Applying again updates the same object; discovery is asked only once
+    document["spec"]["nodeport_port"] = 30081
+    requests = server.requests
+    api.apply_manifest(json.dumps(document))
+    assert api.get("awxs", "awx")["spec"]["nodeport_port"] == 30081
+    assert server.requests == requests + 2
+
+def test_unknown_kind_is_refused(api):
+    with pytest.raises(kube_client.ApiError, match="does not serve kind Widget"):
+        api.apply({"apiVersion": "apps/v1", "kind": "Widget", "metadata": {"name": "w"}})
+
+def test_clients_are_shared_until_the_kubeconfig_changes(kubeconfig, server):
+    first = kube_client.client_for(kubeconfig)
+    assert kube_client.client_for(kubeconfig) is first
+    fake_apiserver.write_kubeconfig(kubeconfig, server.url + "/")
+    assert kube_client.client_for(kubeconfig) is not first
+
+@pytest.fixture
+def kubectl(monkeypatch):
+    """Record kubectl calls and answer them with a pod list"""
+    calls = []
+    pods = {"items": [{"metadata": {"name": "from-kubectl"}}]}
+
+    def run_command(command, **kwargs):
+        calls.append(command)
+        return CommandResult(0, json.dumps(pods), "")
+    monkeypatch.setattr(setup_awx_tower, "run_command", run_command)
+    monkeypatch.setattr(setup_awx_tower, "VERBOSE", False)
+    return calls
+
+def test_scripts_use_the_api_when_there_is_a_kubeconfig(kubeconfig, kubectl, monkeypatch):
+    monkeypatch.setenv("KUBECONFIG", kubeconfig)
+    assert names(setup_awx_tower.get_kubernetes_objects("pods")) == ["awx-postgres-15-0", "awx-task-0", "awx-web-0"]
+    assert kubectl == []
+
+def test_no_kubeconfig_falls_back_to_kubectl(tmp_path, kubectl, monkeypatch):
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "missing"))
+    assert names(setup_awx_tower.get_kubernetes_objects("pods")) == ["from-kubectl"]
+    assert kubectl == ["kubectl get pods -o json"]
+
+def test_unreachable_api_server_falls_back_to_kubectl(tmp_path, kubectl, monkeypatch):
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    path = str(tmp_path / "kubeconfig")
+    fake_apiserver.write_kubeconfig(path, f"http://127.0.0.1:{port}")
+    monkeypatch.setenv("KUBECONFIG", path)
+    assert names(setup_awx_tower.get_kubernetes_objects("pods")) == ["from-kubectl"]
+    assert len(kubectl) == 1
@@ -0,0 +1,123 @@
+import json
+import os
+import time
+
+import pytest
+
+import probe_cache
+from command_runner import CommandResult
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """A fresh cache file and a PATH holding a stand-in helm"""
+    monkeypatch.setattr(probe_cache, "CACHE_FILE", str(tmp_path / "probes.json"))
+    monkeypatch.setattr(probe_cache, "_entries", None)
+    tools = tmp_path / "bin"
+    tools.mkdir()
+    monkeypatch.setenv("PATH", str(tools))
+    helm = tools / "helm"
+    helm.write_text("#!/bin/sh\necho v3.12.3\n")
+    os.chmod(helm, 0o755)
+    return helm
+
+class Runner:
+    def __init__(self, result=CommandResult(0, "v3.12.3", "")):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, command):
+        self.calls += 1
+        return self.result
+
+def reload():
+    """Forget the in-memory copy, as a new process would"""
+    probe_cache._entries = None
+
+def test_second_probe_is_served_from_the_cache(cache):
+    run = Runner()
+    assert probe_cache.cached_probe("helm version", run) == run.result
+    reload()
+    assert probe_cache.cached_probe("helm version", run) == run.result
+    assert run.calls == 1
+
+def test_failed_probes_are_not_cached(cache):
+    run = Runner(CommandResult(127, "", "helm: not found"))
+    probe_cache.cached_probe("helm version", run)
+    probe_cache.cached_probe("helm version", run)
+    assert run.calls == 2
+
+def test_changed_binary_misses_the_cache(cache):
+    run = Runner()
+    probe_cache.cached_probe("helm version", run)
+    cache.write_text("#!/bin/sh\necho v3.16.2\n")
+    probe_cache.cached_probe("helm version", run)
+    assert run.calls == 2
+
+def test_missing_binary_is_never_cached(cache):
+    run = Runner(CommandResult(0, "kind v0.20.0", ""))
+    probe_cache.cached_probe("kind version", run)
+    probe_cache.cached_probe("kind version", run)
+    assert run.calls == 2
+
+def test_entries_expire_after_the_ttl(cache):
+    run = Runner()
+    probe_cache.cached_probe("helm version", run)
+    with open(probe_cache.CACHE_FILE) as f:
+        entries = json.load(f)
+    for entry in entries.values():
+        entry["stored"] = time.time() - probe_cache.CACHE_TTL_SECONDS - 1
+    with open(probe_cache.CACHE_FILE, "w") as f:
+        json.dump(entries, f)
+    reload()
+    probe_cache.cached_probe("helm version", run)
+    assert run.calls == 2
+
+def test_invalidate_drops_only_the_named_binaries(cache):
+    helm, docker = Runner(), Runner(CommandResult(0, "Docker version 24.0.7", ""))
+    docker_path = cache.parent / "docker"
+    docker_path.write_text("#!/bin/sh\n")
+    os.chmod(docker_path, 0o755)
+    probe_cache.cached_probe("helm version", helm)
+    probe_cache.cached_probe("docker --version", docker)
+
+    probe_cache.invalidate("helm")
+    reload()
+    probe_cache.cached_probe("helm version", helm)
+    probe_cache.cached_probe("docker --version", docker)
+    assert (helm.calls, docker.calls) == (2, 1)
+
+    probe_cache.invalidate()
+    probe_cache.cached_probe("helm version", helm)
+    probe_cache.cached_probe("docker --version", docker)
+    assert (helm.calls, docker.calls) == (3, 2)
+
+def test_invalidate_also_drops_cached_values(cache, tmp_path):
+    os_release = tmp_path / "os-release"
+    os_release.write_text("ID=ubuntu\n")
+    calls = []
+
+    def detect():
+        calls.append(1)
+        return "ubuntu"
+    assert probe_cache.cached_value("distro.id", [str(os_release)], detect) == "ubuntu"
+    assert probe_cache.cached_value("distro.id", [str(os_release)], detect) == "ubuntu"
+    assert len(calls) == 1
+    probe_cache.invalidate()
+    probe_cache.cached_value("distro.id", [str(os_release)], detect)
+    assert len(calls) == 2
+
+def test_cached_value_follows_its_source_files(cache, tmp_path):
+    os_release = tmp_path / "os-release"
+    os_release.write_text("ID=ubuntu\n")
+    assert probe_cache.cached_value("distro.id", [str(os_release)], lambda: "ubuntu") == "ubuntu"
+    os_release.write_text("ID=rocky\nVERSION_ID=9\n")
+    assert probe_cache.cached_value("distro.id", [str(os_release)], lambda: "rocky") == "rocky"
+
+def test_corrupt_or_unwritable_cache_is_ignored(cache, tmp_path, monkeypatch):
+    with open(probe_cache.CACHE_FILE, "w") as f:
+        f.write("{not json")
+    run = Runner()
+    assert probe_cache.cached_probe("helm version", run) == run.result
+    monkeypatch.setattr(probe_cache, "CACHE_FILE", str(tmp_path / "probes.json" / "nested"))
+    probe_cache.invalidate()
+    assert probe_cache.cached_probe("helm version", run) == run.result
@@ -0,0 +1,12 @@
+import registry_mirror
+import setup_awx_tower
+
+def test_installed_chart_is_the_one_the_mirror_seeds():
+    assert setup_awx_tower.AWX_OPERATOR_CHART_VERSION == registry_mirror.AWX_OPERATOR_VERSION
+    assert f"quay.io/ansible/awx-operator:{registry_mirror.AWX_OPERATOR_VERSION}" in registry_mirror.SEED_IMAGES
+    assert f"quay.io/ansible/awx:{registry_mirror.AWX_VERSION}" in registry_mirror.SEED_IMAGES
+
+def test_every_seed_image_goes_through_a_mirror():
+    for image in registry_mirror.SEED_IMAGES:
+        assert registry_mirror.mirror_reference(image).startswith("localhost:500")
+    assert registry_mirror.mirror_reference("docker.io/library/redis:7") == "localhost:5001/library/redis:7"
@@ -0,0 +1,49 @@
+import os
+import sys
+
+import rolling_upgrade
+from rolling_upgrade import Host, LocalTransport, RollingUpgrade
+
+def write_tool(directory, name, body):
+    path = directory / name
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    os.chmod(path, 0o755)
+
+def test_failing_upgrade_step_fails_the_host(tmp_path, monkeypatch):
+    # apt is the only package manager on PATH, and its upgrade fails
+    tools = tmp_path / "bin"
+    tools.mkdir()
+    write_tool(tools, "sudo", 'exec "$@"')
+    write_tool(tools, "apt", 'echo "E: Could not get lock /var/lib/dpkg/lock-frontend" >&2; exit 100')
+    monkeypatch.setenv("PATH", str(tools))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    rollout = RollingUpgrade(LocalTransport(), rolling_upgrade.default_remote_command("local", "all"), quiet=True)
+    assert not rollout.run([Host("canary1", "canary1"), Host("web1", "web1")])
+    assert [(r.host, r.returncode) for r in rollout.results] == [("canary1", 1)]
+    assert rollout.aborted == "a canary host failed"
+
+def test_failure_budget_stops_new_hosts_mid_batch():
+    fail_web2 = f"{sys.executable} -c \"import os, sys; sys.exit(os.environ['ROLLING_UPGRADE_HOST'] == 'web2')\""
+    rollout = RollingUpgrade(LocalTransport(), fail_web2, concurrency=1, batch_size=10, max_failure_rate=0.2,
+                             quiet=True)
+    hosts = [Host(f"web{index}", f"web{index}") for index in range(1, 7)]
+    assert not rollout.run(hosts)
+    # One failure is within 20% of six hosts; the batch carries on until a second one
+    assert [r.host for r in rollout.results] == ["web1", "web2", "web3", "web4", "web5", "web6"]
+
+    rollout = RollingUpgrade(LocalTransport(), fail_web2, concurrency=1, batch_size=10, max_failure_rate=0.1,
+                             quiet=True)
+    assert not rollout.run(hosts)
+    assert [r.host for r in rollout.results] == ["web1", "web2"]
+    assert rollout.aborted.startswith("1 failed hosts exceed 10%")
+
+def test_ssh_transport_copies_the_script_before_running_it():
+    transport = rolling_upgrade.SshTransport("ssh", options="-o BatchMode=yes")
+    host = Host("web1", "10.0.0.5", "deploy")
+    copy = transport.copy_command(host, rolling_upgrade.REMOTE_FILES, rolling_upgrade.REMOTE_DIR)
+    assert copy.startswith("tar -C ")
+    assert "upgrade_server_components.py command_runner.py probe_cache.py | ssh -o BatchMode=yes deploy@10.0.0.5" in copy
+    assert rolling_upgrade.default_remote_command("ssh", "apply") == \
+        f"python3 {rolling_upgrade.REMOTE_DIR}/upgrade_server_components.py --apply"
@@ -0,0 +1,129 @@
+import json
+import os
+import time
+
+import pytest
+
+import probe_cache
+import setup_awx_tower
+from command_runner import CommandResult
+
+def write_tool(directory, name, body):
+    path = directory / name
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    os.chmod(path, 0o755)
+
+@pytest.fixture
+def quiet(monkeypatch):
+    monkeypatch.setattr(setup_awx_tower, "VERBOSE", False)
+
+@pytest.fixture
+def tools(tmp_path, monkeypatch):
+    """An empty PATH directory for stand-in tools, with a fresh probe cache and no kubeconfig"""
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    monkeypatch.setenv("PATH", f"{directory}{os.pathsep}/bin:/usr/bin")
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "no-kubeconfig"))
+    monkeypatch.setattr(probe_cache, "CACHE_FILE", str(tmp_path / "probes.json"))
+    monkeypatch.setattr(probe_cache, "_entries", None)
+    return directory
+
+@pytest.mark.skipif(os.name == "nt", reason="stand-in tools are shell scripts")
+def test_preflight_holds_every_probe_to_one_deadline(tools, quiet):
+    # Each docker command fits in the timeout on its own, but not both together
+    write_tool(tools, "docker", "sleep 0.9; echo Docker version 24.0.7")
+    write_tool(tools, "kubectl", "echo ok")
+    write_tool(tools, "helm", 'echo "version.BuildInfo{Version:\\"v3.12.3\\"}"')
+    write_tool(tools, "kind", "exec sleep 30")
+
+    started = time.monotonic()
+    status, timings = setup_awx_tower.run_preflight_checks(timeout=1.0)
+    elapsed = time.monotonic() - started
+
+    assert status == {"docker": False, "kubernetes": True, "helm": True, "kind": False}
+    assert elapsed < 1.5
+    assert timings["helm"] < 1.0
+
+@pytest.mark.skipif(os.name == "nt", reason="stand-in tools are shell scripts")
+def test_preflight_reports_missing_tools(tools, quiet):
+    write_tool(tools, "helm", "echo v3.12.3")
+    status, _ = setup_awx_tower.run_preflight_checks(timeout=5)
+    assert status == {"docker": False, "kubernetes": False, "helm": True, "kind": False}
+
+def test_time_left_counts_down_to_zero():
+    assert setup_awx_tower.time_left(None) is None
+    assert 9 < setup_awx_tower.time_left(time.monotonic() + 10) <= 10
+    assert setup_awx_tower.time_left(time.monotonic() - 1) == 0.0
+
+class FakeHelm:
+    """Stand-in for run_command that records commands and answers helm search"""
+
+    def __init__(self, newest="2.19.0"):
+        self.newest = newest
+        self.commands = []
+
+    def __call__(self, command, **kwargs):
+        self.commands.append(command)
+        if command.startswith("helm search repo"):
+            if not self.newest:
+                return CommandResult(1, "", "Error: no repositories configured")
+            return CommandResult(0, json.dumps([{"name": setup_awx_tower.AWX_OPERATOR_CHART,
+                                                 "version": self.newest}]), "")
+        return CommandResult(0, "", "")
+
+    def take(self):
+        """The helm commands run since the last call"""
+        commands, self.commands = self.commands, []
+        return [command for command in commands if command.startswith("helm")]
+
+def helm_steps(commands):
+    return [" ".join(command.split()[:3]) for command in commands]
+
+@pytest.fixture
+def deploy(tmp_path, monkeypatch):
+    """Run deploy_awx_kubernetes against an existing cluster with stand-in helm and kubectl"""
+    monkeypatch.chdir(tmp_path)
+    helm = FakeHelm()
+    monkeypatch.setattr(setup_awx_tower, "run_command", helm)
+    monkeypatch.setattr(setup_awx_tower, "create_kind_cluster", lambda use_registry_mirror=False: False)
+    monkeypatch.setattr(setup_awx_tower, "get_cluster_uid", lambda: "cluster-1")
+    monkeypatch.setattr(setup_awx_tower, "apply_manifest", lambda path: True)
+    monkeypatch.setattr(setup_awx_tower, "AWX_OPERATOR_CHART_VERSION", "")
+    return helm
+
+def test_incremental_deploy_follows_the_newest_unpinned_chart(deploy, capsys):
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    commands = deploy.take()
+    assert helm_steps(commands) == ["helm repo add", "helm repo update", "helm search repo", "helm upgrade --install"]
+    assert commands[-1].endswith("--version 2.19.0")
+
+    capsys.readouterr()
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    assert helm_steps(deploy.take()) == ["helm search repo"]
+    output = capsys.readouterr().out
+    assert "helm-repo: inputs unchanged, skipping" in output
+    assert "helm-operator: inputs unchanged, skipping" in output
+
+    deploy.newest = "2.20.0"
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    commands = deploy.take()
+    assert helm_steps(commands) == ["helm search repo", "helm upgrade --install"]
+    assert commands[-1].endswith("--version 2.20.0")
+
+def test_stale_repository_index_is_refreshed_without_claiming_a_skip(deploy, capsys):
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    state = setup_awx_tower.load_deploy_state()
+    state["steps"]["helm-repo"]["applied"] -= setup_awx_tower.HELM_REPO_REFRESH_SECONDS + 1
+    setup_awx_tower.save_deploy_state(state)
+    deploy.take()
+    capsys.readouterr()
+
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    assert helm_steps(deploy.take())[:2] == ["helm repo add", "helm repo update"]
+    assert "helm-repo: inputs unchanged" not in capsys.readouterr().out
+
+def test_unknown_chart_version_always_installs(deploy):
+    deploy.newest = ""
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    setup_awx_tower.deploy_awx_kubernetes(incremental=True)
+    assert helm_steps(deploy.take()).count("helm upgrade --install") == 2
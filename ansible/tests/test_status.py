@@ -0,0 +1,139 @@
+import copy
+import json
+
+import pytest
+
+import fake_apiserver
+import setup_awx_tower
+from command_runner import CommandResult
+from setup_awx_tower import ClusterSpec, summarize_status
+
+def ready_objects():
+    """A healthy AWX deployment's status objects, by resource and name"""
+    objects = {resource: {} for resource in setup_awx_tower.STATUS_RESOURCES}
+    for (resource, _, name), body in fake_apiserver.ready_awx_objects().items():
+        if resource in objects:
+            objects[resource][name] = copy.deepcopy(body)
+    return objects
+
+def test_ready_deployment_is_healthy():
+    summary = summarize_status(ready_objects())
+    assert summary == {
+        "health": "healthy", "awx": "Running, Successful",
+        "deployments": [("awx-operator-controller-manager", 1, 1), ("awx-task", 1, 1), ("awx-web", 1, 1)],
+        "pods": 3, "pods_ready": 3, "not_ready": [], "restarts": 0, "admin_secret": True, "nodeport": True}
+
+def test_crash_looping_pod_degrades_the_cluster():
+    objects = ready_objects()
+    objects["pods"]["awx-task-0"]["status"] = {
+        "phase": "Running", "conditions": [{"type": "Ready", "status": "False"}],
+        "containerStatuses": [{"restartCount": 5, "state": {"waiting": {"reason": "CrashLoopBackOff"}}},
+                              {"restartCount": 1, "state": {"running": {}}}]}
+    objects["deployments"]["awx-task"]["status"] = {}
+    summary = summarize_status(objects)
+    assert summary["health"] == "degraded"
+    assert summary["not_ready"] == [("awx-task-0", "CrashLoopBackOff")]
+    assert (summary["pods_ready"], summary["pods"], summary["restarts"]) == (2, 3, 6)
+    assert ("awx-task", 0, 1) in summary["deployments"]
+
+def test_pending_pod_reports_its_phase():
+    objects = ready_objects()
+    objects["pods"]["awx-web-1"] = {"metadata": {"name": "awx-web-1"}, "status": {"phase": "Pending"}}
+    assert summarize_status(objects)["not_ready"] == [("awx-web-1", "Pending")]
+
+def test_finished_job_pods_are_not_counted():
+    objects = ready_objects()
+    objects["pods"]["awx-migration-24.6.1-x7k2p"] = {"metadata": {"name": "awx-migration-24.6.1-x7k2p"},
+                                                     "status": {"phase": "Succeeded"}}
+    summary = summarize_status(objects)
+    assert (summary["health"], summary["pods"]) == ("healthy", 3)
+
+def test_missing_admin_secret_is_degraded():
+    objects = ready_objects()
+    del objects["secrets"][setup_awx_tower.AWX_ADMIN_SECRET]
+    summary = summarize_status(objects)
+    assert (summary["health"], summary["admin_secret"]) == ("degraded", False)
+
+def test_scaled_to_zero_is_shut_down():
+    objects = ready_objects()
+    for name in ("awx-web", "awx-task"):
+        objects["deployments"][name]["spec"]["replicas"] = 0
+    objects["pods"] = {}
+    assert summarize_status(objects)["health"] == "shut down"
+
+def test_operator_alone_is_not_deployed():
+    objects = {resource: {} for resource in setup_awx_tower.STATUS_RESOURCES}
+    objects["deployments"]["awx-operator-controller-manager"] = ready_objects()["deployments"][
+        "awx-operator-controller-manager"]
+    summary = summarize_status(objects)
+    assert (summary["health"], summary["awx"], summary["nodeport"]) == ("not deployed", "missing", False)
+
+def test_unreachable_cluster():
+    assert summarize_status(None) == {"health": "unreachable"}
+
+def test_fleet_table_has_a_row_per_cluster():
+    clusters = [ClusterSpec("awx-1", 8081), ClusterSpec("awx-2", 8082)]
+    text = setup_awx_tower.render_status(clusters, {"awx-1": ready_objects(), "awx-2": None})
+    header, first, second = text.splitlines()
+    assert header.split() == ["Cluster", "Health", "Deploys", "Pods", "Restarts", "URL"]
+    assert first.split() == ["awx-1", "healthy", "3/3", "3/3", "0", "http://localhost:8081"]
+    assert second.split() == ["awx-2", "unreachable"]
+
+def test_single_cluster_block():
+    text = setup_awx_tower.render_status([setup_awx_tower.DEFAULT_CLUSTER],
+                                         {setup_awx_tower.KIND_CLUSTER_NAME: ready_objects()})
+    assert text.splitlines()[0] == f"AWX on {setup_awx_tower.KIND_CLUSTER_NAME}: healthy"
+    assert f"  URL:           http://localhost:{setup_awx_tower.AWX_NODEPORT}" in text.splitlines()
+    assert "  Pods:          3/3 ready, 0 restarts" in text
+
+@pytest.fixture
+def kubectl_only(tmp_path, monkeypatch):
+    """No kubeconfig, so status is read with one batched kubectl get"""
+    monkeypatch.setenv("KUBECONFIG", str(tmp_path / "missing"))
+    monkeypatch.setattr(setup_awx_tower, "VERBOSE", False)
+    calls = []
+
+    def answer(items, crd_missing=False):
+        def run_command(command, **kwargs):
+            calls.append(command)
+            if crd_missing and "awxs" in command:
+                return CommandResult(1, "", 'error: the server doesn\'t have a resource type "awxs"')
+            return CommandResult(0, json.dumps({"kind": "List", "items": items}), "")
+        monkeypatch.setattr(setup_awx_tower, "run_command", run_command)
+    return answer, calls
+
+def kubectl_items():
+    kinds = setup_awx_tower.STATUS_RESOURCES
+    return [dict(body, kind=kinds[resource]) for resource, items in ready_objects().items()
+            for body in items.values()]
+
+def test_kubectl_listing_is_grouped_by_kind_without_secret_values(kubectl_only):
+    answer, calls = kubectl_only
+    answer(kubectl_items())
+    objects, versions = setup_awx_tower.fetch_status_objects()
+    assert calls == ["kubectl get deployments,pods,services,secrets,awxs -o json"]
+    assert versions == {}
+    assert summarize_status(objects)["health"] == "healthy"
+    assert objects["secrets"][setup_awx_tower.AWX_ADMIN_SECRET] == {
+        "metadata": {"name": setup_awx_tower.AWX_ADMIN_SECRET}, "type": ""}
+
+def test_kubectl_listing_before_the_operator_is_installed(kubectl_only):
+    answer, calls = kubectl_only
+    answer([], crd_missing=True)
+    objects, _ = setup_awx_tower.fetch_status_objects()
+    assert calls[-1] == "kubectl get deployments,pods,services,secrets -o json"
+    assert summarize_status(objects)["health"] == "not deployed"
+
+def test_api_listing_matches_the_kubectl_one(tmp_path, monkeypatch):
+    server = fake_apiserver.serve()
+    try:
+        path = str(tmp_path / "kubeconfig")
+        fake_apiserver.write_kubeconfig(path, server.url)
+        monkeypatch.setenv("KUBECONFIG", path)
+        monkeypatch.setattr(setup_awx_tower, "VERBOSE", False)
+        objects, versions = setup_awx_tower.fetch_status_objects()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert summarize_status(objects) == summarize_status(ready_objects())
+    assert set(versions) == set(setup_awx_tower.STATUS_RESOURCES)
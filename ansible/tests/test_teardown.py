@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import setup_awx_tower
+from command_runner import CommandResult
+
+EXISTING = [setup_awx_tower.KIND_CLUSTER_NAME]
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """The default cluster's files live in the working directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def commands(monkeypatch):
+    run = []
+    monkeypatch.setattr(setup_awx_tower, "run_command",
+                        lambda command, **kwargs: run.append(command) or CommandResult(0, "", ""))
+    return run
+
+def journal(workdir, owner):
+    (workdir / setup_awx_tower.DEPLOY_STATE_FILE).write_text(
+        json.dumps({"cluster_uid": "uid", "steps": {}, "kind_cluster_owner": owner}))
+
+def test_cluster_the_script_created_is_deleted_fast(workdir, commands):
+    journal(workdir, "setup")
+    assert setup_awx_tower.owns_kind_cluster(EXISTING)
+    assert setup_awx_tower.teardown_mode(EXISTING) == "fast"
+    setup_awx_tower.remove_awx_cluster("fast", EXISTING)
+    assert commands == [f"kind delete cluster --name {setup_awx_tower.KIND_CLUSTER_NAME}"]
+    assert not (workdir / setup_awx_tower.DEPLOY_STATE_FILE).exists()
+
+def test_pre_existing_cluster_is_kept_even_when_fast_is_asked_for(workdir, commands, capsys):
+    journal(workdir, "existing")
+    assert not setup_awx_tower.owns_kind_cluster(EXISTING)
+    assert setup_awx_tower.teardown_mode(EXISTING) == "graceful"
+    assert setup_awx_tower.teardown_mode(EXISTING, "fast") == "graceful"
+    assert "Not a Kind cluster created by this script" in capsys.readouterr().out
+    setup_awx_tower.remove_awx_cluster("graceful", EXISTING)
+    assert [command.split()[:2] for command in commands] == [["kubectl", "delete"], ["helm", "uninstall"]]
+
+def test_missing_journal_warns_and_keeps_the_cluster(workdir, commands, capsys):
+    assert setup_awx_tower.kind_cluster_owner(EXISTING) == "unknown"
+    assert not setup_awx_tower.owns_kind_cluster(EXISTING)
+    assert setup_awx_tower.teardown_mode(EXISTING) == "graceful"
+    assert "Warning: no deploy journal" in capsys.readouterr().out
+    setup_awx_tower.remove_awx_cluster("graceful", EXISTING)
+    assert not any(command.startswith("kind delete") for command in commands)
+
+def test_missing_journal_with_explicit_fast_deletes_the_cluster(workdir, commands, capsys):
+    assert setup_awx_tower.teardown_mode(EXISTING, "fast") == "fast"
+    assert "deleting it as --teardown fast asks" in capsys.readouterr().out
+    setup_awx_tower.remove_awx_cluster("fast", EXISTING)
+    assert commands == [f"kind delete cluster --name {setup_awx_tower.KIND_CLUSTER_NAME}"]
+
+def test_cluster_that_is_not_a_kind_cluster_is_never_deleted(workdir, commands):
+    journal(workdir, "setup")
+    assert setup_awx_tower.kind_cluster_owner([]) == ""
+    assert setup_awx_tower.teardown_mode([], "fast") == "graceful"
+    setup_awx_tower.remove_awx_cluster("graceful", [])
+    assert not any(command.startswith("kind delete") for command in commands)
+
+def test_cleanup_reports_the_mode_per_cluster(workdir, commands, monkeypatch, capsys):
+    journal(workdir, "setup")
+    monkeypatch.setattr(setup_awx_tower, "kind_clusters", lambda: EXISTING)
+    monkeypatch.setattr(setup_awx_tower, "load_fleet", lambda: [])
+    monkeypatch.setattr(setup_awx_tower, "TEARDOWN_TIMINGS_FILE", str(workdir / "timings.json"))
+    setup_awx_tower.cleanup_awx()
+    assert f"{setup_awx_tower.KIND_CLUSTER_NAME:<16}{'fast':<10}" in capsys.readouterr().out
+    assert set(json.loads((workdir / "timings.json").read_text())) == {"fast"}
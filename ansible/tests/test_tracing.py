@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import tracing
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = tracing.Tracer()
+    monkeypatch.setattr(tracing, "_active", tracer)
+    return tracer
+
+def spans(tracer):
+    return {event["name"]: event["args"] for event in tracer.events if event["ph"] == "X"}
+
+def test_results_are_kept_only_when_asked_for(tracer):
+    @tracing.traced
+    def read_secret():
+        return "hunter2"
+
+    @tracing.traced(record_result=True)
+    def check_tool(name):
+        return True
+
+    assert read_secret() == "hunter2"
+    assert check_tool("helm") is True
+    assert spans(tracer) == {"read_secret": {}, "check_tool": {"arg0": "helm", "result": True}}
+
+def test_a_recorded_string_result_is_still_left_out(tracer):
+    @tracing.traced(record_result=True)
+    def token():
+        return "s3cr3t"
+    token()
+    assert spans(tracer) == {"token": {}}
+
+def test_admin_password_stays_out_of_the_trace(tracer, tmp_path, monkeypatch):
+    import setup_awx_tower
+    monkeypatch.setattr(setup_awx_tower, "api_request", lambda description, call: (True, "p4ssw0rd"))
+    with tracing.span("deploy"):
+        assert setup_awx_tower.get_admin_password() == "p4ssw0rd"
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+    assert "p4ssw0rd" not in path.read_text()
+
+def test_thread_pool_work_keeps_its_parent_span(tracer):
+    from concurrent.futures import ThreadPoolExecutor
+
+    @tracing.traced
+    def probe():
+        pass
+    with tracing.span("preflight"):
+        with ThreadPoolExecutor(2) as pool:
+            pool.submit(tracing.in_current_context(probe)).result()
+    assert spans(tracer)["probe"] == {"parent": "preflight"}
+
+def test_trace_file_is_chrome_trace_json(tracer, tmp_path):
+    with tracing.span("outer", cluster="awx"):
+        pass
+    path = tmp_path / "trace.json"
+    tracer.write(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [(event["name"], event["ph"], event["args"]) for event in events] == [("outer", "X", {"cluster": "awx"})]
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+import upgrade_server_components as upgrade
+from command_runner import CommandResult
+
+def pip_show(*packages):
+    """pip show output for (name, requires) pairs"""
+    return "\n---\n".join(f"Name: {name}\nVersion: 1.0\nRequires: {', '.join(requires)}"
+                          for name, requires in packages)
+
+@pytest.fixture
+def show_output(monkeypatch):
+    output = {"stdout": ""}
+    monkeypatch.setattr(upgrade.command_runner, "run_command",
+                        lambda command, **kwargs: CommandResult(0, output["stdout"], ""))
+    return output
+
+def test_dependencies_come_first(show_output):
+    show_output["stdout"] = pip_show(("requests", ["urllib3", "idna", "certifi"]),
+                                     ("urllib3", []), ("idna", []), ("botocore", ["urllib3"]))
+    order = upgrade.pip_dependency_order(["requests", "urllib3", "idna", "botocore"])
+    assert sorted(order) == ["botocore", "idna", "requests", "urllib3"]
+    assert order.index("urllib3") < order.index("requests")
+    assert order.index("idna") < order.index("requests")
+    assert order.index("urllib3") < order.index("botocore")
+
+def test_names_are_matched_the_way_pip_normalises_them(show_output):
+    # pip show prints the project's own spelling; Requires uses yet another
+    show_output["stdout"] = pip_show(("Ruamel.YAML", ["ruamel-yaml-clib"]), ("ruamel.yaml.clib", []))
+    assert upgrade.pip_dependency_order(["ruamel.yaml", "ruamel_yaml_clib"]) == ["ruamel_yaml_clib", "ruamel.yaml"]
+
+def test_dependencies_outside_the_set_and_on_itself_are_ignored(show_output):
+    show_output["stdout"] = pip_show(("b", ["b", "six"]), ("a", ["b"]))
+    assert upgrade.pip_dependency_order(["a", "b"]) == ["b", "a"]
+
+def test_a_cycle_falls_back_to_name_order(show_output):
+    show_output["stdout"] = pip_show(("c", []), ("a", ["b"]), ("b", ["a"]), ("d", ["a"]))
+    assert upgrade.pip_dependency_order(["d", "b", "a", "c"]) == ["c", "a", "b", "d"]
+
+def test_failed_single_pass_retries_in_dependency_ordered_chunks(monkeypatch):
+    installs = []
+
+    def run_command(command, label=""):
+        installs.append(command.split()[3:])
+        # The single transaction conflicts; chunks without "broken" succeed
+        return 1 if len(installs) == 1 or "broken" in command else 0
+    monkeypatch.setattr(upgrade, "run_command", run_command)
+    monkeypatch.setattr(upgrade, "pip_dependency_order", lambda packages: sorted(packages))
+    monkeypatch.setattr(upgrade, "PIP_CHUNK_SIZE", 2)
+
+    upgraded = upgrade.upgrade_pip_packages(["e", "broken", "a", "d", "c"])
+    assert installs == [["e", "broken", "a", "d", "c"], ["a", "broken"], ["c", "d"], ["e"]]
+    assert upgraded == 3
+
+def test_nothing_outdated_upgrades_nothing(monkeypatch):
+    monkeypatch.setattr(upgrade, "run_command", pytest.fail)
+    assert upgrade.upgrade_pip_packages([]) == 0
+
+@pytest.mark.parametrize("result", [CommandResult(0, '[{"name": "requests", "version": "2.31.0"}]', ""),
+                                    CommandResult(1, "", "ERROR: network unreachable"),
+                                    CommandResult(0, "WARNING: not json", "")])
+def test_a_failed_outdated_listing_is_not_nothing_to_upgrade(monkeypatch, result):
+    monkeypatch.setattr(upgrade.command_runner, "run_command", lambda command, **kwargs: result)
+    expected = ["requests"] if result.returncode == 0 and result.stdout.startswith("[") else None
+    assert upgrade.pip_outdated_packages() == expected
+
+def test_serial_upgrade_fails_when_pip_cannot_list_packages(monkeypatch):
+    monkeypatch.setattr(upgrade.shutil, "which", lambda name: name == "pip")
+    monkeypatch.setattr(upgrade, "run_command", lambda command, label="": 0)
+    monkeypatch.setattr(upgrade, "pip_outdated_packages", lambda: None)
+    monkeypatch.setattr(upgrade.probe_cache, "invalidate", lambda *binaries: None)
+    assert not upgrade.serial_upgrade()
+
+@pytest.fixture
+def plan_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(upgrade, "UPGRADE_PLAN_FILE", str(tmp_path / "plan.json"))
+    monkeypatch.setattr(upgrade, "UPGRADE_HISTORY_FILE", str(tmp_path / "history.json"))
+    monkeypatch.setattr(upgrade.probe_cache, "invalidate", lambda *binaries: None)
+
+def test_apply_reports_managers_whose_prefetch_failed(plan_files, monkeypatch):
+    upgrade.save_json(upgrade.UPGRADE_PLAN_FILE, {"created": time.time(), "managers": {
+        "apt": {"packages": ["curl"], "prefetched": True, "download_seconds": 1.0},
+        "pip": {"packages": [], "prefetched": False, "download_seconds": 0.1}}})
+    applied = []
+    monkeypatch.setattr(upgrade, "apply_manager", lambda manager, packages: applied.append(manager) or True)
+
+    assert not upgrade.apply_upgrades()
+    assert applied == ["apt"]
+    # The plan survives, with apt marked so a second --apply does not repeat it
+    plan = upgrade.load_json(upgrade.UPGRADE_PLAN_FILE, None)
+    assert plan["managers"]["apt"]["applied"] and not plan["managers"]["pip"].get("applied")
+    assert not upgrade.apply_upgrades()
+    assert applied == ["apt"]
+
+def test_plan_is_removed_once_every_manager_is_applied(plan_files, monkeypatch):
+    upgrade.save_json(upgrade.UPGRADE_PLAN_FILE, {"created": time.time(), "managers": {
+        "apt": {"packages": ["curl"], "prefetched": True, "download_seconds": 1.0},
+        "conda": {"packages": [], "prefetched": True, "download_seconds": 0.0}}})
+    monkeypatch.setattr(upgrade, "apply_manager", lambda manager, packages: True)
+    assert upgrade.apply_upgrades()
+    assert upgrade.load_json(upgrade.UPGRADE_PLAN_FILE, None) is None
+
+def test_pip_locks_follow_the_install_target():
+    environments = ["/opt/conda", "/opt/conda/envs/tools"]
+    site = "/opt/conda/envs/tools/lib/python3.11/site-packages"
+    assert upgrade.pip_locks(site, "", environments) == {"env /opt/conda/envs/tools"}
+    assert upgrade.pip_locks("/usr/lib/python3/dist-packages", "", []) == \
+        {"site /usr/lib/python3/dist-packages", upgrade.SYSTEM_PACKAGE_LOCK}
+    # A --user install leaves the distribution's packages alone
+    assert upgrade.pip_locks("/usr/lib/python3/dist-packages", "/home/ops/.local", []) == {"site /home/ops/.local"}
+
+def test_scheduler_serialises_shared_locks_and_overlaps_the_rest():
+    intervals = {}
+    lock = threading.Lock()
+
+    def operation(name, locks, ok=True):
+        def run():
+            started = time.monotonic()
+            time.sleep(0.1)
+            with lock:
+                intervals[name] = (started, time.monotonic())
+            return ok
+        return {"name": name, "locks": set(locks), "run": run}
+
+    results = upgrade.run_scheduled([operation("apt", ["system"]), operation("conda", ["env /opt/conda", "cache"]),
+                                     operation("dnf", ["system"], ok=False), operation("pip", ["site /srv"])])
+    assert {name: ok for name, (ok, _) in results.items()} == {"apt": True, "conda": True, "dnf": False, "pip": True}
+
+    def overlap(first, second):
+        return intervals[first][0] < intervals[second][1] and intervals[second][0] < intervals[first][1]
+    assert not overlap("apt", "dnf")
+    assert intervals["apt"][1] <= intervals["dnf"][0]
+    assert overlap("apt", "conda") and overlap("apt", "pip")
@@ -0,0 +1,190 @@
+"""Nested timing spans for provisioning runs, written as a Chrome trace
+
+Functions decorated with @traced and blocks wrapped in span() become spans.
+They nest per thread, and every command the shared engine runs becomes a
+child span of the span that was open on its thread. Work handed to a thread
+pool keeps its parent span when submitted through in_current_context(). The trace is a
+Chrome/Perfetto JSON file; open it at https://ui.perfetto.dev or in
+chrome://tracing:
+
+    python ansible/setup_awx_tower.py --trace awx-setup-trace.json
+    python ansible/tracing.py awx-setup-trace.json               # slowest spans
+    python ansible/tracing.py before.json after.json             # compare two runs
+"""
+import argparse
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import command_runner
+
+# Longest attribute value kept in a span
+MAX_ATTRIBUTE_LENGTH = 200
+
+# Names of the open spans, innermost last. A context variable rather than a
+# thread-local, so a copied context carries the open spans to a worker thread.
+_open_spans: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("open_spans", default=())
+
+class Tracer:
+    """Collects complete ("X") trace events, with a span stack per thread"""
+
+    def __init__(self):
+        self.events: List[dict] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _emit(self, name: str, category: str, started: float, seconds: float, attributes: dict):
+        event = {"name": name, "cat": category, "ph": "X", "ts": round(started * 1e6),
+                 "dur": round(seconds * 1e6), "pid": self._pid, "tid": threading.get_ident(),
+                 "args": {key: _attribute(value) for key, value in attributes.items()}}
+        with self._lock:
+            self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        """Time the block as a span; the yielded dict takes attributes known only at the end"""
+        stack = _open_spans.get()
+        if stack:
+            attributes.setdefault("parent", stack[-1])
+        token = _open_spans.set(stack + (name,))
+        started = time.time()
+        wall_started = time.monotonic()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _open_spans.reset(token)
+            self._emit(name, "phase", started, time.monotonic() - wall_started, attributes)
+
+    def name_thread(self, name: str):
+        """Label the calling thread's track in the trace viewer"""
+        with self._lock:
+            self.events.append({"name": "thread_name", "ph": "M", "pid": self._pid,
+                                "tid": threading.get_ident(), "args": {"name": name}})
+
+    def record_command(self, record: command_runner.CommandRecord):
+        """Engine listener: add a finished command as a child of the span open on its thread"""
+        stack = _open_spans.get()
+        attributes = {"command": record.command, "returncode": record.returncode, "shell": record.shell}
+        if stack:
+            attributes["parent"] = stack[-1]
+        if record.timed_out:
+            attributes["timed_out"] = True
+        if record.user_seconds is not None:
+            attributes["cpu_seconds"] = round(record.user_seconds + record.system_seconds, 3)
+        if record.max_rss_kb:
+            attributes["max_rss_kb"] = record.max_rss_kb
+        self._emit(record.tool, "command", record.started, record.wall_seconds, attributes)
+
+    def write(self, path: str):
+        with self._lock:
+            events = sorted(self.events, key=lambda event: event.get("ts", 0))
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def _attribute(value):
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = str(value)
+    return text if len(text) <= MAX_ATTRIBUTE_LENGTH else text[:MAX_ATTRIBUTE_LENGTH - 3] + "..."
+
+_active: Optional[Tracer] = None
+
+def start_tracing(path: str, engine: command_runner.ExecutionEngine = command_runner.engine) -> Tracer:
+    """Trace the rest of the run, including the engine's commands, and write the trace at exit"""
+    global _active
+    _active = Tracer()
+    _active.name_thread("main")
+    engine.listeners.append(_active.record_command)
+
+    def _write():
+        _active.write(path)
+        print(f"Trace written to {path} (open it at https://ui.perfetto.dev)")
+    atexit.register(_write)
+    return _active
+
+def span(name: str, **attributes):
+    """A span on the active tracer, or a no-op block if tracing is off"""
+    return _active.span(name, **attributes) if _active else contextlib.nullcontext({})
+
+def name_thread(name: str):
+    if _active:
+        _active.name_thread(name)
+
+def in_current_context(function: Callable) -> Callable:
+    """Wrap a function for a thread pool so it runs under the spans open where it was wrapped
+
+    Each call runs in its own copy of the captured context, since one context
+    cannot be entered by two threads at once.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(function, *args, **kwargs)
+    return wrapper
+
+def traced(function: Optional[Callable] = None, *, record_result: bool = False):
+    """Trace each call of a function as a span named after it, with its arguments
+
+    The return value is kept only with @traced(record_result=True), and only
+    if it is a bool or a number, so a secret a function returns never reaches
+    the trace file.
+    """
+    if function is None:
+        return functools.partial(traced, record_result=record_result)
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _active:
+            return function(*args, **kwargs)
+        attributes = {f"arg{index}": arg for index, arg in enumerate(args)}
+        attributes.update(kwargs)
+        with _active.span(function.__name__, **attributes) as span_attributes:
+            result = function(*args, **kwargs)
+            if record_result and isinstance(result, (bool, int, float)):
+                span_attributes["result"] = result
+            return result
+    return wrapper
+
+def load_spans(path: str) -> Dict[str, float]:
+    """Total seconds per phase span name in a trace file"""
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    totals: Dict[str, float] = {}
+    for event in events:
+        if event.get("ph") == "X" and event.get("cat") == "phase":
+            totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"] / 1e6
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise a trace, or compare the spans of two traces")
+    parser.add_argument("traces", nargs="+", metavar="TRACE", help="One trace, or a before and an after trace")
+    parser.add_argument("--top", type=int, default=20, help="Number of spans to show")
+    args = parser.parse_args()
+
+    if len(args.traces) == 1:
+        totals = load_spans(args.traces[0])
+        print(f"{'Span':<32}{'Seconds':>10}")
+        for name, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"{name[:31]:<32}{seconds:>10.2f}")
+        return
+    before, after = load_spans(args.traces[0]), load_spans(args.traces[1])
+    print(f"{'Span':<32}{'Before s':>10}{'After s':>10}{'Change':>10}")
+    names = sorted(set(before) | set(after), key=lambda name: max(before.get(name, 0), after.get(name, 0)),
+                   reverse=True)
+    for name in names[:args.top]:
+        old, new = before.get(name, 0.0), after.get(name, 0.0)
+        change = f"{(new - old) / old:+.0%}" if old else "new"
+        print(f"{name[:31]:<32}{old:>10.2f}{new:>10.2f}{change:>10}")
+
+if __name__ == "__main__":
+    main()
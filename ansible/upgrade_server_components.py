@@ -1,33 +1,505 @@
-import subprocess
+import argparse
+import os
+import re
 import shutil
+import sys
+import json
+import time
+import command_runner
+import probe_cache
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
-# Function to run a shell command
-def run_command(command):
+# Number of packages per pip transaction when the single-pass upgrade conflicts
+PIP_CHUNK_SIZE = 20
+COMMAND_REPORT_FILE = "upgrade-commands.json"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "devops-public")
+# Written by --prefetch and consumed by --apply
+UPGRADE_PLAN_FILE = os.path.join(CACHE_DIR, "upgrade-plan.json")
+# Measured install seconds per package from earlier --apply runs, used for the projection
+UPGRADE_HISTORY_FILE = os.path.join(CACHE_DIR, "upgrade-history.json")
+PIP_WHEEL_DIR = os.path.join(CACHE_DIR, "pip-wheels")
+# Install seconds per package assumed until a manager has been measured
+DEFAULT_SECONDS_PER_PACKAGE = {"apt": 3.0, "dnf": 3.0, "conda": 2.0, "pip": 1.0}
+# A plan older than this probably no longer matches the repositories
+PLAN_MAX_AGE_SECONDS = 7 * 24 * 3600
+MANAGERS = ["apt", "dnf", "conda", "pip"]
+# Locks held by upgrade operations; operations that share a lock never overlap.
+# apt and dnf both write the system's files and package state, and conda
+# environments share one package cache. Each conda environment and pip
+# target also has a lock of its own.
+SYSTEM_PACKAGE_LOCK = "system packages"
+CONDA_CACHE_LOCK = "conda package cache"
+# dnf upgrade refreshes the metadata itself; check-update would exit 100 exactly
+# when there is something to upgrade and stop an && chain
+DNF_UPGRADE_COMMAND = "sudo dnf upgrade -y"
+PIP_USER_CONFIG = re.compile(r"\.user='(1|true|yes|on)'", re.IGNORECASE)
+
+# Download everything a manager will upgrade, without installing it
+PREFETCH_COMMANDS = {
+    "apt": "sudo apt-get upgrade -y --download-only",
+    "dnf": "sudo dnf upgrade -y --downloadonly",
+    "conda": "conda update --all -y --download-only"
+}
+# Install the prefetched upgrades from the local caches only
+APPLY_COMMANDS = {
+    "apt": "sudo apt-get upgrade -y --no-download --ignore-missing",
+    "dnf": "sudo dnf upgrade -y --cacheonly",
+    "conda": "conda update --all -y --offline"
+}
+
+# Echo streamed command output to the console
+def echo_output(line, stream):
+    print(line)
+
+# Function to run a shell command; a label prefixes the output of commands
+# that run alongside other package managers
+def run_command(command, label=""):
+    echo = (lambda line, stream: print(f"[{label}] {line}")) if label else echo_output
+    result = command_runner.run_command(command, echo=echo)
+    if result.returncode != 0:
+        print(f"Error occurred: command '{command}' returned non-zero exit status {result.returncode}")
+    return result.returncode
+
+# Read the outdated pip packages as JSON, skipping editable installs. Returns
+# None when they cannot be listed, which callers must treat as a failure
+# rather than as nothing to upgrade.
+def pip_outdated_packages():
+    result = command_runner.run_command("pip list --outdated --exclude-editable --format=json", tail_lines=None)
+    if result.returncode != 0:
+        print(f"Error listing outdated pip packages: {result.stderr}")
+        return None
+    try:
+        return [package["name"] for package in json.loads(result.stdout)]
+    except (ValueError, TypeError, KeyError):
+        print("Could not parse the outdated pip package list")
+        return None
+
+# Normalise a distribution name the way pip compares them
+def canonical_name(name):
+    return name.strip().lower().replace("_", "-").replace(".", "-")
+
+# Order packages so that each one comes after the outdated packages it depends on
+def pip_dependency_order(packages):
+    result = command_runner.run_command("pip show " + " ".join(packages), tail_lines=None)
+    wanted = {canonical_name(name): name for name in packages}
+    requires = {name: set() for name in packages}
+    current = None
+    for line in result.stdout.splitlines():
+        if line.startswith("Name:"):
+            current = wanted.get(canonical_name(line.split(":", 1)[1]))
+        elif line.startswith("Requires:") and current:
+            for dependency in line.split(":", 1)[1].split(","):
+                dependency = wanted.get(canonical_name(dependency))
+                if dependency and dependency != current:
+                    requires[current].add(dependency)
+
+    ordered = []
+    remaining = dict(requires)
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps & remaining.keys())
+        if not ready:
+            # Dependency cycle: take the rest in name order
+            ready = sorted(remaining)
+        for name in ready:
+            ordered.append(name)
+            del remaining[name]
+    return ordered
+
+# Upgrade all outdated pip packages in one resolver run, falling back to
+# dependency-ordered chunks if the single transaction conflicts. Extra
+# install options (such as a local wheel directory) apply to every run.
+def upgrade_pip_packages(packages=None, install_options="", label=""):
+    started = time.monotonic()
+    prefix = f"[{label}] " if label else ""
+    if packages is None:
+        packages = pip_outdated_packages()
+        if packages is None:
+            return 0
+    if not packages:
+        print(f"{prefix}All pip packages are up to date.")
+        return 0
+
+    install = " ".join(filter(None, ["pip install -U", install_options])) + " "
+    print(f"{prefix}Upgrading {len(packages)} pip packages in a single transaction...")
+    upgraded = 0
+    if run_command(install + " ".join(packages), label) == 0:
+        upgraded = len(packages)
+    else:
+        print(f"{prefix}Single-pass upgrade failed, retrying in chunks of {PIP_CHUNK_SIZE}...")
+        ordered = pip_dependency_order(packages)
+        for i in range(0, len(ordered), PIP_CHUNK_SIZE):
+            chunk = ordered[i:i + PIP_CHUNK_SIZE]
+            if run_command(install + " ".join(chunk), label) == 0:
+                upgraded += len(chunk)
+
+    elapsed = time.monotonic() - started
+    print(f"{prefix}Upgraded {upgraded} of {len(packages)} pip packages in {elapsed:.1f}s")
+    return upgraded
+
+# List upgradable apt packages after refreshing the package index
+def plan_apt():
+    run_command("sudo apt-get update", "apt")
+    result = command_runner.run_command("apt list --upgradable", tail_lines=None)
+    return [line.split("/", 1)[0] for line in result.stdout.splitlines() if "[upgradable" in line]
+
+# List upgradable dnf packages; check-update exits with 100 when there are some
+def plan_dnf():
+    result = command_runner.run_command("dnf check-update -q", tail_lines=None)
+    if result.returncode not in (0, 100):
+        print(f"Error listing dnf updates: {result.stderr}")
+        return None
+    packages = []
+    for line in result.stdout.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and "." in fields[0] and not line.startswith(" "):
+            packages.append(fields[0].rsplit(".", 1)[0])
+    return packages
+
+# List the conda packages an update of the environment would install
+def plan_conda():
+    result = command_runner.run_command("conda update --all --dry-run --json", tail_lines=None)
     try:
-        subprocess.run(command, check=True, shell=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error occurred: {e}")
-
-# Check and update apt
-if shutil.which("apt"):
-    print("Updating and upgrading packages using apt...")
-    run_command("sudo apt update && sudo apt upgrade -y")
-
-# Check and update dnf
-if shutil.which("dnf"):
-    print("Updating and upgrading packages using dnf...")
-    run_command("sudo dnf check-update && sudo dnf upgrade -y")
-
-# Check and update conda
-if shutil.which("conda"):
-    print("Updating and upgrading packages using conda...")
-    run_command("conda update --all -y")
-
-# Add more package managers as needed
-# Example for pip
-if shutil.which("pip"):
-    print("Updating packages using pip...")
-    run_command("pip install --upgrade pip")
-    run_command("pip list --outdated --format=freeze | grep -v '^\-e' | cut -d = -f 1 | xargs -n1 pip install -U")
-
-print("Upgrade process completed.") 
\ No newline at end of file
+        actions = json.loads(result.stdout).get("actions", {})
+    except ValueError:
+        print("Could not parse the conda update plan")
+        return None
+    return sorted({package["name"] for package in actions.get("LINK", [])})
+
+# Planners return the packages to upgrade, or None when they cannot tell
+PLANNERS = {"apt": plan_apt, "dnf": plan_dnf, "conda": plan_conda, "pip": pip_outdated_packages}
+
+# Download a manager's planned upgrades into its local cache
+def prefetch_manager(manager, packages):
+    if manager == "pip":
+        os.makedirs(PIP_WHEEL_DIR, exist_ok=True)
+        return run_command(f"pip download -d {PIP_WHEEL_DIR} pip " + " ".join(packages), manager) == 0
+    return run_command(PREFETCH_COMMANDS[manager], manager) == 0
+
+# Install a manager's prefetched upgrades without touching the network
+def apply_manager(manager, packages):
+    if manager == "pip":
+        options = f"--no-index --find-links {PIP_WHEEL_DIR}"
+        run_command(f"pip install -U {options} pip", manager)
+        return upgrade_pip_packages(packages, options, manager) == len(packages)
+    return run_command(APPLY_COMMANDS[manager], manager) == 0
+
+def load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+# Estimate each manager's install time from the last measured rate
+def project_window(plan):
+    history = load_json(UPGRADE_HISTORY_FILE, {})
+    return {manager: len(entry["packages"]) * history.get(manager, DEFAULT_SECONDS_PER_PACKAGE[manager])
+            for manager, entry in plan["managers"].items() if entry["packages"]}
+
+# Phase one, outside the maintenance window: work out what every manager
+# would upgrade (in parallel) and download it into the local caches
+def prefetch_upgrades():
+    managers = [m for m in MANAGERS if shutil.which(m)]
+    print(f"Planning upgrades for {', '.join(managers)} in parallel...")
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(len(managers), 1)) as executor:
+        outdated = dict(zip(managers, executor.map(lambda m: PLANNERS[m](), managers)))
+    for manager, packages in outdated.items():
+        if packages is None:
+            print(f"{manager}: could not list the packages to upgrade")
+        else:
+            print(f"{manager}: {len(packages)} packages to upgrade")
+
+    print("Prefetching package downloads...")
+    def _prefetch(manager):
+        fetch_started = time.monotonic()
+        packages = outdated[manager]
+        ok = packages is not None and (not packages or prefetch_manager(manager, packages))
+        return ok, time.monotonic() - fetch_started
+    with ThreadPoolExecutor(max_workers=max(len(managers), 1)) as executor:
+        fetched = dict(zip(managers, executor.map(_prefetch, managers)))
+
+    plan = {"created": time.time(), "managers": {}}
+    for manager in managers:
+        ok, seconds = fetched[manager]
+        plan["managers"][manager] = {"packages": outdated[manager] or [], "prefetched": ok,
+                                     "download_seconds": seconds}
+        if not ok:
+            print(f"Warning: prefetching {manager} packages failed; --apply will report {manager} as failed "
+                  f"until --prefetch succeeds for it")
+    save_json(UPGRADE_PLAN_FILE, plan)
+
+    projected = project_window(plan)
+    print(f"\nPlanned and prefetched in {time.monotonic() - started:.1f}s; plan written to {UPGRADE_PLAN_FILE}")
+    for manager, seconds in projected.items():
+        print(f"  {manager}: ~{seconds:.0f}s")
+    print(f"Projected maintenance window: {sum(projected.values()):.0f}s")
+    print("Run with --apply inside the maintenance window.")
+    return plan
+
+# Phase two, inside the maintenance window: install only what was prefetched,
+# from the local caches, and compare the window with the projection. Managers
+# whose prefetch failed count as failed, and the plan is kept (with the
+# managers already applied marked) until every manager has been applied.
+def apply_upgrades():
+    plan = load_json(UPGRADE_PLAN_FILE, None)
+    if not plan:
+        print(f"No upgrade plan at {UPGRADE_PLAN_FILE}; run with --prefetch first.")
+        return False
+    if time.time() - plan["created"] > PLAN_MAX_AGE_SECONDS:
+        print("Warning: the upgrade plan is more than a week old; consider running --prefetch again.")
+    projected = project_window(plan)
+    history = load_json(UPGRADE_HISTORY_FILE, {})
+
+    print(f"Applying prefetched upgrades (projected window {sum(projected.values()):.0f}s)...")
+    window_started = time.monotonic()
+    actual = {}
+    failed = []
+    for manager, entry in plan["managers"].items():
+        if entry.get("applied"):
+            print(f"{manager}: already applied from this plan")
+            continue
+        if not entry["prefetched"]:
+            print(f"{manager}: prefetch failed, nothing to apply; run --prefetch again")
+            failed.append(manager)
+            continue
+        if not entry["packages"]:
+            continue
+        print(f"Installing {len(entry['packages'])} {manager} packages from the local cache...")
+        started = time.monotonic()
+        if apply_manager(manager, entry["packages"]):
+            entry["applied"] = True
+        else:
+            failed.append(manager)
+        actual[manager] = time.monotonic() - started
+        history[manager] = actual[manager] / len(entry["packages"])
+    window = time.monotonic() - window_started
+    save_json(UPGRADE_HISTORY_FILE, history)
+    probe_cache.invalidate()
+    if failed:
+        save_json(UPGRADE_PLAN_FILE, plan)
+    else:
+        os.remove(UPGRADE_PLAN_FILE)
+
+    print(f"\n{'Manager':<10}{'Projected s':>12}{'Actual s':>10}")
+    for manager, seconds in actual.items():
+        print(f"{manager:<10}{projected.get(manager, 0):>12.1f}{seconds:>10.1f}")
+    print(f"{'window':<10}{sum(projected.values()):>12.1f}{window:>10.1f}")
+    if failed:
+        print(f"Upgrades failed for: {', '.join(failed)}; the plan is kept at {UPGRADE_PLAN_FILE}")
+    print("Upgrade process completed.")
+    return not failed
+
+# List conda environment prefixes: the active one, or every environment
+def conda_environments(all_envs=False):
+    result = command_runner.run_command("conda info --json", tail_lines=None)
+    try:
+        info = json.loads(result.stdout)
+    except ValueError:
+        print("Could not read the conda environments")
+        return []
+    if all_envs:
+        return info.get("envs", [])
+    active = info.get("active_prefix") or info.get("default_prefix") or info.get("root_prefix")
+    return [active] if active else []
+
+# Find the site-packages directory the pip on PATH installs into
+def pip_site_directory():
+    result = command_runner.run_command("pip --version")
+    match = re.search(r" from (.+?)[/\\]pip \(python", result.stdout)
+    return match.group(1) if match else ""
+
+# Return the user base when pip installs with --user: because pip is configured
+# to (PIP_USER or user = true), or because it falls back to it when site-packages
+# is not writable. Returns an empty string when pip installs into site.
+def pip_user_base(site):
+    result = command_runner.run_command("pip config list", tail_lines=None)
+    configured = bool(PIP_USER_CONFIG.search(result.stdout))
+    if configured or (os.path.isdir(site) and not os.access(site, os.W_OK)):
+        return os.environ.get("PYTHONUSERBASE") or os.path.join(os.path.expanduser("~"), ".local")
+    return ""
+
+# Locks for the pip operation, from where it really installs: the user base,
+# the conda environment its site-packages belongs to, or that site-packages
+def pip_locks(site, user_base, environments):
+    if user_base:
+        return {f"site {user_base}"}
+    owners = [e for e in environments if site.startswith(e.rstrip(os.sep) + os.sep)]
+    locks = {f"env {max(owners, key=len)}"} if owners else {f"site {site or 'pip'}"}
+    if site.startswith("/usr/"):
+        # The system interpreter's packages also belong to the distribution
+        locks.add(SYSTEM_PACKAGE_LOCK)
+    return locks
+
+# Build the operations of a full upgrade. Each one has a name (its output
+# prefix), the locks it holds while running and a function returning success.
+def upgrade_operations(all_conda_envs=False):
+    operations = []
+    if shutil.which("apt"):
+        operations.append({"name": "apt", "locks": {SYSTEM_PACKAGE_LOCK},
+                           "run": lambda: run_command("sudo apt update && sudo apt upgrade -y", "apt") == 0})
+    if shutil.which("dnf"):
+        operations.append({"name": "dnf", "locks": {SYSTEM_PACKAGE_LOCK},
+                           "run": lambda: run_command(DNF_UPGRADE_COMMAND, "dnf") == 0})
+
+    environments = conda_environments(all_conda_envs) if shutil.which("conda") else []
+    for environment in environments:
+        name = f"conda:{os.path.basename(environment)}" if all_conda_envs else "conda"
+        command = f"conda update --all -y -p {environment}" if all_conda_envs else "conda update --all -y"
+        operations.append({"name": name, "locks": {f"env {environment}", CONDA_CACHE_LOCK},
+                           "run": lambda command=command, name=name: run_command(command, name) == 0})
+
+    if shutil.which("pip"):
+        site = pip_site_directory()
+        locks = pip_locks(site, pip_user_base(site), environments)
+
+        def upgrade_pip():
+            ok = run_command("pip install --upgrade pip", "pip") == 0
+            packages = pip_outdated_packages()
+            if packages is None:
+                return False
+            return upgrade_pip_packages(packages, label="pip") == len(packages) and ok
+        operations.append({"name": "pip", "locks": locks, "run": upgrade_pip})
+    return operations
+
+# Show which operations must wait for each other and which run alongside
+def describe_lock_graph(operations):
+    print("Upgrade operations and their locks:")
+    for operation in operations:
+        conflicts = [other["name"] for other in operations
+                     if other is not operation and other["locks"] & operation["locks"]]
+        waits = f"serialised with {', '.join(conflicts)}" if conflicts else "runs alongside the others"
+        print(f"  {operation['name']}: {', '.join(sorted(operation['locks']))} ({waits})")
+
+def run_operation(operation):
+    started = time.monotonic()
+    ok = operation["run"]()
+    return ok, time.monotonic() - started
+
+# Run operations concurrently without letting two that share a lock overlap.
+# Operations start in list order as soon as all of their locks are free.
+def run_scheduled(operations):
+    results = {}
+    pending = list(operations)
+    running = {}
+    held = set()
+    with ThreadPoolExecutor(max_workers=max(len(operations), 1)) as executor:
+        while pending or running:
+            for operation in list(pending):
+                if not operation["locks"] & held:
+                    held |= operation["locks"]
+                    pending.remove(operation)
+                    print(f"[{operation['name']}] Starting")
+                    running[executor.submit(run_operation, operation)] = operation
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                operation = running.pop(future)
+                held -= operation["locks"]
+                results[operation["name"]] = future.result()
+                print(f"[{operation['name']}] Finished in {results[operation['name']][1]:.1f}s")
+    return results
+
+# Upgrade every detected package manager, running operations with disjoint
+# locks at the same time, and compare with running them one after another
+def scheduled_upgrade(all_conda_envs=False):
+    operations = upgrade_operations(all_conda_envs)
+    if not operations:
+        print("No package managers found.")
+        return True
+    describe_lock_graph(operations)
+
+    started = time.monotonic()
+    results = run_scheduled(operations)
+    elapsed = time.monotonic() - started
+    probe_cache.invalidate()
+
+    # Run one after another, the operations would take the sum of their times
+    serial = sum(seconds for _, seconds in results.values())
+    print(f"\n{'Operation':<20}{'Seconds':>9}  Result")
+    for operation in operations:
+        ok, seconds = results[operation["name"]]
+        print(f"{operation['name']:<20}{seconds:>9.1f}  {'ok' if ok else 'FAILED'}")
+    print(f"Scheduled run took {elapsed:.1f}s; one after another would take about {serial:.1f}s "
+          f"({serial / elapsed if elapsed else 1:.1f}x faster)")
+    failed = [name for name, (ok, _) in results.items() if not ok]
+    if failed:
+        print(f"Upgrades failed for: {', '.join(failed)}")
+    print("Upgrade process completed.")
+    return not failed
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Upgrade apt, dnf, conda and pip packages")
+    phase = parser.add_mutually_exclusive_group()
+    phase.add_argument("--prefetch", action="store_true",
+                       help="Plan the upgrades and download them ahead of the maintenance window")
+    phase.add_argument("--apply", action="store_true",
+                       help="Install the prefetched upgrades from the local caches only")
+    phase.add_argument("--serial", action="store_true",
+                       help="Upgrade one package manager at a time instead of scheduling them by lock")
+    parser.add_argument("--all-conda-envs", action="store_true",
+                        help="Upgrade every conda environment, not only the active one")
+    return parser.parse_args()
+
+# Upgrade the package managers one after another; returns whether all succeeded
+def serial_upgrade():
+    failed = []
+
+    # Check and update apt
+    if shutil.which("apt"):
+        print("Updating and upgrading packages using apt...")
+        if run_command("sudo apt update && sudo apt upgrade -y") != 0:
+            failed.append("apt")
+
+    # Check and update dnf
+    if shutil.which("dnf"):
+        print("Updating and upgrading packages using dnf...")
+        if run_command(DNF_UPGRADE_COMMAND) != 0:
+            failed.append("dnf")
+
+    # Check and update conda
+    if shutil.which("conda"):
+        print("Updating and upgrading packages using conda...")
+        if run_command("conda update --all -y") != 0:
+            failed.append("conda")
+
+    # Add more package managers as needed
+    # Example for pip
+    if shutil.which("pip"):
+        print("Updating packages using pip...")
+        ok = run_command("pip install --upgrade pip") == 0
+        packages = pip_outdated_packages()
+        if packages is None or upgrade_pip_packages(packages) != len(packages) or not ok:
+            failed.append("pip")
+
+    # Upgraded binaries no longer match cached version probes
+    probe_cache.invalidate()
+
+    if failed:
+        print(f"Upgrades failed for: {', '.join(failed)}")
+    print("Upgrade process completed.")
+    return not failed
+
+# Exit non-zero when any package manager step fails, so callers such as
+# rolling_upgrade.py can count the host as failed
+def main():
+    args = parse_args()
+    if args.prefetch:
+        plan = prefetch_upgrades()
+        succeeded = all(entry["prefetched"] for entry in plan["managers"].values())
+    elif args.apply:
+        succeeded = apply_upgrades()
+    elif args.serial:
+        succeeded = serial_upgrade()
+    else:
+        succeeded = scheduled_upgrade(args.all_conda_envs)
+    if not succeeded:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    command_runner.engine.report_at_exit(COMMAND_REPORT_FILE)
+    main()